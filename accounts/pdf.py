@@ -0,0 +1,154 @@
+import io
+import tempfile
+
+from django.template.loader import render_to_string
+from pypdf import PdfWriter
+from xhtml2pdf import pisa
+
+from core.models import Semester, Session
+from course.models import Course
+from result.models import TakenCourse
+from .filters import LecturerFilter, StudentFilter
+from .models import Student, User
+
+LIST_CHUNK_SIZE = 500
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+def html_to_pdf(html):
+    """Render an HTML document with xhtml2pdf and return the PDF bytes"""
+    buffer = io.BytesIO()
+    status = pisa.CreatePDF(html, dest=buffer)
+    if status.err:
+        raise PdfRenderError("We had some problems generating the PDF")
+    return buffer.getvalue()
+
+
+def render_to_pdf_bytes(template_name, context):
+    return html_to_pdf(render_to_string(template_name, context))
+
+
+def profile_context(user):
+    """Context of the profile page (and PDF) of ``user``"""
+    current_session = Session.objects.filter(is_current_session=True).first()
+    current_semester = Semester.objects.filter(
+        is_current_semester=True, session=current_session
+    ).first()
+    context = {
+        "title": user.get_full_name,
+        "user": user,
+        "current_session": current_session,
+        "current_semester": current_semester,
+    }
+
+    if user.is_lecturer:
+        courses = Course.objects.filter(
+            allocated_course__lecturer__pk=user.pk, semester=current_semester
+        )
+        context.update(
+            {
+                "user_type": "Lecturer",
+                "courses": courses,
+            }
+        )
+    elif user.is_student:
+        student = Student.objects.get(student__pk=user.pk)
+        courses = TakenCourse.objects.filter(
+            student__student__id=user.pk, course__level=student.level
+        )
+        context.update(
+            {
+                "user_type": "Student",
+                "courses": courses,
+                "student": student,
+            }
+        )
+    else:
+        context["user_type"] = "Superuser"
+    return context
+
+
+def profile_job(params):
+    """PDF job entry point, see core.jobs"""
+    user = User.objects.get(pk=params["user_id"])
+    content = render_to_pdf_bytes("pdf/profile_single.html", profile_context(user))
+    return f"{user.username}_profile.pdf".replace("/", "-"), content
+
+
+def iter_chunks(queryset, chunk_size=LIST_CHUNK_SIZE):
+    """
+    Yield lists of at most ``chunk_size`` objects, paging on the primary key
+    so each chunk is a cheap indexed query whatever the position.
+    """
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def render_list_pdf(template_name, name, queryset, chunk_size=LIST_CHUNK_SIZE):
+    """
+    Render a list template one chunk of rows at a time and join the pieces
+    into a temporary file, returned open and rewound.
+
+    Each chunk is turned into its own small PDF and spooled to a temporary
+    file, so neither the HTML nor the xhtml2pdf layout of the whole list is
+    ever held in memory. The writer copies the pages of a part as it is
+    appended and the part is closed right away; the joined pages stay in
+    the writer until it is written to disk. ``name`` is the context
+    variable the template loops over; ``offset`` carries the row number the
+    chunk starts after, the template shows its title on the first chunk
+    (offset 0) only.
+    """
+    writer = PdfWriter()
+    output = tempfile.TemporaryFile()
+    try:
+        offset = 0
+        for chunk in iter_chunks(queryset, chunk_size):
+            with tempfile.TemporaryFile() as part:
+                part.write(
+                    render_to_pdf_bytes(template_name, {name: chunk, "offset": offset})
+                )
+                writer.append(part)
+            offset += len(chunk)
+        if writer.pages:
+            writer.write(output)
+        else:
+            output.write(render_to_pdf_bytes(template_name, {name: [], "offset": 0}))
+        output.seek(0)
+        return output
+    except BaseException:
+        output.close()
+        raise
+    finally:
+        writer.close()
+
+
+def student_list_job(params):
+    """PDF job entry point, see core.jobs"""
+    students = StudentFilter(
+        params.get("filters") or {},
+        queryset=Student.objects.select_related("student", "program"),
+    ).qs
+    return "students_list.pdf", render_list_pdf(
+        "pdf/student_list.html", "students", students
+    )
+
+
+def lecturer_list_job(params):
+    """PDF job entry point, see core.jobs"""
+    lecturers = LecturerFilter(
+        params.get("filters") or {},
+        queryset=User.objects.filter(is_lecturer=True),
+    ).qs
+    return "lecturers_list.pdf", render_list_pdf(
+        "pdf/lecturer_list.html", "lecturers", lecturers
+    )
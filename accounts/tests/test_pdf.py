@@ -0,0 +1,44 @@
+from django.test import TestCase
+from pypdf import PdfReader
+
+from accounts.models import Student, User
+from accounts.pdf import iter_chunks, render_list_pdf, student_list_job
+from course.models import Program
+
+
+class ChunkedListPdfTests(TestCase):
+    def setUp(self):
+        program = Program.objects.create(title="Computer Science")
+        for n in range(5):
+            user = User.objects.create(username=f"student{n}", first_name=f"Name{n}")
+            Student.objects.create(student=user, program=program)
+
+    def test_iter_chunks_covers_every_row_once(self):
+        chunks = list(iter_chunks(Student.objects.all(), chunk_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            sorted(s.pk for chunk in chunks for s in chunk),
+            list(Student.objects.order_by("pk").values_list("pk", flat=True)),
+        )
+
+    def test_chunks_are_joined_into_one_document(self):
+        queryset = Student.objects.select_related("student", "program")
+        with render_list_pdf(
+            "pdf/student_list.html", "students", queryset, chunk_size=2
+        ) as pdf:
+            pages = PdfReader(pdf).pages
+            text = [page.extract_text() for page in pages]
+
+        self.assertEqual(len(pages), 3)
+        self.assertIn("Students", text[0])
+        self.assertNotIn("Students", text[1])
+
+    def test_student_list_honours_filters(self):
+        filename, pdf = student_list_job({"filters": {"id_no": "student3"}})
+
+        with pdf:
+            text = PdfReader(pdf).pages[0].extract_text()
+        self.assertEqual(filename, "students_list.pdf")
+        self.assertIn("student3", text)
+        self.assertNotIn("student2", text)
@@ -6,11 +6,9 @@ from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth.forms import PasswordChangeForm
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.template.loader import get_template, render_to_string
 from django.utils.decorators import method_decorator
 from django.views.generic import CreateView
 from django_filters.views import FilterView
-from xhtml2pdf import pisa
 from django.contrib.auth import get_user_model
 from course.models import CourseAllocation  
 
@@ -25,8 +23,9 @@ from accounts.forms import (
     StudentAddForm,
 )
 from accounts.models import Parent, Student, User
+from accounts.pdf import profile_context
+from core.jobs import start_pdf_job
 from core.models import Semester, Session
-from course.models import Course
 from result.models import TakenCourse
 from quiz.models import Sitting
 
@@ -35,16 +34,6 @@ from quiz.models import Sitting
 # ########################################################
 
 
-def render_to_pdf(template_name, context):
-    """Render a given template to PDF format."""
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'filename="profile.pdf"'
-    template = render_to_string(template_name, context)
-    pdf = pisa.CreatePDF(template, dest=response)
-    if pdf.err:
-        return HttpResponse("We had some problems generating the PDF")
-    return response
-
 def admin_or_lecturer_required(view_func):
     """Allow both admins and lecturers to access."""
     return user_passes_test(
@@ -143,47 +132,14 @@ def profile_single(request, user_id):
     if request.user.id == user_id:
         return redirect("profile")
 
-    current_session = Session.objects.filter(is_current_session=True).first()
-    current_semester = Semester.objects.filter(
-        is_current_semester=True, session=current_session
-    ).first()
     user = get_object_or_404(User, pk=user_id)
-
-    context = {
-        "title": user.get_full_name,
-        "user": user,
-        "current_session": current_session,
-        "current_semester": current_semester,
-    }
-
-    if user.is_lecturer:
-        courses = Course.objects.filter(
-            allocated_course__lecturer__pk=user_id, semester=current_semester
-        )
-        context.update(
-            {
-                "user_type": "Lecturer",
-                "courses": courses,
-            }
-        )
-    elif user.is_student:
-        student = get_object_or_404(Student, student__pk=user_id)
-        courses = TakenCourse.objects.filter(
-            student__student__id=user_id, course__level=student.level
-        )
-        context.update(
-            {
-                "user_type": "Student",
-                "courses": courses,
-                "student": student,
-            }
-        )
-    else:
-        context["user_type"] = "Superuser"
+    if user.is_student:
+        get_object_or_404(Student, student__pk=user_id)
 
     if request.GET.get("download_pdf"):
-        return render_to_pdf("pdf/profile_single.html", context)
+        return start_pdf_job(request, "profile", user_id=user.pk)
 
+    context = profile_context(user)
     return render(request, "accounts/profile_single.html", context)
 
 
@@ -289,17 +245,7 @@ class LecturerFilterView(FilterView):
 @login_required
 @admin_required
 def render_lecturer_pdf_list(request):
-    lecturers = User.objects.filter(is_lecturer=True)
-    template_path = "pdf/lecturer_list.html"
-    context = {"lecturers": lecturers}
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'filename="lecturers_list.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
-        return HttpResponse(f"We had some errors <pre>{html}</pre>")
-    return response
+    return start_pdf_job(request, "lecturer_list", filters=request.GET.dict())
 
 
 @login_required
@@ -391,17 +337,7 @@ class StudentListView(FilterView):
 @login_required
 @admin_or_lecturer_required
 def render_student_pdf_list(request):
-    students = Student.objects.all()
-    template_path = "pdf/student_list.html"
-    context = {"students": students}
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'filename="students_list.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
-        return HttpResponse(f"We had some errors <pre>{html}</pre>")
-    return response
+    return start_pdf_job(request, "student_list", filters=request.GET.dict())
 
 
 @login_required
@@ -276,6 +276,15 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 STUDENT_ID_PREFIX = config("STUDENT_ID_PREFIX", "ugr")
 LECTURER_ID_PREFIX = config("LECTURER_ID_PREFIX", "lec")
 
+# Background PDF jobs: worker threads per process, how long (in seconds)
+# a rendered document is kept before it is purged and how long a job may
+# run before it is taken to have lost its worker and is queued again.
+PDF_JOB_WORKERS = config("PDF_JOB_WORKERS", default=2, cast=int)
+PDF_JOB_TTL = config("PDF_JOB_TTL", default=60 * 60 * 24, cast=int)
+PDF_JOB_TIMEOUT = config("PDF_JOB_TIMEOUT", default=60 * 10, cast=int)
+# Processes rendering the result sheets of a semester-wide export
+PDF_EXPORT_PROCESSES = config("PDF_EXPORT_PROCESSES", default=2, cast=int)
+
 
 # Constants
 YEARS = (
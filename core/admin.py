@@ -1,12 +1,18 @@
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
-from .models import Session, Semester, NewsAndEvents
+from .models import Session, Semester, NewsAndEvents, PdfJob
 
 
 class NewsAndEventsAdmin(TranslationAdmin):
     pass
 
 
+class PdfJobAdmin(admin.ModelAdmin):
+    list_display = ["kind", "owner", "status", "created_at", "finished_at"]
+    list_filter = ["status", "kind"]
+
+
 admin.site.register(Semester)
 admin.site.register(Session)
 admin.site.register(NewsAndEvents, NewsAndEventsAdmin)
+admin.site.register(PdfJob, PdfJobAdmin)
@@ -0,0 +1,150 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import PdfJob
+from .pdf import preload
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> dotted path of the function rendering it. Renderers take the
+# job's params and return (filename, pdf bytes or an open file to store);
+# the result sheet export stores a ZIP of PDFs.
+PDF_RENDERERS = {
+    "result_sheet": "result.pdf.result_sheet_job",
+    "registration_form": "result.pdf.registration_form_job",
+    "profile": "accounts.pdf.profile_job",
+    "student_list": "accounts.pdf.student_list_job",
+    "lecturer_list": "accounts.pdf.lecturer_list_job",
+    "result_sheets": "result.sheet_export.result_sheets_job",
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Fonts, styles and the logo are shared by every render
+            preload()
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PDF_JOB_WORKERS, thread_name_prefix="pdf-job"
+            )
+    return _executor
+
+
+def enqueue_pdf(owner, kind, **params):
+    """
+    Queue a PDF render and return the PdfJob. The job row is the queue: it is
+    handed to the local worker pool once the transaction commits, and
+    ``run_pdf_jobs`` picks up anything a restarted process left behind.
+    """
+    if kind not in PDF_RENDERERS:
+        raise ValueError(f"Unknown PDF job: {kind}")
+    job = PdfJob.objects.create(owner=owner, kind=kind, params=params)
+    transaction.on_commit(lambda: get_executor().submit(run_job_in_thread, job.pk))
+    return job
+
+
+def start_pdf_job(request, kind, **params):
+    """Queue a PDF for the current user and send them to its status page"""
+    job = enqueue_pdf(request.user, kind, **params)
+    return redirect("pdf_job_detail", pk=job.pk)
+
+
+def run_job_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def stale_before(now=None):
+    """Jobs started before this are taken to have lost their worker"""
+    return (now or timezone.now()) - timedelta(seconds=settings.PDF_JOB_TIMEOUT)
+
+
+def claimable(now=None):
+    """Queued jobs and running ones whose worker died mid-render"""
+    return Q(status=PdfJob.QUEUED) | Q(
+        status=PdfJob.RUNNING, started_at__lt=stale_before(now)
+    )
+
+
+def run_job(job_id):
+    """
+    Render one queued job, returns False if another worker claimed it. A
+    job left running past ``PDF_JOB_TIMEOUT`` (its process was restarted
+    or killed) is claimed again; should its first worker finish after all,
+    the result of whichever claim is current is kept.
+    """
+    now = timezone.now()
+    claimed = PdfJob.objects.filter(claimable(now), pk=job_id).update(
+        status=PdfJob.RUNNING, started_at=now
+    )
+    if not claimed:
+        return False
+    job = PdfJob.objects.get(pk=job_id)
+    try:
+        filename, content = import_string(PDF_RENDERERS[job.kind])(job.params)
+    except Exception as e:
+        # The details are for admins, the owner sees a generic message
+        logger.exception("PDF job %s (%s) failed", job.pk, job.kind)
+        job.status = PdfJob.FAILED
+        job.error = f"{type(e).__name__}: {e}"
+    else:
+        job.filename = filename
+        if hasattr(content, "read"):
+            with content:
+                job.file.save(filename, File(content), save=False)
+        else:
+            job.file.save(filename, ContentFile(content), save=False)
+        job.status = PdfJob.DONE
+    job.finished_at = timezone.now()
+    job.expires_at = job.finished_at + timedelta(seconds=settings.PDF_JOB_TTL)
+    finished = PdfJob.objects.filter(
+        pk=job.pk, status=PdfJob.RUNNING, started_at=now
+    ).update(
+        status=job.status,
+        filename=job.filename,
+        file=job.file.name or "",
+        error=job.error,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+    )
+    if not finished and job.file:
+        # Reclaimed by another worker meanwhile
+        job.file.delete(save=False)
+    return True
+
+
+def run_pending_jobs():
+    """
+    Run every queued job, and every job stuck running past the timeout, in
+    the current thread. Returns how many ran.
+    """
+    pending = PdfJob.objects.filter(claimable()).order_by("created_at")
+    return sum(run_job(pk) for pk in pending.values_list("pk", flat=True))
+
+
+def purge_expired_jobs(now=None):
+    """Delete finished jobs past their expiry together with their files"""
+    expired = PdfJob.objects.filter(expires_at__lte=now or timezone.now())
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.jobs import purge_expired_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Render queued PDF jobs and delete expired ones"
+
+    def handle(self, *args, **options):
+        ran = run_pending_jobs()
+        purged = purge_expired_jobs()
+        self.stdout.write(
+            self.style.SUCCESS(f"Ran {ran} job(s), purged {purged} expired job(s).")
+        )
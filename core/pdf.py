@@ -0,0 +1,161 @@
+"""
+Shared reportlab resources for the PDF renderers: fonts, paragraph styles
+and the school logo are set up once per process and reused by every render.
+
+Styles are read-only, so renders running side by side in the PDF job
+threads can't change each other's layout; ``style.clone(name, **changes)``
+gives a private variation.
+"""
+import functools
+import os
+import threading
+from types import MappingProxyType
+
+from django.conf import settings
+from PIL import Image as PILImage
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.platypus import Image
+
+# Font name -> (file, built-in fallback). The TrueType fonts cover the
+# non-Latin names Helvetica can't print.
+FONTS = {
+    "FreeSans": ("FreeSans.ttf", "Helvetica"),
+    "FreeSansBold": ("FreeSansBold.ttf", "Helvetica-Bold"),
+}
+FONT_DIRS = [
+    os.path.join(settings.STATICFILES_DIRS[0], "fonts", "freefont"),
+    "/usr/share/fonts/truetype/freefont",
+    "/usr/share/fonts/gnu-free",
+]
+LOGO_PATH = os.path.join(settings.STATICFILES_DIRS[0], "img", "Placid-Academy-Logo.png")
+# The logo is printed at about an inch; keep enough pixels for 300 dpi
+LOGO_MAX_PIXELS = 300
+
+_lock = threading.Lock()
+
+
+class FrozenParagraphStyle(ParagraphStyle):
+    """A ParagraphStyle that refuses changes once built"""
+
+    def __init__(self, name, parent=None, **kw):
+        super().__init__(name, parent, **kw)
+        self.__dict__["_frozen"] = True
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(
+                f"PDF style {self.name!r} is shared, derive a new one instead"
+            )
+        super().__setattr__(name, value)
+
+    def clone(self, name, parent=None, **kw):
+        # A plain, changeable copy; reportlab wants parents of the same class
+        style = ParagraphStyle(name)
+        style.__dict__.update(
+            (key, value)
+            for key, value in self.__dict__.items()
+            if key not in ("name", "parent", "_frozen")
+        )
+        style._setKwds(**kw)
+        return style
+
+
+def _find_font(filename):
+    for folder in FONT_DIRS:
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def registered_fonts():
+    """
+    Register the TrueType fonts that can be found and return font name ->
+    the name to use in styles, which is the built-in fallback for fonts
+    that are not installed.
+    """
+    names = {}
+    with _lock:
+        for name, (filename, fallback) in FONTS.items():
+            path = _find_font(filename)
+            try:
+                if path and name not in pdfmetrics.getRegisteredFontNames():
+                    pdfmetrics.registerFont(TTFont(name, path))
+                names[name] = name if path else fallback
+            except TTFError:
+                names[name] = fallback
+        if names["FreeSans"] == "FreeSans" and names["FreeSansBold"] == "FreeSansBold":
+            # Lets <b> in paragraphs switch to the bold face
+            pdfmetrics.registerFontFamily(
+                "FreeSans",
+                normal="FreeSans",
+                bold="FreeSansBold",
+                italic="FreeSans",
+                boldItalic="FreeSansBold",
+            )
+    return MappingProxyType(names)
+
+
+def font(name):
+    return registered_fonts()[name]
+
+
+@functools.lru_cache(maxsize=None)
+def styles():
+    """The named paragraph styles of the PDFs, built once"""
+    normal = FrozenParagraphStyle(
+        "Normal", fontName=font("FreeSans"), fontSize=10, leading=12
+    )
+
+    def style(name, **kw):
+        return FrozenParagraphStyle(name, parent=normal, **kw)
+
+    return MappingProxyType(
+        {
+            "Normal": normal,
+            "Right": style("Right", alignment=TA_RIGHT),
+            "Title": style("Title", alignment=TA_CENTER, fontSize=12, leading=15),
+            "Subtitle": style("Subtitle", alignment=TA_CENTER, leading=15),
+            "Heading": style("Heading", alignment=TA_CENTER, fontSize=12, leading=18),
+            "School": style("School", alignment=TA_CENTER, leading=18),
+            "Department": style(
+                "Department", alignment=TA_CENTER, fontSize=9, leading=18
+            ),
+            "Section": style("Section", alignment=TA_LEFT, fontSize=9, leading=18),
+            "Small": style("Small", alignment=TA_LEFT, fontSize=8, leading=18),
+            "Certification": style(
+                "Certification", alignment=TA_JUSTIFY, fontSize=8, leading=18
+            ),
+        }
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def logo():
+    """The school logo, decoded and scaled down once"""
+    with PILImage.open(LOGO_PATH) as image:
+        image = image.convert("RGBA")
+        image.thumbnail((LOGO_MAX_PIXELS, LOGO_MAX_PIXELS))
+    reader = ImageReader(image)
+    # Decode the pixels now rather than during the first render
+    reader.getRGBData()
+    return reader
+
+
+def logo_image(width=1 * inch, height=1 * inch):
+    """A flowable drawing the shared logo; it never touches the file again"""
+    image = Image(LOGO_PATH, width, height)
+    image._img = logo()
+    return image
+
+
+def preload():
+    """Set up fonts, styles and the logo ahead of the first render"""
+    styles()
+    logo()
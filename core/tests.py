@@ -1,3 +1,101 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from .jobs import enqueue_pdf, purge_expired_jobs, run_job, run_pending_jobs
+from .models import PdfJob
+from .pdf import logo, logo_image, styles
+from .views import pdf_job_status
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class PdfJobTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="admin1")
+
+    def test_job_renders_once_and_expires(self):
+        job = enqueue_pdf(self.user, "lecturer_list")
+        self.assertEqual(job.status, PdfJob.QUEUED)
+
+        self.assertTrue(run_job(job.pk))
+        self.assertFalse(run_job(job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.DONE)
+        self.assertEqual(job.filename, "lecturers_list.pdf")
+        with job.file.open("rb") as pdf:
+            self.assertTrue(pdf.read().startswith(b"%PDF"))
+
+        self.assertEqual(purge_expired_jobs(), 0)
+        self.assertEqual(purge_expired_jobs(job.expires_at + timedelta(seconds=1)), 1)
+
+    def test_failed_job_records_error(self):
+        job = enqueue_pdf(self.user, "profile", user_id=0)
+        run_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.FAILED)
+        self.assertTrue(job.error)
+        self.assertGreater(job.expires_at, timezone.now())
+
+        request = RequestFactory().get("/")
+        request.user = self.user
+        status = json.loads(pdf_job_status(request, job.pk).content)
+        self.assertEqual(status["error"], "The document could not be generated.")
+
+    @override_settings(PDF_JOB_TIMEOUT=60)
+    def test_stale_running_job_is_reclaimed(self):
+        job = enqueue_pdf(self.user, "lecturer_list")
+        started_at = timezone.now() - timedelta(seconds=30)
+        PdfJob.objects.filter(pk=job.pk).update(
+            status=PdfJob.RUNNING, started_at=started_at
+        )
+        self.assertEqual(run_pending_jobs(), 0)
+
+        PdfJob.objects.filter(pk=job.pk).update(
+            started_at=started_at - timedelta(seconds=60)
+        )
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.DONE)
+
+    def test_status_is_only_visible_to_owner(self):
+        job = enqueue_pdf(self.user, "lecturer_list")
+        request = RequestFactory().get("/")
+
+        request.user = User.objects.create(username="other")
+        with self.assertRaises(Http404):
+            pdf_job_status(request, job.pk)
+
+        request.user = self.user
+        self.assertEqual(
+            json.loads(pdf_job_status(request, job.pk).content),
+            {"status": "queued", "finished": False, "error": ""},
+        )
+
+
+class PdfToolkitTestCase(TestCase):
+    def test_styles_are_shared_and_read_only(self):
+        self.assertIs(styles(), styles())
+        with self.assertRaises(AttributeError):
+            styles()["Normal"].fontSize = 20
+        with self.assertRaises(TypeError):
+            styles()["Extra"] = styles()["Normal"]
+
+        bigger = styles()["Title"].clone("Bigger", fontSize=20)
+        bigger.leading = 24
+        self.assertEqual(styles()["Title"].fontSize, 12)
+
+    def test_logo_is_decoded_once(self):
+        first, second = logo_image(), logo_image()
+        self.assertIs(first._img, logo())
+        self.assertIs(second._img, logo())
+        self.assertLessEqual(max(logo().getSize()), 300)
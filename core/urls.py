@@ -15,6 +15,9 @@ from .views import (
     semester_update_view,
     semester_delete_view,
     dashboard_view,
+    pdf_job_detail,
+    pdf_job_status,
+    pdf_job_download,
 )
 
 
@@ -34,4 +37,7 @@ urlpatterns = [
     path("semester/<int:pk>/delete/", semester_delete_view, name="delete_semester"),
     path("dashboard/", dashboard_view, name="dashboard"),
     path("grades/", account_views.grades_view, name="grades"),
+    path("documents/<int:pk>/", pdf_job_detail, name="pdf_job_detail"),
+    path("documents/<int:pk>/status/", pdf_job_status, name="pdf_job_status"),
+    path("documents/<int:pk>/download/", pdf_job_download, name="pdf_job_download"),
 ]
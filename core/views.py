@@ -1,12 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.utils.translation import gettext as _
 
 from accounts.decorators import admin_required, lecturer_required
 from accounts.models import User, Student
 from .forms import SessionForm, SemesterForm, NewsAndEventsForm
-from .models import NewsAndEvents, ActivityLog, Session, Semester
+from .models import NewsAndEvents, ActivityLog, PdfJob, Session, Semester
 from accounts.views import admin_or_lecturer_required
+from result.models import ResultPublication
+from result.ranking import semester_rank_distribution
 
 
 # ########################################################
@@ -27,6 +32,10 @@ def home_view(request):
 def dashboard_view(request):
     logs = ActivityLog.objects.all().order_by("-created_at")[:10]
     gender_count = Student.get_gender_count()
+    current_session = Session.objects.filter(is_current_session=True).first()
+    current_semester = Semester.objects.filter(
+        is_current_semester=True, session=current_session
+    ).first()
     context = {
         "student_count": User.objects.get_student_count(),
         "lecturer_count": User.objects.get_lecturer_count(),
@@ -34,6 +43,11 @@ def dashboard_view(request):
         "males_count": gender_count["M"],
         "females_count": gender_count["F"],
         "logs": logs,
+        "current_semester": current_semester,
+        "current_session": current_session,
+        "rank_distribution": semester_rank_distribution(
+            current_semester, current_session
+        ),
     }
     return render(request, "core/dashboard.html", context)
 
@@ -88,7 +102,11 @@ def delete_post(request, pk):
 @admin_or_lecturer_required
 def session_list_view(request):
     """Show list of all sessions"""
-    sessions = Session.objects.all().order_by("-is_current_session", "-session")
+    sessions = (
+        Session.objects.all()
+        .select_related("publication")
+        .order_by("-is_current_session", "-session")
+    )
     return render(request, "core/session_list.html", {"sessions": sessions})
 
 
@@ -132,6 +150,8 @@ def session_delete_view(request, pk):
     session = get_object_or_404(Session, pk=pk)
     if session.is_current_session:
         messages.error(request, "You cannot delete the current session.")
+    elif ResultPublication.objects.filter(session=session).exists():
+        messages.error(request, "You cannot delete a session with published results.")
     else:
         session.delete()
         messages.success(request, "Session successfully deleted.")
@@ -209,3 +229,36 @@ def unset_current_semester():
     if current_semester:
         current_semester.is_current_semester = False
         current_semester.save()
+
+
+# ########################################################
+# PDF jobs
+# ########################################################
+@login_required
+def pdf_job_detail(request, pk):
+    job = get_object_or_404(PdfJob, pk=pk, owner=request.user)
+    return render(
+        request, "core/pdf_job.html", {"title": "Preparing document", "job": job}
+    )
+
+
+@login_required
+def pdf_job_status(request, pk):
+    job = get_object_or_404(PdfJob, pk=pk, owner=request.user)
+    # What went wrong is recorded on the job for admins, not shown to owners
+    error = ""
+    if job.status == PdfJob.FAILED:
+        error = _("The document could not be generated.")
+    data = {"status": job.status, "finished": job.is_finished, "error": error}
+    if job.status == PdfJob.DONE:
+        data["url"] = reverse("pdf_job_download", kwargs={"pk": job.pk})
+    return JsonResponse(data)
+
+
+@login_required
+def pdf_job_download(request, pk):
+    job = get_object_or_404(PdfJob, pk=pk, owner=request.user, status=PdfJob.DONE)
+    if not job.file:
+        raise Http404
+    # The content type follows the filename, a PDF or the sheets' ZIP
+    return FileResponse(job.file.open("rb"), filename=job.filename)
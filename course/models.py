@@ -9,6 +9,7 @@ from django.utils.translation import gettext_lazy as _
 
 from core.models import ActivityLog, Semester
 from core.utils import unique_slug_generator
+from search.models import SearchDocument
 
 
 class ProgramManager(models.Manager):
@@ -45,16 +46,13 @@ def log_program_delete(sender, instance, **kwargs):
 
 
 class CourseManager(models.Manager):
-    def search(self, query=None):
+    def search(self, query=None, language=None):
+        """Courses matching ``query`` in the active (or given) language"""
         queryset = self.get_queryset()
         if query:
-            or_lookup = (
-                Q(title__icontains=query)
-                | Q(summary__icontains=query)
-                | Q(code__icontains=query)
-                | Q(slug__icontains=query)
+            queryset = queryset.filter(
+                pk__in=SearchDocument.objects.object_ids(self.model, query, language)
             )
-            queryset = queryset.filter(or_lookup).distinct()
         return queryset
 
 
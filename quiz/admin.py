@@ -8,6 +8,7 @@ from modeltranslation.forms import TranslationModelForm
 from .models import (
     Quiz,
     Progress,
+    QuizProgress,
     Question,
     MCQuestion,
     Choice,
@@ -76,10 +77,14 @@ class MCQuestionAdmin(TranslationAdmin):
 
 
 class ProgressAdmin(admin.ModelAdmin):
-    search_fields = (
-        "user",
-        "score",
-    )
+    search_fields = ("user__username",)
+
+
+class QuizProgressAdmin(admin.ModelAdmin):
+    list_display = ("user", "quiz", "score", "possible")
+    list_select_related = ("user", "quiz")
+    search_fields = ("user__username", "quiz__title")
+    raw_id_fields = ("user", "quiz")
 
 
 class EssayQuestionAdmin(admin.ModelAdmin):
@@ -97,5 +102,6 @@ class EssayQuestionAdmin(admin.ModelAdmin):
 admin.site.register(Quiz, QuizAdmin)
 admin.site.register(MCQuestion, MCQuestionAdmin)
 admin.site.register(Progress, ProgressAdmin)
+admin.site.register(QuizProgress, QuizProgressAdmin)
 admin.site.register(EssayQuestion, EssayQuestionAdmin)
 admin.site.register(Sitting)
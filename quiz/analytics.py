@@ -0,0 +1,247 @@
+"""
+Item statistics for quizzes: difficulty (p-value), point-biserial
+discrimination, choice selection rates and score distributions.
+
+Everything is kept as running sums in QuizStatistics/QuestionStatistics, so
+sittings completed since the last update are folded in without reading the
+older ones again. Each batch of sittings is aggregated with NumPy. The
+statistics are updated once sittings complete, pages only read them.
+"""
+import logging
+
+import numpy as np
+from django.db import transaction
+
+from .models import (
+    Choice,
+    QuestionStatistics,
+    Quiz,
+    QuizStatistics,
+    Sitting,
+    SittingAnswer,
+)
+
+logger = logging.getLogger(__name__)
+
+HISTOGRAM_BINS = 10
+BATCH_SIZE = 500
+
+
+def score_bands(correct, counts):
+    """Histogram band of each sitting score, in steps of 100 / HISTOGRAM_BINS"""
+    bands = correct * HISTOGRAM_BINS // np.maximum(counts, 1)
+    return np.clip(bands, 0, HISTOGRAM_BINS - 1)
+
+
+def _choice_id(answer):
+    # Multiple choice answers are choice ids, anything else is not a choice
+    if answer and len(answer) < 19 and answer.isdecimal():
+        return int(answer)
+    return -1
+
+
+def pair_keys(choice_ids, question_ids):
+    """Pack (choice id, question id) pairs into single int64 keys"""
+    return (np.asarray(choice_ids, dtype=np.int64) << 32) | np.asarray(
+        question_ids, dtype=np.int64
+    )
+
+
+def choice_keys(pairs):
+    """Packed keys of ``(choice_id, question_id)`` pairs"""
+    if isinstance(pairs, np.ndarray) and pairs.ndim == 1:
+        return pairs
+    pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+    return pair_keys(pairs[:, 0], pairs[:, 1])
+
+
+def aggregate(sittings, answers, valid_choices=()):
+    """
+    Aggregate one batch. ``sittings`` holds ``(pk, current_score,
+    question_count)`` rows and ``answers`` ``(sitting_id, question_id,
+    correct, answer)`` rows of those sittings. Choices are only counted when
+    the ``(choice_id, question_id)`` pair is in ``valid_choices``, either
+    pairs or keys from ``choice_keys``.
+
+    Returns the quiz totals and, per question id, the totals to add to its
+    QuestionStatistics.
+    """
+    pks, correct_counts, question_counts = (
+        np.array(column, dtype=np.int64) for column in zip(*sittings)
+    )
+    scores = np.clip(correct_counts / np.maximum(question_counts, 1), 0, 1)
+    quiz_totals = {
+        "sittings": len(pks),
+        "score_sum": float(scores.sum()),
+        "score_squares": float(np.square(scores).sum()),
+        "histogram": np.bincount(
+            score_bands(correct_counts, question_counts), minlength=HISTOGRAM_BINS
+        ),
+    }
+    if not answers:
+        return quiz_totals, {}
+
+    size = len(answers)
+    sitting_ids = np.fromiter((row[0] for row in answers), np.int64, size)
+    question_ids = np.fromiter((row[1] for row in answers), np.int64, size)
+    correct = np.fromiter((row[2] is True for row in answers), bool, size)
+    choice_ids = np.fromiter((_choice_id(row[3]) for row in answers), np.int64, size)
+
+    order = np.argsort(pks)
+    answer_scores = scores[order[np.searchsorted(pks[order], sitting_ids)]]
+    questions, index = np.unique(question_ids, return_inverse=True)
+
+    def per_question(weights=None):
+        return np.bincount(index, weights=weights, minlength=len(questions))
+
+    attempts = per_question()
+    right = per_question(correct)
+    score_sum = per_question(answer_scores)
+    score_squares = per_question(np.square(answer_scores))
+    correct_score_sum = per_question(answer_scores * correct)
+
+    # Count each choice picked for the question it belongs to
+    keys = pair_keys(choice_ids, question_ids)
+    keys, picks = np.unique(
+        keys[(choice_ids >= 0) & np.isin(keys, choice_keys(valid_choices))],
+        return_counts=True,
+    )
+    choice_counts = {}
+    for key, count in zip(keys.tolist(), picks.tolist()):
+        choice_counts.setdefault(key & 0xFFFFFFFF, {})[str(key >> 32)] = count
+
+    question_totals = {
+        question_id: {
+            "attempts": int(attempts[n]),
+            "correct": int(right[n]),
+            "score_sum": float(score_sum[n]),
+            "score_squares": float(score_squares[n]),
+            "correct_score_sum": float(correct_score_sum[n]),
+            "choice_counts": choice_counts.get(question_id, {}),
+        }
+        for n, question_id in enumerate(questions.tolist())
+    }
+    return quiz_totals, question_totals
+
+
+def _add_counts(current, extra):
+    counts = dict(current)
+    for key, value in extra.items():
+        counts[key] = counts.get(key, 0) + value
+    return counts
+
+
+def _fold(statistics, question_statistics, quiz_totals, question_totals):
+    statistics.sittings += quiz_totals["sittings"]
+    statistics.score_sum += quiz_totals["score_sum"]
+    statistics.score_squares += quiz_totals["score_squares"]
+    histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    histogram[: len(statistics.histogram)] += np.asarray(
+        statistics.histogram, dtype=np.int64
+    )
+    statistics.histogram = (histogram + quiz_totals["histogram"]).tolist()
+
+    for question_id, totals in question_totals.items():
+        row = question_statistics.setdefault(
+            question_id,
+            QuestionStatistics(quiz_id=statistics.quiz_id, question_id=question_id),
+        )
+        for field in [
+            "attempts",
+            "correct",
+            "score_sum",
+            "score_squares",
+            "correct_score_sum",
+        ]:
+            setattr(row, field, getattr(row, field) + totals[field])
+        row.choice_counts = _add_counts(row.choice_counts, totals["choice_counts"])
+
+
+def new_sittings(quiz_id):
+    """
+    Completed sittings of the quiz not folded into its statistics yet. The
+    flag is set when a sitting is folded in, so one completed in a
+    transaction that commits late is still picked up afterwards.
+    """
+    return Sitting.objects.filter(
+        quiz_id=quiz_id, complete=True, in_statistics=False
+    ).order_by("pk")
+
+
+def update_statistics(quiz, full=False, batch_size=BATCH_SIZE):
+    """
+    Fold the sittings of ``quiz`` completed since the last update into its
+    statistics; rebuild them from scratch with ``full`` or when a sitting
+    was marked again. Returns the QuizStatistics.
+    """
+    with transaction.atomic():
+        statistics, _ = QuizStatistics.objects.get_or_create(quiz=quiz)
+        statistics = QuizStatistics.objects.select_for_update().get(pk=statistics.pk)
+        if full or statistics.stale:
+            QuestionStatistics.objects.filter(quiz=quiz).delete()
+            Sitting.objects.filter(quiz=quiz, in_statistics=True).update(
+                in_statistics=False
+            )
+            statistics = QuizStatistics(pk=statistics.pk, quiz=quiz)
+        question_statistics = {
+            row.question_id: row for row in QuestionStatistics.objects.filter(quiz=quiz)
+        }
+        valid_choices = choice_keys(
+            Choice.objects.filter(question__quiz=quiz).values_list("id", "question_id")
+        )
+
+        rows = list(
+            new_sittings(quiz.pk).values_list("pk", "current_score", "question_count")
+        )
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            sitting_ids = [row[0] for row in batch]
+            answers = list(
+                SittingAnswer.objects.filter(sitting_id__in=sitting_ids).values_list(
+                    "sitting_id", "question_id", "correct", "answer"
+                )
+            )
+            _fold(
+                statistics,
+                question_statistics,
+                *aggregate(batch, answers, valid_choices),
+            )
+            Sitting.objects.filter(pk__in=sitting_ids).update(in_statistics=True)
+
+        statistics.stale = False
+        statistics.save()
+        QuestionStatistics.objects.bulk_create(
+            [row for row in question_statistics.values() if row.pk is None]
+        )
+        QuestionStatistics.objects.bulk_update(
+            [row for row in question_statistics.values() if row.pk is not None],
+            [
+                "attempts",
+                "correct",
+                "score_sum",
+                "score_squares",
+                "correct_score_sum",
+                "choice_counts",
+            ],
+        )
+    return statistics
+
+
+def update_after_commit(quiz_ids):
+    """
+    Update the statistics of the quizzes once the current transaction
+    commits. A failure is logged rather than raised, so it never fails the
+    request that completed the sittings; ``update_quiz_statistics`` catches
+    up later.
+    """
+    quiz_ids = set(quiz_ids)
+
+    def update():
+        for quiz in Quiz.objects.filter(pk__in=quiz_ids):
+            try:
+                update_statistics(quiz)
+            except Exception:
+                logger.exception("Updating the statistics of quiz %s failed", quiz.pk)
+
+    if quiz_ids:
+        transaction.on_commit(update)
@@ -3,3 +3,19 @@ from django.apps import AppConfig
 
 class QuizConfig(AppConfig):
     name = "quiz"
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed, post_save, pre_delete
+        from .bundle import invalidate_bundles
+        from .models import Choice, EssayQuestion, MCQuestion, Question
+
+        for model in (Question, MCQuestion, EssayQuestion, Choice):
+            post_save.connect(
+                invalidate_bundles, sender=model, dispatch_uid="quiz_bundle"
+            )
+            pre_delete.connect(
+                invalidate_bundles, sender=model, dispatch_uid="quiz_bundle"
+            )
+        m2m_changed.connect(
+            invalidate_bundles, sender=Question.quiz.through, dispatch_uid="quiz_bundle"
+        )
@@ -0,0 +1,176 @@
+import threading
+from types import MappingProxyType
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Choice, MCQuestion, Question, Quiz, shuffled
+
+BUNDLE_TIMEOUT = 60 * 60
+
+_local_bundles = {}
+_local_lock = threading.Lock()
+
+
+class QuestionBundle:
+    """
+    Read-only snapshot of a quiz: its questions (as their subclasses), the
+    choices of every multiple choice question and the ids of the correct
+    ones. Built with two queries and shared between requests, so answering
+    a question needs no further database access.
+    """
+
+    def __init__(self, quiz_id, version, questions, choices):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.questions = MappingProxyType({q.id: q for q in questions})
+        grouped = {}
+        for choice in choices:
+            grouped.setdefault(choice.question_id, []).append(choice)
+        self.choices = MappingProxyType(
+            {pk: tuple(items) for pk, items in grouped.items()}
+        )
+        self.choice_by_id = MappingProxyType({c.id: c for c in choices})
+        self.correct_choice_ids = frozenset(c.id for c in choices if c.correct)
+
+    def __bool__(self):
+        return bool(self.questions)
+
+    def __reduce__(self):
+        # Mapping proxies can't be pickled; rebuild them from the plain lists
+        return (
+            self.__class__,
+            (
+                self.quiz_id,
+                self.version,
+                list(self.questions.values()),
+                list(self.choice_by_id.values()),
+            ),
+        )
+
+    @classmethod
+    def load(cls, quiz_id, version=None):
+        questions = list(
+            Question.objects.filter(quiz__id=quiz_id).select_subclasses().order_by("id")
+        )
+        choices = list(
+            Choice.objects.filter(
+                question_id__in=[q.id for q in questions if isinstance(q, MCQuestion)]
+            ).order_by("id")
+        )
+        return cls(quiz_id, version, questions, choices)
+
+    def question(self, pk):
+        return self.questions.get(pk)
+
+    def get_choices(self, question, seed=0):
+        """
+        Choices of ``question`` in the order its choice_order asks for; random
+        orders are fixed by ``seed``, see MCQuestion.order_choices.
+        """
+        choices = list(self.choices.get(question.id, ()))
+        order = getattr(question, "choice_order", "")
+        if order == "content":
+            choices.sort(key=lambda choice: str(choice.choice_text))
+        elif order == "random":
+            choices = shuffled(choices, seed, question.id)
+        return choices
+
+    def get_choices_list(self, question, seed=0):
+        return [
+            (choice.id, choice.choice_text)
+            for choice in self.get_choices(question, seed)
+        ]
+
+    def check_if_correct(self, question, guess):
+        if not isinstance(question, MCQuestion):
+            return question.check_if_correct(guess)
+        try:
+            choice_id = int(guess)
+        except (TypeError, ValueError):
+            return False
+        return (
+            choice_id in self.correct_choice_ids
+            and self.choice_by_id[choice_id].question_id == question.id
+        )
+
+    def answer_choice_to_string(self, guess):
+        try:
+            return self.choice_by_id[int(guess)].choice_text
+        except (KeyError, TypeError, ValueError):
+            return ""
+
+
+def quiz_version(quiz_id):
+    """
+    The version of a quiz's questions: ``Quiz.bundle_version``, which every
+    change to its questions or their choices moves forward (see
+    ``invalidate_bundles``). It lives in the database, so all processes
+    agree on it.
+    """
+    versions = Quiz.objects.filter(pk=quiz_id).values_list("bundle_version", flat=True)
+    return versions.first()
+
+
+def get_bundle(quiz_id):
+    """
+    The QuestionBundle of a quiz, from this process' memory, then the shared
+    cache, then the database. Copies are tagged with the quiz version, read
+    with one query, so an edit retires every copy in every process.
+    """
+    version = quiz_version(quiz_id)
+    bundle = _local_bundles.get(quiz_id)
+    if bundle is not None and bundle.version == version:
+        return bundle
+
+    key = f"quiz-bundle:{quiz_id}:{version}"
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = QuestionBundle.load(quiz_id, version)
+        cache.set(key, bundle, BUNDLE_TIMEOUT)
+    with _local_lock:
+        _local_bundles[quiz_id] = bundle
+    return bundle
+
+
+def touch_quizzes(quiz_ids):
+    """
+    Move the version of the given quizzes forward. ``timestamp`` is left
+    alone, the quiz list is ordered by it.
+    """
+    quiz_ids = set(quiz_ids)
+    if quiz_ids:
+        Quiz.objects.filter(pk__in=quiz_ids).update(
+            bundle_version=F("bundle_version") + 1
+        )
+
+
+def question_quiz_ids(question_ids):
+    return Question.quiz.through.objects.filter(
+        question_id__in=question_ids
+    ).values_list("quiz_id", flat=True)
+
+
+def invalidate_bundles(sender, instance, **kwargs):
+    """
+    Signal receiver: a change to a question or choice moves the version of
+    the quizzes using it. The bundle holds nothing of the quiz row itself.
+    Deletes are handled before the delete, while the links still exist.
+    """
+    if kwargs.get("raw"):
+        return
+    action = kwargs.get("action")
+    if action is not None:
+        # m2m_changed between questions and quizzes
+        if action not in ("post_add", "post_remove", "pre_clear"):
+            return
+        if isinstance(instance, Quiz):
+            touch_quizzes([instance.pk])
+        else:
+            touch_quizzes(
+                [*question_quiz_ids([instance.pk]), *(kwargs["pk_set"] or ())]
+            )
+    elif isinstance(instance, Choice):
+        touch_quizzes(question_quiz_ids([instance.question_id]))
+    elif isinstance(instance, Question):
+        touch_quizzes(question_quiz_ids([instance.pk]))
@@ -1,15 +1,17 @@
 from django import forms
-from django.forms.widgets import RadioSelect, Textarea
-from django.contrib.admin.widgets import FilteredSelectMultiple
+from django.forms.widgets import RadioSelect, SelectMultiple, Textarea
+from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.forms.models import inlineformset_factory
 from .models import Question, Quiz, MCQuestion, Choice
 
 
 class QuestionForm(forms.Form):
-    def __init__(self, question, *args, **kwargs):
+    def __init__(self, question, *args, choices=None, **kwargs):
         super(QuestionForm, self).__init__(*args, **kwargs)
-        choice_list = [x for x in question.get_choices_list()]
+        if choices is None:
+            choices = question.get_choices_list()
+        choice_list = [x for x in choices]
         self.fields["answers"] = forms.ChoiceField(
             choices=choice_list, widget=RadioSelect
         )
@@ -23,6 +25,34 @@ class EssayForm(forms.Form):
         )
 
 
+class QuestionPicker(SelectMultiple):
+    """
+    Multiple select that only renders the questions already picked. The rest
+    of the bank is searched page by page through the question_search view
+    (see quiz_form.html), so the form never loads every question.
+    """
+
+    def optgroups(self, name, value, attrs=None):
+        ids = [pk for pk in value if str(pk).isdigit()]
+        queryset = self.choices.queryset.filter(pk__in=ids).order_by("pk")
+        return [
+            (
+                None,
+                [
+                    self.create_option(
+                        name,
+                        str(question.pk),
+                        self.choices.field.label_from_instance(question),
+                        True,
+                        index,
+                    )
+                ],
+                index,
+            )
+            for index, question in enumerate(queryset)
+        ]
+
+
 class QuizAddForm(forms.ModelForm):
     class Meta:
         model = Quiz
@@ -32,15 +62,17 @@ class QuizAddForm(forms.ModelForm):
         queryset=Question.objects.all().select_subclasses(),
         required=False,
         label=_("Questions"),
-        widget=FilteredSelectMultiple(verbose_name=_("Questions"), is_stacked=False),
+        widget=QuestionPicker(
+            attrs={"data-search-url": reverse_lazy("question_search")}
+        ),
     )
 
     def __init__(self, *args, **kwargs):
         super(QuizAddForm, self).__init__(*args, **kwargs)
         if self.instance.pk:
-            self.fields["questions"].initial = (
-                self.instance.question_set.all().select_subclasses()
-            )
+            self.fields[
+                "questions"
+            ].initial = self.instance.question_set.all().select_subclasses()
 
     def save(self, commit=True):
         quiz = super(QuizAddForm, self).save(commit=False)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from quiz.models import Sitting
+
+
+class Command(BaseCommand):
+    help = "Close the timed quiz sittings whose deadline has passed"
+
+    def handle(self, *args, **options):
+        closed = Sitting.objects.complete_expired()
+        self.stdout.write(self.style.SUCCESS(f"Closed {len(closed)} sitting(s)."))
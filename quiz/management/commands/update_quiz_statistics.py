@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from quiz.analytics import update_statistics
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Fold newly completed sittings into the quiz item statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--quiz",
+            action="append",
+            type=int,
+            dest="quizzes",
+            help="Only update the quiz with this id (can be repeated).",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the statistics from every completed sitting.",
+        )
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.filter(sitting__complete=True).distinct()
+        if options["quizzes"]:
+            quizzes = quizzes.filter(pk__in=options["quizzes"])
+        count = 0
+        for quiz in quizzes.iterator():
+            update_statistics(quiz, full=options["full"])
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Updated {count} quiz(zes)."))
@@ -0,0 +1,179 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:37
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def parse_ids(value):
+    return [int(pk) for pk in (value or "").split(",") if pk.strip()]
+
+
+def copy_answers(apps, schema_editor):
+    """Move the comma-separated/JSON columns of each sitting into SittingAnswer rows"""
+    Sitting = apps.get_model("quiz", "Sitting")
+    SittingAnswer = apps.get_model("quiz", "SittingAnswer")
+    Question = apps.get_model("quiz", "Question")
+    existing = set(Question.objects.values_list("id", flat=True))
+
+    sittings = Sitting.objects.only(
+        "question_order",
+        "question_list",
+        "incorrect_questions",
+        "user_answers",
+        "start",
+        "end",
+    )
+    for sitting in sittings.iterator(chunk_size=500):
+        order = [pk for pk in parse_ids(sitting.question_order) if pk in existing]
+        remaining = set(parse_ids(sitting.question_list))
+        incorrect = set(parse_ids(sitting.incorrect_questions))
+        try:
+            user_answers = json.loads(sitting.user_answers or "{}")
+        except ValueError:
+            user_answers = {}
+
+        answers = []
+        for position, pk in enumerate(dict.fromkeys(order)):
+            answered = pk not in remaining or str(pk) in user_answers
+            answers.append(
+                SittingAnswer(
+                    sitting_id=sitting.pk,
+                    question_id=pk,
+                    position=position,
+                    answer=str(user_answers.get(str(pk), "")),
+                    correct=(pk not in incorrect) if answered else None,
+                    answered_at=(sitting.end or sitting.start) if answered else None,
+                )
+            )
+        SittingAnswer.objects.bulk_create(answers)
+        Sitting.objects.filter(pk=sitting.pk).update(question_count=len(answers))
+
+
+def join_ids(answers):
+    return "".join(f"{answer.question_id}," for answer in answers)
+
+
+def restore_answer_columns(apps, schema_editor):
+    Sitting = apps.get_model("quiz", "Sitting")
+    SittingAnswer = apps.get_model("quiz", "SittingAnswer")
+
+    for sitting in Sitting.objects.iterator(chunk_size=500):
+        answers = list(
+            SittingAnswer.objects.filter(sitting_id=sitting.pk).order_by("position")
+        )
+        sitting.question_order = join_ids(answers)
+        sitting.question_list = join_ids(a for a in answers if a.answered_at is None)
+        sitting.incorrect_questions = join_ids(a for a in answers if a.correct is False)
+        sitting.user_answers = json.dumps(
+            {str(a.question_id): a.answer for a in answers if a.answered_at}
+        )
+        sitting.save(
+            update_fields=[
+                "question_order",
+                "question_list",
+                "incorrect_questions",
+                "user_answers",
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0004_alter_essayquestion_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="question_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Number of questions"
+            ),
+        ),
+        migrations.CreateModel(
+            name="SittingAnswer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("answer", models.TextField(blank=True, default="")),
+                ("correct", models.BooleanField(null=True)),
+                ("answered_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="quiz.question"
+                    ),
+                ),
+                (
+                    "sitting",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="answers",
+                        to="quiz.sitting",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="sittinganswer",
+            index=models.Index(
+                fields=["sitting", "position"], name="quiz_sittin_sitting_f0531b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sittinganswer",
+            index=models.Index(
+                fields=["question", "correct"], name="quiz_sittin_questio_99f936_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="sittinganswer",
+            constraint=models.UniqueConstraint(
+                fields=("sitting", "question"), name="unique_sitting_question"
+            ),
+        ),
+        migrations.RunPython(copy_answers, restore_answer_columns),
+        # Give the old columns a default so the removal can be reversed on a
+        # table that has rows
+        migrations.AlterField(
+            model_name="sitting",
+            name="question_order",
+            field=models.CharField(
+                default="", max_length=1024, verbose_name="Question Order"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="sitting",
+            name="question_list",
+            field=models.CharField(
+                default="", max_length=1024, verbose_name="Question List"
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="incorrect_questions",
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="question_list",
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="question_order",
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="user_answers",
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0005_sitting_answers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="seed",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Fixes the order of the questions and choices of this sitting",
+                verbose_name="Shuffle seed",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0006_sitting_seed"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sitting",
+            index=models.Index(
+                fields=["complete", "quiz", "end"],
+                name="quiz_sittin_complet_7c85f7_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0007_sitting_marking_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuizStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sittings", models.PositiveIntegerField(default=0)),
+                ("score_sum", models.FloatField(default=0)),
+                ("score_squares", models.FloatField(default=0)),
+                ("histogram", models.JSONField(default=list)),
+                ("last_end", models.DateTimeField(blank=True, null=True)),
+                ("last_sitting_id", models.PositiveIntegerField(default=0)),
+                ("stale", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "quiz",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statistics",
+                        to="quiz.quiz",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Quiz statistics",
+                "verbose_name_plural": "Quiz statistics",
+            },
+        ),
+        migrations.CreateModel(
+            name="QuestionStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("correct", models.PositiveIntegerField(default=0)),
+                ("score_sum", models.FloatField(default=0)),
+                ("score_squares", models.FloatField(default=0)),
+                ("correct_score_sum", models.FloatField(default=0)),
+                ("choice_counts", models.JSONField(default=dict)),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="quiz.question"
+                    ),
+                ),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_statistics",
+                        to="quiz.quiz",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Question statistics",
+                "verbose_name_plural": "Question statistics",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="questionstatistics",
+            constraint=models.UniqueConstraint(
+                fields=("quiz", "question"), name="unique_quiz_question_statistics"
+            ),
+        ),
+    ]
@@ -0,0 +1,174 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:48
+
+import logging
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+logger = logging.getLogger(__name__)
+
+SCORE_ENTRY = re.compile(r"(?P<title>.+?),(?P<score>\d+),(?P<possible>\d+),")
+TITLE_FIELDS = ["title", "title_en", "title_fr", "title_es", "title_ru"]
+# Progress.update_score keyed entries by str(question.quiz), the label of
+# the question's related manager rather than a quiz title, so most scores
+# were recorded as one running total under this key.
+UNATTRIBUTED = "quiz.quiz.none"
+
+
+def sitting_totals(Sitting, user_id):
+    """{quiz id: (score, possible)} over the user's completed sittings"""
+    totals = {}
+    for quiz_id, score, possible in Sitting.objects.filter(
+        user_id=user_id, complete=True
+    ).values_list("quiz_id", "current_score", "question_count"):
+        total_score, total_possible = totals.get(quiz_id, (0, 0))
+        totals[quiz_id] = (total_score + max(score, 0), total_possible + possible)
+    return totals
+
+
+def copy_scores(apps, schema_editor):
+    """
+    Turn the "title,score,possible," entries of Progress.score into
+    QuizProgress rows. Entries under a quiz title are copied; the totals
+    kept under the related manager's label can't be split by quiz, so those
+    users' progress is rebuilt from their completed sittings instead.
+    Entries matching neither are counted and logged.
+    """
+    Progress = apps.get_model("quiz", "Progress")
+    Quiz = apps.get_model("quiz", "Quiz")
+    QuizProgress = apps.get_model("quiz", "QuizProgress")
+    Sitting = apps.get_model("quiz", "Sitting")
+
+    # Titled entries were keyed by str(quiz), the title in the active
+    # language; titles shared by several quizzes go to the oldest one.
+    quizzes = {}
+    for row in Quiz.objects.order_by("-pk").values("pk", *TITLE_FIELDS):
+        for field in TITLE_FIELDS:
+            if row[field]:
+                quizzes[row[field].lower()] = row["pk"]
+
+    rows = []
+    rebuilt = unparsed = 0
+    for progress in Progress.objects.only("user_id", "score").iterator(chunk_size=500):
+        totals, unattributed = {}, False
+        for entry in SCORE_ENTRY.finditer(progress.score or ""):
+            title = entry.group("title").lower()
+            if title == UNATTRIBUTED:
+                unattributed = True
+                continue
+            quiz_id = quizzes.get(title)
+            if quiz_id is None:
+                unparsed += 1
+                continue
+            score, possible = totals.get(quiz_id, (0, 0))
+            totals[quiz_id] = (
+                score + int(entry.group("score")),
+                possible + int(entry.group("possible")),
+            )
+        if unattributed:
+            rebuilt += 1
+            for quiz_id, scores in sitting_totals(Sitting, progress.user_id).items():
+                totals.setdefault(quiz_id, scores)
+        rows.extend(
+            QuizProgress(
+                user_id=progress.user_id,
+                quiz_id=quiz_id,
+                score=score,
+                possible=possible,
+            )
+            for quiz_id, (score, possible) in totals.items()
+        )
+    QuizProgress.objects.bulk_create(rows, batch_size=500)
+    if rebuilt or unparsed:
+        logger.warning(
+            "Quiz progress: %d user(s) rebuilt from completed sittings, "
+            "%d score entr(ies) matching no quiz skipped.",
+            rebuilt,
+            unparsed,
+        )
+
+
+def restore_scores(apps, schema_editor):
+    Progress = apps.get_model("quiz", "Progress")
+    QuizProgress = apps.get_model("quiz", "QuizProgress")
+
+    scores = {}
+    for row in QuizProgress.objects.values_list(
+        "user_id", "quiz__title", "score", "possible"
+    ).order_by("user_id", "pk"):
+        user_id, title, score, possible = row
+        scores[user_id] = scores.get(user_id, "") + f"{title},{score},{possible},"
+    for progress in Progress.objects.all():
+        progress.score = scores.get(progress.user_id, "")[:1024]
+        progress.save(update_fields=["score"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("quiz", "0008_item_statistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuizProgress",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.PositiveIntegerField(default=0, verbose_name="Score")),
+                (
+                    "possible",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Possible Score"
+                    ),
+                ),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="quiz.quiz",
+                        verbose_name="Quiz",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Quiz Progress",
+                "verbose_name_plural": "Quiz progress records",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="quizprogress",
+            constraint=models.UniqueConstraint(
+                fields=("user", "quiz"), name="unique_user_quiz_progress"
+            ),
+        ),
+        migrations.RunPython(copy_scores, restore_scores),
+        # A default lets the column be added back when migrating backwards
+        migrations.AlterField(
+            model_name="progress",
+            name="score",
+            field=models.CharField(default="", max_length=1024, verbose_name="Score"),
+        ),
+        migrations.RemoveField(
+            model_name="progress",
+            name="score",
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:51
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+
+
+def fill_results(apps, schema_editor):
+    """Store percent and passed on the completed sittings, as quiz.models.percent_correct does"""
+    Quiz = apps.get_model("quiz", "Quiz")
+    Sitting = apps.get_model("quiz", "Sitting")
+    count = F("question_count")
+    percent = Case(
+        When(question_count__lte=0, then=Value(0)),
+        default=Least(
+            Greatest((F("current_score") * 200 + count) / (count * 2), Value(0)),
+            Value(100),
+        ),
+        output_field=models.IntegerField(),
+    )
+    pass_mark = Quiz.objects.filter(pk=OuterRef("quiz_id")).values("pass_mark")
+    Sitting.objects.filter(complete=True).update(
+        percent=percent,
+        passed=Case(
+            When(GreaterThanOrEqual(percent, Subquery(pass_mark)), then=Value(True)),
+            default=Value(False),
+            output_field=models.BooleanField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0009_quiz_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="passed",
+            field=models.BooleanField(blank=True, null=True, verbose_name="Passed"),
+        ),
+        migrations.AddField(
+            model_name="sitting",
+            name="percent",
+            field=models.PositiveSmallIntegerField(
+                blank=True, null=True, verbose_name="Percent correct"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sitting",
+            index=models.Index(
+                fields=["user", "complete", "end"],
+                name="quiz_sittin_user_id_04191a_idx",
+            ),
+        ),
+        migrations.RunPython(fill_results, migrations.RunPython.noop),
+    ]
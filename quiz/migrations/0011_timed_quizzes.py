@@ -0,0 +1,34 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0010_sitting_result"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quiz",
+            name="duration",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Time allowed in minutes. Timed quizzes show every question at once and are closed automatically at the deadline.",
+                null=True,
+                verbose_name="Duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sitting",
+            name="deadline",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Deadline"),
+        ),
+        migrations.AddIndex(
+            model_name="sitting",
+            index=models.Index(
+                fields=["complete", "deadline"], name="quiz_sittin_complet_02d9da_idx"
+            ),
+        ),
+    ]
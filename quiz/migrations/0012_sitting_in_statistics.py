@@ -0,0 +1,44 @@
+# Generated by Django 4.0.8 on 2026-10-17 21:29
+
+from django.db import migrations, models
+
+
+def rebuild_statistics(apps, schema_editor):
+    # No sitting carries the flag yet, have the statistics rebuilt from all
+    QuizStatistics = apps.get_model("quiz", "QuizStatistics")
+    QuizStatistics.objects.update(stale=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0011_timed_quizzes"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="quizstatistics",
+            name="last_end",
+        ),
+        migrations.RemoveField(
+            model_name="quizstatistics",
+            name="last_sitting_id",
+        ),
+        migrations.AddField(
+            model_name="sitting",
+            name="in_statistics",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                verbose_name="Counted in the item statistics",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sitting",
+            index=models.Index(
+                fields=["quiz", "complete", "in_statistics"],
+                name="quiz_sittin_quiz_id_776e90_idx",
+            ),
+        ),
+        migrations.RunPython(rebuild_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-17 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_sitting_in_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='bundle_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,14 +1,25 @@
 import json
-import re
+import random
+import secrets
+from datetime import datetime, timedelta, timezone
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured, ValidationError
-from django.core.validators import (
-    MaxValueValidator,
-    validate_comma_separated_integer_list,
+from django.core.validators import MaxValueValidator
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
 )
-from django.db import models
-from django.db.models import Q
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
 from django.db.models.signals import pre_save
 from django.urls import reverse
 from django.utils.timezone import now
@@ -17,6 +28,7 @@ from django.dispatch import receiver
 from model_utils.managers import InheritanceManager
 
 from course.models import Course
+from search.models import SearchDocument
 from core.utils import unique_slug_generator
 
 CHOICE_ORDER_OPTIONS = (
@@ -33,16 +45,13 @@ CATEGORY_OPTIONS = (
 
 
 class QuizManager(models.Manager):
-    def search(self, query=None):
+    def search(self, query=None, language=None):
+        """Quizzes matching ``query`` in the active (or given) language"""
         queryset = self.get_queryset()
         if query:
-            or_lookup = (
-                Q(title__icontains=query)
-                | Q(description__icontains=query)
-                | Q(category__icontains=query)
-                | Q(slug__icontains=query)
+            queryset = queryset.filter(
+                pk__in=SearchDocument.objects.object_ids(self.model, query, language)
             )
-            queryset = queryset.filter(or_lookup).distinct()
         return queryset
 
 
@@ -86,6 +95,15 @@ class Quiz(models.Model):
         validators=[MaxValueValidator(100)],
         help_text=_("Percentage required to pass exam."),
     )
+    duration = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Duration"),
+        help_text=_(
+            "Time allowed in minutes. Timed quizzes show every question at once "
+            "and are closed automatically at the deadline."
+        ),
+    )
     draft = models.BooleanField(
         default=False,
         verbose_name=_("Draft"),
@@ -94,6 +112,8 @@ class Quiz(models.Model):
         ),
     )
     timestamp = models.DateTimeField(auto_now=True)
+    # Moved forward by quiz.bundle.touch_quizzes when the questions change
+    bundle_version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = QuizManager()
 
@@ -111,6 +131,13 @@ class Quiz(models.Model):
         if not (0 <= self.pass_mark <= 100):
             raise ValidationError(_("Pass mark must be between 0 and 100."))
 
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # A stale copy must not move the bundle version back
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "bundle_version"
+            ]
         super().save(*args, **kwargs)
 
     def get_questions(self):
@@ -130,21 +157,44 @@ def quiz_pre_save_receiver(sender, instance, **kwargs):
         instance.slug = unique_slug_generator(instance)
 
 
+EXAMS_PAGE_SIZE = 25
+# Answers of a timed sitting are still accepted this long after the deadline
+DEADLINE_GRACE = timedelta(seconds=15)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_exam_cursor(sitting):
+    microseconds = (sitting.end - EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}-{sitting.pk}"
+
+
+def decode_exam_cursor(cursor):
+    """(end, pk) from ``encode_exam_cursor``, None for a missing/bad cursor"""
+    try:
+        microseconds, pk = (int(part) for part in (cursor or "").split("-"))
+    except ValueError:
+        return None
+    try:
+        return EPOCH + timedelta(microseconds=microseconds), pk
+    except OverflowError:
+        return None
+
+
 class ProgressManager(models.Manager):
     def new_progress(self, user):
-        new_progress = self.create(user=user, score="")
+        new_progress = self.create(user=user)
         return new_progress
 
 
 class Progress(models.Model):
+    """
+    A user's quiz record. The per-quiz totals live in QuizProgress, one row
+    per user and quiz.
+    """
+
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
     )
-    score = models.CharField(
-        max_length=1024,
-        verbose_name=_("Score"),
-        validators=[validate_comma_separated_integer_list],
-    )
 
     objects = ProgressManager()
 
@@ -153,46 +203,183 @@ class Progress(models.Model):
         verbose_name_plural = _("User progress records")
 
     def list_all_cat_scores(self):
-        return {}  # Implement as needed
+        """
+        ``{category: [correct, incorrect, percent]}`` over the quizzes the
+        user has completed, grouped by quiz category.
+        """
+        labels = dict(CATEGORY_OPTIONS)
+        rows = (
+            QuizProgress.objects.filter(user_id=self.user_id)
+            .values("quiz__category")
+            .annotate(score=Sum("score"), possible=Sum("possible"))
+            .order_by("quiz__category")
+        )
+        scores = {}
+        for row in rows:
+            category = labels.get(row["quiz__category"], _("Uncategorised"))
+            score, possible = row["score"], row["possible"]
+            percent = int(round(score / possible * 100)) if possible else 0
+            scores[str(category)] = [score, possible - score, percent]
+        return scores
+
+    def quiz_scores(self):
+        return (
+            QuizProgress.objects.filter(user_id=self.user_id)
+            .select_related("quiz")
+            .order_by("quiz__title")
+        )
 
     def update_score(self, question, score_to_add=0, possible_to_add=0):
+        return self.add_quiz_score(question.quiz, score_to_add, possible_to_add)
+
+    def add_quiz_score(self, quiz, score_to_add=0, possible_to_add=0):
         if not isinstance(score_to_add, int) or not isinstance(possible_to_add, int):
             return _("Error"), _("Invalid score values.")
+        QuizProgress.objects.add(
+            self.user_id, quiz.pk, abs(score_to_add), abs(possible_to_add)
+        )
 
-        to_find = re.escape(str(question.quiz)) + r",(?P<score>\d+),(?P<possible>\d+),"
-        match = re.search(to_find, self.score, re.IGNORECASE)
+    def show_exams(self, course=None):
+        """
+        Completed sittings, newest first: the user's own, or everyone's for
+        a superuser; only those of ``course`` (an id) when given.
+        """
+        sittings = Sitting.objects.filter(complete=True, end__isnull=False)
+        if not self.user.is_superuser:
+            sittings = sittings.filter(user=self.user)
+        if course is not None:
+            sittings = sittings.filter(course_id=course)
+        return sittings.select_related("quiz", "course", "user").order_by("-end", "-pk")
+
+    def exams_page(self, cursor=None, course=None, size=EXAMS_PAGE_SIZE):
+        """
+        One page of ``show_exams`` starting after ``cursor``, and the cursor
+        of the next page (None on the last one). Pages are found by seeking
+        on (end, pk), so a page deep in the feed costs as little as the first.
+        """
+        exams = self.show_exams(course)
+        position = decode_exam_cursor(cursor)
+        if position is not None:
+            end, pk = position
+            exams = exams.filter(Q(end__lt=end) | Q(end=end, pk__lt=pk))
+        page = list(exams[: size + 1])
+        next_cursor = encode_exam_cursor(page[size - 1]) if len(page) > size else None
+        return page[:size], next_cursor
+
+
+class QuizProgressManager(models.Manager):
+    def add(self, user_id, quiz_id, score=0, possible=0):
+        """
+        Add to a user's totals for a quiz with a single UPDATE; the row is
+        created the first time, and a concurrent creation falls back to the
+        UPDATE again.
+        """
+        increments = {"score": F("score") + score, "possible": F("possible") + possible}
+        if self.filter(user_id=user_id, quiz_id=quiz_id).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                self.create(
+                    user_id=user_id, quiz_id=quiz_id, score=score, possible=possible
+                )
+        except IntegrityError:
+            self.filter(user_id=user_id, quiz_id=quiz_id).update(**increments)
 
-        if match:
-            updated_score = int(match.group("score")) + abs(score_to_add)
-            updated_possible = int(match.group("possible")) + abs(possible_to_add)
-            new_score = ",".join(
-                [str(question.quiz), str(updated_score), str(updated_possible), ""]
-            )
-            self.score = self.score.replace(match.group(), new_score)
-            self.save()
-        else:
-            self.score += ",".join(
-                [str(question.quiz), str(score_to_add), str(possible_to_add), ""]
-            )
-            self.save()
 
-    def show_exams(self):
-        if self.user.is_superuser:
-            return Sitting.objects.filter(complete=True).order_by("-end")
-        else:
-            return Sitting.objects.filter(user=self.user, complete=True).order_by(
-                "-end"
+class QuizProgress(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
+    )
+    quiz = models.ForeignKey(Quiz, verbose_name=_("Quiz"), on_delete=models.CASCADE)
+    score = models.PositiveIntegerField(default=0, verbose_name=_("Score"))
+    possible = models.PositiveIntegerField(default=0, verbose_name=_("Possible Score"))
+
+    objects = QuizProgressManager()
+
+    class Meta:
+        verbose_name = _("Quiz Progress")
+        verbose_name_plural = _("Quiz progress records")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "quiz"], name="unique_user_quiz_progress"
             )
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.quiz} {self.score}/{self.possible}"
+
+    @property
+    def percent(self):
+        if not self.possible:
+            return 0
+        return int(round(self.score / self.possible * 100))
+
+
+def percent_correct(score, question_count):
+    """Score as a whole percentage, rounded half up and kept within 0-100"""
+    if question_count <= 0:
+        return 0
+    percent = (200 * score + question_count) // (2 * question_count)
+    return min(max(percent, 0), 100)
+
+
+def percent_expression(score=F("current_score")):
+    """``percent_correct`` as a database expression over Sitting rows"""
+    count = F("question_count")
+    return Case(
+        When(question_count__lte=0, then=Value(0)),
+        default=Least(
+            Greatest((score * 200 + count) / (count * 2), Value(0)), Value(100)
+        ),
+        output_field=models.IntegerField(),
+    )
+
+
+def passed_expression(percent):
+    pass_mark = Quiz.objects.filter(pk=OuterRef("quiz_id")).values("pass_mark")
+    return Case(
+        When(GreaterThanOrEqual(percent, Subquery(pass_mark)), then=Value(True)),
+        default=Value(False),
+        output_field=models.BooleanField(),
+    )
+
+
+def correct_answers_count():
+    """Subquery counting the correct answers of the outer Sitting row"""
+    return (
+        SittingAnswer.objects.filter(sitting=OuterRef("pk"), correct=True)
+        .order_by()
+        .values("sitting")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+
+
+def update_statistics_after_commit(quiz_ids):
+    # quiz.analytics builds on these models
+    from .analytics import update_after_commit
+
+    update_after_commit(quiz_ids)
+
+
+def shuffled(items, *seed):
+    """
+    A copy of ``items`` in a random order that only depends on ``seed``, so
+    the same sitting always sees the same order.
+    """
+    items = list(items)
+    random.Random(":".join(str(part) for part in seed)).shuffle(items)
+    return items
 
 
 class SittingManager(models.Manager):
     def new_sitting(self, user, quiz, course):
+        seed = secrets.randbits(31)
+        question_ids = list(
+            quiz.question_set.order_by("id").values_list("id", flat=True)
+        )
         if quiz.random_order:
-            question_set = quiz.question_set.all().select_subclasses().order_by("?")
-        else:
-            question_set = quiz.question_set.all().select_subclasses()
-
-        question_ids = [item.id for item in question_set]
+            question_ids = shuffled(question_ids, seed)
         if not question_ids:
             raise ImproperlyConfigured(
                 _(
@@ -200,18 +387,21 @@ class SittingManager(models.Manager):
                 )
             )
 
-        questions = ",".join(map(str, question_ids)) + ","
-
         new_sitting = self.create(
             user=user,
             quiz=quiz,
             course=course,
-            question_order=questions,
-            question_list=questions,
-            incorrect_questions="",
+            question_count=len(question_ids),
+            seed=seed,
+            deadline=(now() + timedelta(minutes=quiz.duration))
+            if quiz.duration
+            else None,
             current_score=0,
             complete=False,
-            user_answers="{}",
+        )
+        SittingAnswer.objects.bulk_create(
+            SittingAnswer(sitting=new_sitting, question_id=question_id, position=n)
+            for n, question_id in enumerate(question_ids)
         )
         return new_sitting
 
@@ -222,7 +412,9 @@ class SittingManager(models.Manager):
         ):
             return False
         try:
-            sitting = self.get(user=user, quiz=quiz, course=course, complete=False)
+            sitting = self.select_related("quiz").get(
+                user=user, quiz=quiz, course=course, complete=False
+            )
         except Sitting.DoesNotExist:
             sitting = self.new_sitting(user, quiz, course)
         except Sitting.MultipleObjectsReturned:
@@ -231,8 +423,96 @@ class SittingManager(models.Manager):
             ).first()
         return sitting
 
+    def complete_expired(self, at=None):
+        """
+        Close every open sitting whose deadline has passed, in bulk:
+        unanswered questions count as incorrect and the score, percent and
+        pass flag are computed in the database. ``end`` is the time of the
+        sweep so the sittings are picked up by the item statistics. Returns
+        the ids of the sittings closed.
+        """
+        at = at or now()
+        with transaction.atomic():
+            expired = list(
+                self.select_for_update()
+                .filter(complete=False, deadline__lt=at - DEADLINE_GRACE)
+                .values_list("pk", flat=True)
+            )
+            if not expired:
+                return []
+            SittingAnswer.objects.filter(
+                sitting_id__in=expired, answered_at__isnull=True
+            ).update(correct=False)
+            score = Coalesce(Subquery(correct_answers_count()), 0)
+            self.filter(pk__in=expired).update(
+                complete=True,
+                end=at,
+                current_score=score,
+                percent=percent_expression(score),
+                passed=passed_expression(percent_expression(score)),
+            )
+            quiz_ids = set()
+            for user_id, quiz_id, score, count in self.filter(
+                pk__in=expired
+            ).values_list("user_id", "quiz_id", "current_score", "question_count"):
+                QuizProgress.objects.add(user_id, quiz_id, score, count)
+                quiz_ids.add(quiz_id)
+            update_statistics_after_commit(quiz_ids)
+        return expired
+
+    def mark_answers(self, marks):
+        """
+        Apply many marking decisions at once. ``marks`` is an iterable of
+        ``(sitting_id, question_id, correct)``; the answers are updated with
+        at most two UPDATEs and the scores of the completed sittings involved
+        are recomputed from their answer rows with one more, all in a single
+        transaction. The quizzes' item statistics are flagged for a rebuild.
+        Returns the number of answers updated.
+        """
+        # The last decision about an answer wins
+        decisions = {
+            (sitting_id, question_id): bool(correct)
+            for sitting_id, question_id, correct in marks
+        }
+        grouped = {True: {}, False: {}}
+        for (sitting_id, question_id), correct in decisions.items():
+            grouped[correct].setdefault(sitting_id, set()).add(question_id)
+        sitting_ids = set(grouped[True]) | set(grouped[False])
+        if not sitting_ids:
+            return 0
+
+        updated = 0
+        with transaction.atomic():
+            for correct, questions in grouped.items():
+                if not questions:
+                    continue
+                lookups = Q()
+                for sitting_id, question_ids in questions.items():
+                    lookups |= Q(sitting_id=sitting_id, question_id__in=question_ids)
+                updated += SittingAnswer.objects.filter(lookups).update(correct=correct)
+            score = Coalesce(Subquery(correct_answers_count()), 0)
+            self.filter(pk__in=sitting_ids, complete=True).update(
+                current_score=score,
+                percent=percent_expression(score),
+                passed=passed_expression(percent_expression(score)),
+            )
+            # Item statistics fold sittings in once; have them rebuilt
+            QuizStatistics.objects.filter(quiz__sitting__pk__in=sitting_ids).update(
+                stale=True
+            )
+            update_statistics_after_commit(
+                self.filter(pk__in=sitting_ids).values_list("quiz_id", flat=True)
+            )
+        return updated
+
 
 class Sitting(models.Model):
+    """
+    One attempt at a quiz. The questions, their order and the answers given
+    are stored as SittingAnswer rows; the properties below rebuild the old
+    comma-separated/JSON representations from them.
+    """
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
     )
@@ -240,91 +520,150 @@ class Sitting(models.Model):
     course = models.ForeignKey(
         Course, verbose_name=_("Course"), on_delete=models.CASCADE
     )
-    question_order = models.CharField(
-        max_length=1024,
-        verbose_name=_("Question Order"),
-        validators=[validate_comma_separated_integer_list],
+    question_count = models.PositiveIntegerField(
+        default=0, verbose_name=_("Number of questions")
     )
-    question_list = models.CharField(
-        max_length=1024,
-        verbose_name=_("Question List"),
-        validators=[validate_comma_separated_integer_list],
-    )
-    incorrect_questions = models.CharField(
-        max_length=1024,
-        blank=True,
-        verbose_name=_("Incorrect questions"),
-        validators=[validate_comma_separated_integer_list],
+    seed = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Shuffle seed"),
+        help_text=_("Fixes the order of the questions and choices of this sitting"),
     )
     current_score = models.IntegerField(verbose_name=_("Current Score"))
     complete = models.BooleanField(default=False, verbose_name=_("Complete"))
-    user_answers = models.TextField(
-        blank=True, default="{}", verbose_name=_("User Answers")
-    )
     start = models.DateTimeField(auto_now_add=True, verbose_name=_("Start"))
     end = models.DateTimeField(null=True, blank=True, verbose_name=_("End"))
+    deadline = models.DateTimeField(null=True, blank=True, verbose_name=_("Deadline"))
+    percent = models.PositiveSmallIntegerField(
+        null=True, blank=True, verbose_name=_("Percent correct")
+    )
+    passed = models.BooleanField(null=True, blank=True, verbose_name=_("Passed"))
+    in_statistics = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name=_("Counted in the item statistics"),
+    )
 
     objects = SittingManager()
 
     class Meta:
         permissions = (("view_sittings", _("Can see completed exams.")),)
-
-    def get_first_question(self):
-        if not self.question_list:
+        indexes = [
+            models.Index(fields=["complete", "quiz", "end"]),
+            models.Index(fields=["user", "complete", "end"]),
+            models.Index(fields=["complete", "deadline"]),
+            models.Index(fields=["quiz", "complete", "in_statistics"]),
+        ]
+
+    def _answers(self):
+        """The sitting's answer rows in question order, loaded once"""
+        if "_answer_rows" not in self.__dict__:
+            self._answer_rows = list(self.answers.order_by("position"))
+        return self._answer_rows
+
+    def _reset_answers(self):
+        self.__dict__.pop("_answer_rows", None)
+
+    def refresh_from_db(self, *args, **kwargs):
+        self._reset_answers()
+        super().refresh_from_db(*args, **kwargs)
+
+    def get_first_question(self, bundle=None):
+        """
+        The next unanswered question. With a QuestionBundle of the quiz the
+        question comes from it and only its id is read from the database.
+        """
+        if bundle is None:
+            question = (
+                Question.objects.filter(
+                    sittinganswer__sitting=self,
+                    sittinganswer__answered_at__isnull=True,
+                )
+                .order_by("sittinganswer__position")
+                .select_subclasses()
+                .first()
+            )
+            return question or False
+        question_id = (
+            self.answers.filter(answered_at__isnull=True)
+            .order_by("position")
+            .values_list("question_id", flat=True)
+            .first()
+        )
+        if question_id is None:
             return False
-        first_question_id = int(self.question_list.split(",", 1)[0])
-        return Question.objects.get_subclass(id=first_question_id)
+        return bundle.question(question_id) or Question.objects.get_subclass(
+            id=question_id
+        )
 
     def remove_first_question(self):
-        if not self.question_list:
-            return
-        _, remaining_questions = self.question_list.split(",", 1)
-        self.question_list = remaining_questions
-        self.save()
+        question = self.get_first_question()
+        if question:
+            self.answers.filter(question=question).update(answered_at=now())
+            self._reset_answers()
+
+    def _set_result(self):
+        """Refresh the stored percent and pass flag from current_score"""
+        self.percent = percent_correct(self.current_score, self.question_count)
+        self.passed = self.percent >= self.quiz.pass_mark
 
     def add_to_score(self, points):
         self.current_score += int(points)
-        self.save()
+        self._set_result()
+        self.save(update_fields=["current_score", "percent", "passed"])
 
     @property
     def get_current_score(self):
         return self.current_score
 
     def _question_ids(self):
-        return [int(q) for q in self.question_order.split(",") if q]
+        return [answer.question_id for answer in self._answers()]
 
     @property
-    def get_percent_correct(self):
-        total_questions = len(self._question_ids())
-        if total_questions == 0:
-            return 0
-        percent = (self.current_score / total_questions) * 100
-        return min(max(int(round(percent)), 0), 100)
+    def question_order(self):
+        return "".join(f"{pk}," for pk in self._question_ids())
 
-    def mark_quiz_complete(self):
-        self.complete = True
-        self.end = now()
-        self.save()
+    @property
+    def question_list(self):
+        return "".join(
+            f"{answer.question_id},"
+            for answer in self._answers()
+            if answer.answered_at is None
+        )
+
+    @property
+    def incorrect_questions(self):
+        return "".join(f"{pk}," for pk in self.get_incorrect_questions)
+
+    @property
+    def user_answers(self):
+        return json.dumps(
+            {
+                str(answer.question_id): answer.answer
+                for answer in self._answers()
+                if answer.answered_at is not None
+            }
+        )
+
+    @property
+    def get_percent_correct(self):
+        return percent_correct(self.current_score, self.question_count)
 
     def add_incorrect_question(self, question):
-        incorrect_ids = self.get_incorrect_questions
-        incorrect_ids.append(question.id)
-        self.incorrect_questions = ",".join(map(str, incorrect_ids)) + ","
+        self.answers.filter(question=question).update(correct=False)
+        self._reset_answers()
         if self.complete:
             self.add_to_score(-1)
-        self.save()
 
     @property
     def get_incorrect_questions(self):
-        return [int(q) for q in self.incorrect_questions.split(",") if q]
+        return [
+            answer.question_id for answer in self._answers() if answer.correct is False
+        ]
 
     def remove_incorrect_question(self, question):
-        incorrect_ids = self.get_incorrect_questions
-        if question.id in incorrect_ids:
-            incorrect_ids.remove(question.id)
-            self.incorrect_questions = ",".join(map(str, incorrect_ids)) + ","
+        if self.answers.filter(question=question, correct=False).update(correct=True):
+            self._reset_answers()
             self.add_to_score(1)
-            self.save()
 
     @property
     def check_if_passed(self):
@@ -337,22 +676,112 @@ class Sitting(models.Model):
         else:
             return _("You failed this quiz, try again.")
 
+    def record_answer(self, question, guess, is_correct):
+        """
+        Store the answer to ``question`` with a single UPDATE of its answer
+        row. The score, percent, pass flag, completion and end time are
+        written on the sitting once, with the last answer. Returns True once
+        every question has been answered.
+        """
+        self.answers.filter(question_id=question.id).update(
+            answer=guess, correct=is_correct, answered_at=now()
+        )
+        self._reset_answers()
+        if self.answers.filter(answered_at__isnull=True).exists():
+            return False
+
+        self.current_score = self.answers.filter(correct=True).count()
+        self.complete = True
+        self.end = now()
+        self._set_result()
+        self.save(
+            update_fields=["current_score", "complete", "end", "percent", "passed"]
+        )
+        update_statistics_after_commit([self.quiz_id])
+        return True
+
+    def is_expired(self, at=None):
+        """Past the deadline, give or take DEADLINE_GRACE for answers in flight"""
+        if self.deadline is None:
+            return False
+        return (at or now()) > self.deadline + DEADLINE_GRACE
+
+    def seconds_left(self):
+        if self.deadline is None:
+            return None
+        return max(int((self.deadline - now()).total_seconds()), 0)
+
+    def save_answers(self, answers, bundle):
+        """
+        Store a batch of ``{question_id: guess}`` answers of a timed sitting
+        with one SELECT and one bulk UPDATE; answers can be changed until the
+        sitting is finished. Outside a timed sitting an answer, once given,
+        is kept. Questions not in the sitting are ignored. Returns how many
+        answers were saved.
+        """
+        rows = self.answers.filter(question_id__in=list(answers))
+        if self.deadline is None:
+            rows = rows.filter(answered_at__isnull=True)
+        rows = {row.question_id: row for row in rows}
+        saved_at = now()
+        for question_id, row in rows.items():
+            question = bundle.question(question_id) or Question.objects.get_subclass(
+                id=question_id
+            )
+            guess = str(answers[question_id])
+            row.answer = guess
+            row.correct = bundle.check_if_correct(question, guess)
+            row.answered_at = saved_at
+        SittingAnswer.objects.bulk_update(
+            rows.values(), ["answer", "correct", "answered_at"]
+        )
+        self._reset_answers()
+        return len(rows)
+
+    def finish(self):
+        """
+        Close the sitting, counting unanswered questions as incorrect.
+        Returns False when it had already been closed, e.g. by the sweep.
+        """
+        with transaction.atomic():
+            self.answers.filter(answered_at__isnull=True).update(correct=False)
+            self.current_score = self.answers.filter(correct=True).count()
+            self.complete = True
+            self.end = now()
+            self._set_result()
+            closed = Sitting.objects.filter(pk=self.pk, complete=False).update(
+                current_score=self.current_score,
+                complete=True,
+                end=self.end,
+                percent=self.percent,
+                passed=self.passed,
+            )
+            if closed:
+                update_statistics_after_commit([self.quiz_id])
+        if not closed:
+            self.refresh_from_db()
+        self._reset_answers()
+        return bool(closed)
+
     def add_user_answer(self, question, guess):
-        user_answers = json.loads(self.user_answers)
-        user_answers[str(question.id)] = guess
-        self.user_answers = json.dumps(user_answers)
-        self.save()
+        self.answers.filter(question_id=question.id).update(
+            answer=guess, answered_at=now()
+        )
+        self._reset_answers()
 
     def get_questions(self, with_answers=False):
-        question_ids = self._question_ids()
+        answers = {answer.question_id: answer for answer in self._answers()}
+        question_ids = list(answers)
         questions = sorted(
             self.quiz.question_set.filter(id__in=question_ids).select_subclasses(),
-            key=lambda q: question_ids.index(q.id),
+            key=lambda q: answers[q.id].position,
         )
         if with_answers:
-            user_answers = json.loads(self.user_answers)
             for question in questions:
-                question.user_answer = user_answers.get(str(question.id))
+                answer = answers[question.id]
+                question.user_answer = (
+                    answer.answer if answer.answered_at is not None else None
+                )
         return questions
 
     @property
@@ -361,12 +790,11 @@ class Sitting(models.Model):
 
     @property
     def get_max_score(self):
-        return len(self._question_ids())
+        return self.question_count
 
     def progress(self):
-        answered = len(json.loads(self.user_answers))
-        total = self.get_max_score
-        return answered, total
+        answered = self.answers.filter(answered_at__isnull=False).count()
+        return answered, self.question_count
 
 
 class Question(models.Model):
@@ -421,19 +849,19 @@ class MCQuestion(Question):
         except (Choice.DoesNotExist, ValueError):
             return False
 
-    def order_choices(self, queryset):
+    def order_choices(self, queryset, seed=0):
         if self.choice_order == "content":
             return queryset.order_by("choice_text")
         elif self.choice_order == "random":
-            return queryset.order_by("?")
+            return shuffled(queryset.order_by("id"), seed, self.id)
         else:
             return queryset
 
-    def get_choices(self):
-        return self.order_choices(Choice.objects.filter(question=self))
+    def get_choices(self, seed=0):
+        return self.order_choices(Choice.objects.filter(question=self), seed)
 
-    def get_choices_list(self):
-        return [(choice.id, choice.choice_text) for choice in self.get_choices()]
+    def get_choices_list(self, seed=0):
+        return [(choice.id, choice.choice_text) for choice in self.get_choices(seed)]
 
     def answer_choice_to_string(self, guess):
         try:
@@ -481,3 +909,130 @@ class EssayQuestion(Question):
 
     def answer_choice_to_string(self, guess):
         return str(guess)
+
+
+class SittingAnswer(models.Model):
+    """A question of a sitting, in the order it is asked, and the answer given"""
+
+    sitting = models.ForeignKey(
+        Sitting, related_name="answers", on_delete=models.CASCADE
+    )
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    position = models.PositiveIntegerField()
+    answer = models.TextField(blank=True, default="")
+    correct = models.BooleanField(null=True)
+    answered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sitting", "question"], name="unique_sitting_question"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["sitting", "position"]),
+            models.Index(fields=["question", "correct"]),
+        ]
+
+    def __str__(self):
+        return f"{self.sitting_id}: {self.question_id}"
+
+
+class QuizStatistics(models.Model):
+    """
+    Running totals over the completed sittings of a quiz, see quiz.analytics.
+    Scores are the fraction of questions answered correctly. Sittings folded
+    in are flagged ``in_statistics``; ``stale`` asks for a rebuild after
+    sittings were marked again.
+    """
+
+    quiz = models.OneToOneField(
+        Quiz, on_delete=models.CASCADE, related_name="statistics"
+    )
+    sittings = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_squares = models.FloatField(default=0)
+    histogram = models.JSONField(default=list)
+    stale = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Quiz statistics")
+        verbose_name_plural = _("Quiz statistics")
+
+    def __str__(self):
+        return str(self.quiz)
+
+    @property
+    def mean(self):
+        if not self.sittings:
+            return None
+        return self.score_sum / self.sittings
+
+    @property
+    def standard_deviation(self):
+        if not self.sittings:
+            return None
+        return max(self.score_squares / self.sittings - self.mean**2, 0) ** 0.5
+
+
+class QuestionStatistics(models.Model):
+    """
+    Running totals for one question of a quiz. ``score_*`` sum the sitting
+    scores of everyone who answered it, ``correct_score_sum`` only of those
+    who got it right; together they give the point-biserial correlation.
+    ``choice_counts`` maps choice ids to how often they were picked.
+    """
+
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name="question_statistics"
+    )
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_squares = models.FloatField(default=0)
+    correct_score_sum = models.FloatField(default=0)
+    choice_counts = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name = _("Question statistics")
+        verbose_name_plural = _("Question statistics")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["quiz", "question"], name="unique_quiz_question_statistics"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.quiz_id}: {self.question_id}"
+
+    @property
+    def p_value(self):
+        """Share of the attempts answered correctly"""
+        if not self.attempts:
+            return None
+        return self.correct / self.attempts
+
+    @property
+    def discrimination(self):
+        """
+        Point-biserial correlation between answering this question correctly
+        and the sitting score; None when everyone (or no one) got it right.
+        """
+        n, right = self.attempts, self.correct
+        if not right or right == n:
+            return None
+        mean = self.score_sum / n
+        variance = self.score_squares / n - mean**2
+        if variance <= 1e-12:
+            return None
+        mean_right = self.correct_score_sum / right
+        mean_wrong = (self.score_sum - self.correct_score_sum) / (n - right)
+        p = right / n
+        return (mean_right - mean_wrong) / variance**0.5 * (p * (1 - p)) ** 0.5
+
+    def choice_rate(self, choice_id):
+        if not self.attempts:
+            return None
+        return self.choice_counts.get(str(choice_id), 0) / self.attempts
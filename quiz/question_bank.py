@@ -0,0 +1,408 @@
+"""
+Question bank import and export: multiple choice questions with their
+choices, as JSON, CSV or a GIFT subset.
+
+Imports are written with a handful of bulk inserts (questions, their
+MCQuestion rows, choices and quiz links) instead of one form save per
+question. Exports are streamed a chunk of questions at a time.
+"""
+import csv
+import io
+import json
+import os
+import re
+import string
+
+from django.db import connections, router, transaction
+
+from .bundle import touch_quizzes
+from .models import CHOICE_ORDER_OPTIONS, Choice, MCQuestion, Question
+
+CHUNK_SIZE = 500
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+MAX_IMPORT_QUESTIONS = 5000
+CSV_COLUMNS = ["content", "explanation", "choice_order", "correct"]
+CHOICE_ORDERS = {"", *(value for value, _ in CHOICE_ORDER_OPTIONS)}
+LETTERS = string.ascii_uppercase
+
+
+class QuestionImportReport:
+    def __init__(self):
+        self.questions = 0
+        self.choices = 0
+        self.errors = {}
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def add_error(self, key, message):
+        self.errors.setdefault(str(key), []).append(message)
+
+
+def bank_item(content, choices, explanation="", choice_order=""):
+    """One question of a bank: ``choices`` are ``(text, correct)`` pairs"""
+    return {
+        "content": str(content or "").strip(),
+        "explanation": str(explanation or "").strip(),
+        "choice_order": str(choice_order or "").strip().lower(),
+        "choices": [
+            (str(text or "").strip(), bool(correct)) for text, correct in choices
+        ],
+    }
+
+
+def clean_item(item):
+    """The problems with a bank item, an empty list when it can be imported"""
+    errors = []
+    if not item["content"]:
+        errors.append("The question has no text.")
+    elif len(item["content"]) > 1000:
+        errors.append("The question is longer than 1000 characters.")
+    if len(item["explanation"]) > 2000:
+        errors.append("The explanation is longer than 2000 characters.")
+    if item["choice_order"] not in CHOICE_ORDERS:
+        errors.append(f"Unknown choice order: {item['choice_order']}.")
+    choices = item["choices"]
+    if len(choices) < 2:
+        errors.append("A question needs at least two choices.")
+    if any(not text or len(text) > 1000 for text, _ in choices):
+        errors.append("Choices must have between 1 and 1000 characters.")
+    if choices and not any(correct for _, correct in choices):
+        errors.append("At least one choice must be correct.")
+    return errors
+
+
+# ########################################################
+# Readers
+# ########################################################
+
+
+def read_json(text):
+    try:
+        items = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise ValueError("The JSON question bank must be a list of questions.")
+    for item in items:
+        if not isinstance(item, dict):
+            yield bank_item("", [])
+            continue
+        choices = item.get("choices") or []
+        yield bank_item(
+            item.get("content"),
+            [
+                (choice.get("text"), choice.get("correct"))
+                for choice in choices
+                if isinstance(choice, dict)
+            ],
+            item.get("explanation"),
+            item.get("choice_order"),
+        )
+
+
+def _letters(value):
+    return {letter for letter in re.split(r"[\s,;]+", value.upper()) if letter}
+
+
+def read_csv(text):
+    """
+    One question per row: the CSV_COLUMNS, then one column per choice. The
+    ``correct`` column holds the letters of the correct choices, like ``A``
+    or ``A,C``.
+    """
+    rows = csv.reader(io.StringIO(text, newline=""))
+    header = [column.strip().lower() for column in next(rows, [])]
+    if header[: len(CSV_COLUMNS)] != CSV_COLUMNS:
+        raise ValueError(
+            "The CSV header must start with: " + ", ".join(CSV_COLUMNS) + "."
+        )
+    for row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        row = row + [""] * (len(CSV_COLUMNS) - len(row))
+        content, explanation, choice_order, correct = row[: len(CSV_COLUMNS)]
+        correct = _letters(correct)
+        texts = [cell for cell in row[len(CSV_COLUMNS) :] if cell.strip()]
+        yield bank_item(
+            content,
+            [(text, LETTERS[n] in correct) for n, text in enumerate(texts[:26])],
+            explanation,
+            choice_order,
+        )
+
+
+# GIFT escapes (\= \~ \# \{ \} \:) are swapped for placeholders while parsing
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x01")
+_GIFT_TRUE = {"T", "TRUE"}
+_GIFT_FALSE = {"F", "FALSE"}
+
+
+def _hide_escapes(text):
+    # "\n" stands for a line break, which must not end the question's block
+    return _ESCAPE.sub(
+        lambda m: f"\x00{10 if m.group(1) == 'n' else ord(m.group(1))}\x01", text
+    )
+
+
+def _restore_escapes(text):
+    return _PLACEHOLDER.sub(lambda m: chr(int(m.group(1))), text).strip()
+
+
+def _gift_answers(body):
+    explanation = ""
+    if "####" in body:
+        body, explanation = body.split("####", 1)
+    body = body.strip()
+    if body.upper() in _GIFT_TRUE | _GIFT_FALSE:
+        truth = body.upper() in _GIFT_TRUE
+        return [("True", truth), ("False", not truth)], explanation
+
+    choices = []
+    for mark, answer in re.findall(r"([=~])([^=~]*)", body):
+        answer = answer.split("#", 1)[0].strip()
+        weight = re.match(r"%(-?\d+(?:\.\d+)?)%", answer)
+        correct = mark == "="
+        if weight:
+            answer = answer[weight.end() :].strip()
+            correct = float(weight.group(1)) > 0
+        if "->" in answer:
+            raise ValueError("Matching questions are not supported.")
+        choices.append((answer, correct))
+    return choices, explanation
+
+
+def read_gift(text):
+    """
+    Multiple choice and true/false questions in GIFT, one per block of
+    lines: ``::title:: text {=right ~wrong ~wrong ####explanation}``. Titles
+    and per-answer feedback are dropped; a missing word question keeps a
+    blank where its answers were.
+    """
+    text = _hide_escapes(text.replace("\r\n", "\n"))
+    lines = [line for line in text.split("\n") if not line.lstrip().startswith("//")]
+    blocks = re.split(r"\n\s*\n", "\n".join(lines))
+    for block in blocks:
+        block = re.sub(r"^\s*::.*?::", "", block, flags=re.DOTALL).strip()
+        if not block:
+            continue
+        block = re.sub(r"^\[\w+\]", "", block)
+        start, end = block.find("{"), block.rfind("}")
+        if start < 0 or end < start:
+            yield bank_item(_restore_escapes(block), [])
+            continue
+        try:
+            choices, explanation = _gift_answers(block[start + 1 : end])
+        except ValueError:
+            choices, explanation = [], ""
+        before, after = block[:start].strip(), block[end + 1 :].strip()
+        content = f"{before} _____ {after}" if after else before
+        yield bank_item(
+            _restore_escapes(content),
+            [(_restore_escapes(answer), correct) for answer, correct in choices],
+            _restore_escapes(explanation),
+        )
+
+
+READERS = {".json": read_json, ".csv": read_csv, ".gift": read_gift, ".txt": read_gift}
+
+
+def read_question_bank(file):
+    """Yield one bank item per question of an uploaded JSON, CSV or GIFT file"""
+    extension = os.path.splitext(file.name)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported question bank format: {extension or file.name}")
+    if file.size > MAX_IMPORT_BYTES:
+        raise ValueError(
+            f"Question banks are limited to {MAX_IMPORT_BYTES // 1024 // 1024}MB."
+        )
+    try:
+        text = file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("The question bank must be UTF-8 text.")
+    return READERS[extension](text)
+
+
+# ########################################################
+# Import
+# ########################################################
+
+
+def _create_questions(items, using):
+    questions = [
+        Question(content=item["content"], explanation=item["explanation"])
+        for item in items
+    ]
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        Question.objects.using(using).bulk_create(questions, batch_size=CHUNK_SIZE)
+    else:
+        # The children need the parents' ids, which only this backend's
+        # bulk insert can't hand back
+        for question in questions:
+            question.save(using=using)
+
+    # bulk_create refuses multi-table children. Their Question rows exist
+    # now, so the MCQuestion table's own columns go in with one batched
+    # statement.
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = [field.column for field in MCQuestion._meta.local_concrete_fields]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(MCQuestion._meta.db_table),
+        ", ".join(quote(column) for column in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            sql,
+            [
+                (question.pk, item["choice_order"])
+                for question, item in zip(questions, items)
+            ],
+        )
+    return questions
+
+
+def import_questions(items, quizzes=(), max_questions=MAX_IMPORT_QUESTIONS):
+    """
+    Create a multiple choice question with its choices for each valid bank
+    item and add them all to ``quizzes``. Invalid items are reported by
+    their position and skipped. Returns a QuestionImportReport.
+    """
+    report = QuestionImportReport()
+    valid = []
+    for n, item in enumerate(items, start=1):
+        if n > max_questions:
+            report.add_error(
+                f"question {n}", f"Only {max_questions} questions can be imported."
+            )
+            break
+        errors = clean_item(item)
+        for error in errors:
+            report.add_error(f"question {n}", error)
+        if not errors:
+            valid.append(item)
+    if not valid:
+        return report
+
+    using = router.db_for_write(Question)
+    with transaction.atomic(using=using):
+        questions = _create_questions(valid, using)
+        choices = [
+            Choice(question_id=question.pk, choice_text=text, correct=correct)
+            for question, item in zip(questions, valid)
+            for text, correct in item["choices"]
+        ]
+        Choice.objects.using(using).bulk_create(choices, batch_size=CHUNK_SIZE)
+        Question.quiz.through.objects.using(using).bulk_create(
+            [
+                Question.quiz.through(question_id=question.pk, quiz_id=quiz.pk)
+                for quiz in quizzes
+                for question in questions
+            ],
+            batch_size=CHUNK_SIZE,
+        )
+    # Bulk inserts send no signals, so retire the quizzes' bundles here
+    touch_quizzes(quiz.pk for quiz in quizzes)
+    report.questions, report.choices = len(questions), len(choices)
+    return report
+
+
+# ########################################################
+# Export
+# ########################################################
+
+
+def bank_items(questions, chunk_size=CHUNK_SIZE):
+    """
+    Yield the bank item of every multiple choice question in ``questions``,
+    walking them by id one chunk at a time with a query for the choices of
+    each chunk.
+    """
+    questions = questions.order_by("pk").values_list(
+        "pk", "content", "explanation", "choice_order"
+    )
+    last = 0
+    while True:
+        chunk = list(questions.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            break
+        last = chunk[-1][0]
+        choices = {}
+        for question_id, text, correct in (
+            Choice.objects.filter(question_id__in=[row[0] for row in chunk])
+            .order_by("id")
+            .values_list("question_id", "choice_text", "correct")
+        ):
+            choices.setdefault(question_id, []).append((text, correct))
+        for pk, content, explanation, choice_order in chunk:
+            yield bank_item(content, choices.get(pk, []), explanation, choice_order)
+
+
+def _json_item(item):
+    return {
+        "content": item["content"],
+        "explanation": item["explanation"],
+        "choice_order": item["choice_order"],
+        "choices": [
+            {"text": text, "correct": correct} for text, correct in item["choices"]
+        ],
+    }
+
+
+def export_json(items):
+    yield "["
+    for n, item in enumerate(items):
+        yield ("," if n else "") + "\n" + json.dumps(_json_item(item))
+    yield "\n]\n"
+
+
+class Echo:
+    """A file-like object that hands back what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS + ["choices"])
+    for item in items:
+        choices = item["choices"][: len(LETTERS)]
+        correct = ",".join(LETTERS[n] for n, (_, right) in enumerate(choices) if right)
+        yield writer.writerow(
+            [item["content"], item["explanation"], item["choice_order"], correct]
+            + [text for text, _ in choices]
+        )
+
+
+def gift_escape(text):
+    return re.sub(r"([\\~=#{}:])", r"\\\1", text).replace("\n", "\\n")
+
+
+def export_gift(items):
+    for item in items:
+        answers = " ".join(
+            ("=" if correct else "~") + gift_escape(text)
+            for text, correct in item["choices"]
+        )
+        if item["explanation"]:
+            answers += " ####" + gift_escape(item["explanation"])
+        yield f"{gift_escape(item['content'])} {{{answers}}}\n\n"
+
+
+WRITERS = {
+    "json": (export_json, "application/json"),
+    "csv": (export_csv, "text/csv"),
+    "gift": (export_gift, "text/plain"),
+}
+
+
+def export_question_bank(questions, format):
+    """The chunks of a ``format`` export of ``questions``, and its content type"""
+    if format not in WRITERS:
+        raise ValueError(f"Unsupported question bank format: {format}")
+    writer, content_type = WRITERS[format]
+    return writer(bank_items(questions)), content_type
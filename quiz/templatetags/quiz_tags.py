@@ -9,7 +9,8 @@ def correct_answer_for_all(context, question):
     processes the correct answer based on a given question object
     if the answer is incorrect, informs the user
     """
-    answers = question.get_choices()
+    sitting = context.get("sitting")
+    answers = question.get_choices(sitting.seed if sitting else 0)
     incorrect_list = context.get("incorrect_questions", [])
     if question.id in incorrect_list:
         user_was_incorrect = True
@@ -1,3 +1,591 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from accounts.models import User
+from course.models import Course, Program
+from .analytics import update_statistics
+from .bundle import _local_bundles, get_bundle
+from .forms import QuizAddForm
+from .models import (
+    Choice,
+    MCQuestion,
+    Progress,
+    QuestionStatistics,
+    Quiz,
+    QuizProgress,
+    QuizStatistics,
+    Sitting,
+    shuffled,
+)
+from .question_bank import (
+    bank_item,
+    export_question_bank,
+    import_questions,
+    read_gift,
+    read_question_bank,
+)
+from .views import (
+    marking_queryset,
+    question_search,
+    quiz_autosave,
+    quiz_marking_batch,
+)
+
+
+class QuizTestMixin:
+    def setUp(self):
+        # Versions restart with the rolled back quiz ids, so do the bundles
+        cache.clear()
+        _local_bundles.clear()
+        program = Program.objects.create(title="Computer Science")
+        self.course = Course.objects.create(
+            title="Algorithms",
+            code="CS101",
+            program=program,
+            level="BEGINNER",
+            semester="First",
+        )
+        self.quiz = Quiz.objects.create(course=self.course, title="Week 1")
+        self.user = User.objects.create(username="student1")
+        self.questions = []
+        for n in range(3):
+            question = MCQuestion.objects.create(content=f"Question {n}")
+            question.quiz.add(self.quiz)
+            Choice.objects.create(question=question, choice_text="Yes", correct=True)
+            Choice.objects.create(question=question, choice_text="No", correct=False)
+            self.questions.append(question)
+
+    def new_sitting(self):
+        return Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+
+
+class RecordAnswerTestCase(QuizTestMixin, TestCase):
+    def test_one_update_per_answer(self):
+        sitting = self.new_sitting()
+        question = sitting.get_first_question()
+
+        with CaptureQueriesContext(connection) as queries:
+            finished = sitting.record_answer(question, "1", is_correct=True)
+
+        self.assertFalse(finished)
+        writes = [q["sql"] for q in queries if not q["sql"].startswith("SELECT")]
+        self.assertEqual(len(writes), 1)
+        self.assertIn("quiz_sittinganswer", writes[0])
+
+    def test_state_after_last_answer(self):
+        sitting = self.new_sitting()
+        outcomes = [True, False, True]
+        for outcome in outcomes:
+            question = sitting.get_first_question()
+            finished = sitting.record_answer(question, "7", is_correct=outcome)
+
+        self.assertTrue(finished)
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertIsNotNone(sitting.end)
+        self.assertEqual(sitting.question_list, "")
+        self.assertEqual(sitting.answers.filter(correct=True).count(), 2)
+        self.assertEqual(sitting.current_score, 2)
+        self.assertEqual(sitting.get_incorrect_questions, [sitting._question_ids()[1]])
+        self.assertEqual(sitting.progress(), (3, 3))
+
+
+class ShuffleTestCase(QuizTestMixin, TestCase):
+    def test_order_is_fixed_by_the_sitting_seed(self):
+        self.quiz.random_order = True
+        self.quiz.save()
+        for question in self.questions:
+            question.choice_order = "random"
+            question.save()
+            for n in range(4):
+                Choice.objects.create(question=question, choice_text=f"Other {n}")
+
+        sitting = self.new_sitting()
+        ids = sorted(q.pk for q in self.questions)
+        self.assertEqual(sitting._question_ids(), shuffled(ids, sitting.seed))
+
+        bundle = get_bundle(self.quiz.pk)
+        question = self.questions[0]
+        self.assertEqual(
+            bundle.get_choices(question, sitting.seed),
+            bundle.get_choices(question, sitting.seed),
+        )
+        self.assertEqual(
+            [c.pk for c in bundle.get_choices(question, sitting.seed)],
+            [c.pk for c in question.get_choices(sitting.seed)],
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.new_sitting()
+        self.assertFalse(any("RANDOM" in q["sql"].upper() for q in queries))
+
+
+class QuestionBundleTestCase(QuizTestMixin, TestCase):
+    def test_grading_needs_no_queries_once_loaded(self):
+        bundle = get_bundle(self.quiz.pk)
+        question = self.questions[0]
+        right, wrong = Choice.objects.filter(question=question).order_by("-correct")
+        other = Choice.objects.filter(question=self.questions[1], correct=True).get()
+
+        with self.assertNumQueries(1):
+            self.assertIs(get_bundle(self.quiz.pk), bundle)
+        with self.assertNumQueries(0):
+            self.assertTrue(bundle.check_if_correct(question, str(right.pk)))
+            self.assertFalse(bundle.check_if_correct(question, str(wrong.pk)))
+            self.assertFalse(bundle.check_if_correct(question, str(other.pk)))
+            self.assertFalse(bundle.check_if_correct(question, "x"))
+            self.assertEqual(len(bundle.get_choices_list(question)), 2)
+
+    def test_next_question_comes_from_bundle(self):
+        sitting = self.new_sitting()
+        bundle = get_bundle(self.quiz.pk)
+
+        with self.assertNumQueries(1):
+            question = sitting.get_first_question(bundle)
+        self.assertIs(question, bundle.question(sitting._question_ids()[0]))
+
+    def test_changes_invalidate_bundle(self):
+        bundle = get_bundle(self.quiz.pk)
+        Choice.objects.create(question=self.questions[0], choice_text="Maybe")
+
+        fresh = get_bundle(self.quiz.pk)
+        self.assertIsNot(fresh, bundle)
+        self.assertEqual(len(fresh.get_choices(self.questions[0])), 3)
+
+    def test_version_is_shared_through_the_database(self):
+        bundle = get_bundle(self.quiz.pk)
+        # As another process would see it: no signal here, only the new row
+        Choice.objects.bulk_create(
+            [Choice(question=self.questions[0], choice_text="Maybe")]
+        )
+        Quiz.objects.filter(pk=self.quiz.pk).update(
+            bundle_version=F("bundle_version") + 1
+        )
+
+        self.assertEqual(
+            len(get_bundle(self.quiz.pk).get_choices(self.questions[0])), 3
+        )
+        self.assertEqual(len(bundle.get_choices(self.questions[0])), 2)
+
+    def test_question_changes_keep_the_quiz_order(self):
+        before = Quiz.objects.get(pk=self.quiz.pk)
+        Choice.objects.create(question=self.questions[0], choice_text="Maybe")
+
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        self.assertEqual(quiz.timestamp, before.timestamp)
+        self.assertEqual(quiz.bundle_version, before.bundle_version + 1)
+
+    def test_saving_a_stale_quiz_keeps_the_version(self):
+        bundle = get_bundle(self.quiz.pk)
+        Choice.objects.create(question=self.questions[0], choice_text="Maybe")
+        self.quiz.title = "Renamed"
+        self.quiz.save()
+
+        self.assertIsNot(get_bundle(self.quiz.pk), bundle)
+        self.assertEqual(Quiz.objects.get(pk=self.quiz.pk).title, "Renamed")
+
+
+class MarkingTestCase(QuizTestMixin, TestCase):
+    def finished_sitting(self):
+        sitting = self.new_sitting()
+        while question := sitting.get_first_question():
+            sitting.record_answer(question, "1", is_correct=False)
+        return sitting
+
+    def post_marks(self, user, marks):
+        request = RequestFactory().post(
+            "/quiz/marking/batch/",
+            data=json.dumps({"marks": marks}),
+            content_type="application/json",
+        )
+        request.user = user
+        return quiz_marking_batch(request)
+
+    def test_mark_answers_recomputes_scores(self):
+        first, second = self.finished_sitting(), self.finished_sitting()
+        ids = first._question_ids()
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = Sitting.objects.mark_answers(
+                [(first.pk, ids[0], True), (first.pk, ids[1], True)]
+                + [(second.pk, pk, True) for pk in ids]
+                + [(second.pk, ids[2], False)]
+            )
+
+        # Two for the answers, one for the scores, one to flag the statistics
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 4)
+        self.assertEqual(updated, 5)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.current_score, 2)
+        self.assertEqual(second.current_score, 2)
+        self.assertEqual(second.get_incorrect_questions, [ids[2]])
+
+    def test_batch_view(self):
+        sitting = self.finished_sitting()
+        admin = User.objects.create(username="admin", is_superuser=True)
+        marks = [
+            {"sitting": sitting.pk, "question": pk, "correct": True}
+            for pk in sitting._question_ids()
+        ]
+
+        response = self.post_marks(admin, marks)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["updated"], 3)
+        self.assertEqual(data["scores"][str(sitting.pk)]["percent"], 100)
+
+        self.assertEqual(self.post_marks(admin, [{"sitting": "x"}]).status_code, 400)
+        lecturer = User.objects.create(username="lecturer1", is_lecturer=True)
+        self.assertFalse(marking_queryset(lecturer).exists())
+
+
+class AnalyticsTestCase(QuizTestMixin, TestCase):
+    def take(self, outcomes):
+        sitting = self.new_sitting()
+        for outcome in outcomes:
+            question = sitting.get_first_question()
+            choice = question.choice_set.get(correct=outcome)
+            sitting.record_answer(question, str(choice.pk), is_correct=outcome)
+        return sitting
+
+    def test_incremental_matches_full_rebuild(self):
+        patterns = [(1, 1, 1), (1, 0, 1), (0, 0, 1), (1, 1, 0), (0, 0, 0)]
+        for pattern in patterns[:3]:
+            self.take([bool(x) for x in pattern])
+        update_statistics(self.quiz)
+        for pattern in patterns[3:]:
+            self.take([bool(x) for x in pattern])
+        statistics = update_statistics(self.quiz)
+
+        self.assertEqual(statistics.sittings, 5)
+        self.assertEqual(sum(statistics.histogram), 5)
+        incremental = {
+            row.question_id: (row.attempts, row.correct, row.choice_counts)
+            for row in self.quiz.question_statistics.all()
+        }
+        update_statistics(self.quiz, full=True)
+        rows = {row.question_id: row for row in self.quiz.question_statistics.all()}
+        self.assertEqual(
+            incremental,
+            {pk: (r.attempts, r.correct, r.choice_counts) for pk, r in rows.items()},
+        )
+
+        # Compare with a direct computation over the answer matrix
+        sittings = Sitting.objects.filter(quiz=self.quiz).order_by("pk")
+        matrix = np.array(
+            [
+                [
+                    answer.correct
+                    for answer in sorted(s.answers.all(), key=lambda a: a.question_id)
+                ]
+                for s in sittings
+            ],
+            dtype=float,
+        )
+        totals = matrix.mean(axis=1)
+        for column, question_id in enumerate(sorted(rows)):
+            row = rows[question_id]
+            self.assertAlmostEqual(row.p_value, matrix[:, column].mean())
+            self.assertAlmostEqual(
+                row.discrimination, np.corrcoef(matrix[:, column], totals)[0, 1]
+            )
+            right = Choice.objects.get(question_id=question_id, correct=True)
+            self.assertAlmostEqual(row.choice_rate(right.pk), row.p_value)
+
+    def test_late_commits_are_not_skipped(self):
+        first = self.take([True, True, True])
+        second = self.take([False, False, False])
+        # The second sitting ended first but its commit came after the update
+        Sitting.objects.filter(pk=second.pk).update(complete=False)
+        update_statistics(self.quiz)
+        Sitting.objects.filter(pk=second.pk).update(
+            complete=True, end=Sitting.objects.get(pk=first.pk).end
+        )
+
+        statistics = update_statistics(self.quiz)
+        self.assertEqual(statistics.sittings, 2)
+        self.assertFalse(Sitting.objects.filter(in_statistics=False).exists())
+
+    def test_completing_an_untimed_quiz_updates_statistics(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.take([True, False, True])
+
+        self.assertEqual(QuizStatistics.objects.get(quiz=self.quiz).sittings, 1)
+        rows = QuestionStatistics.objects.filter(quiz=self.quiz)
+        self.assertEqual(rows.count(), 3)
+        self.assertEqual(sum(row.correct for row in rows), 2)
+
+    def test_finishing_updates_statistics_after_commit(self):
+        sitting = self.new_sitting()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(sitting.finish())
+
+        statistics = QuizStatistics.objects.get(quiz=self.quiz)
+        self.assertEqual(statistics.sittings, 1)
+        self.assertEqual(statistics.histogram[0], 1)
+
+    def test_marking_flags_rebuild(self):
+        sitting = self.take([True, True, True])
+        update_statistics(self.quiz)
+        Sitting.objects.mark_answers([(sitting.pk, self.questions[0].pk, False)])
+        self.assertTrue(QuizStatistics.objects.get(quiz=self.quiz).stale)
+
+        statistics = update_statistics(self.quiz)
+        self.assertEqual(statistics.sittings, 1)
+        self.assertEqual(
+            self.quiz.question_statistics.get(question=self.questions[0]).correct, 0
+        )
+
+
+class QuizProgressTestCase(QuizTestMixin, TestCase):
+    def test_scores_are_incremented_in_place(self):
+        progress = Progress.objects.new_progress(self.user)
+        progress.add_quiz_score(self.quiz, 2, 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            progress.add_quiz_score(self.quiz, 1, 3)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+
+        row = QuizProgress.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((row.score, row.possible, row.percent), (3, 6, 50))
+
+    def test_category_scores(self):
+        self.quiz.category = "exam"
+        self.quiz.save()
+        other = Quiz.objects.create(course=self.course, title="Week 2")
+        progress = Progress.objects.new_progress(self.user)
+        progress.add_quiz_score(self.quiz, 3, 4)
+        progress.add_quiz_score(other, 1, 4)
+
+        self.assertEqual(
+            progress.list_all_cat_scores(),
+            {"Exam": [3, 1, 75], "Uncategorised": [1, 3, 25]},
+        )
+
+
+class ExamFeedTestCase(QuizTestMixin, TestCase):
+    def test_keyset_pages(self):
+        sittings = []
+        for _ in range(5):
+            sitting = self.new_sitting()
+            while question := sitting.get_first_question():
+                sitting.record_answer(question, "1", is_correct=True)
+            sittings.append(sitting)
+        progress = Progress.objects.new_progress(self.user)
+
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page, cursor = progress.exams_page(cursor, size=2)
+                [
+                    (exam.quiz.title, exam.course.code, exam.user.username)
+                    for exam in page
+                ]
+            seen.extend(exam.pk for exam in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [s.pk for s in reversed(sittings)])
+        self.assertEqual(page[0].percent, 100)
+        self.assertTrue(page[0].passed)
+        self.assertEqual(progress.exams_page(course=self.course.pk + 1)[0], [])
+
+    def test_marking_updates_stored_result(self):
+        sitting = self.new_sitting()
+        while question := sitting.get_first_question():
+            sitting.record_answer(question, "1", is_correct=True)
+        Sitting.objects.mark_answers(
+            [(sitting.pk, pk, False) for pk in sitting._question_ids()[:2]]
+        )
+        sitting.refresh_from_db()
+        self.assertEqual((sitting.percent, sitting.passed), (33, False))
+
+
+class TimedQuizTestCase(QuizTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz.duration = 30
+        self.quiz.save()
+        self.right = {q.pk: q.choice_set.get(correct=True).pk for q in self.questions}
+
+    def autosave(self, sitting, answers):
+        request = RequestFactory().post(
+            "/quiz/sitting/autosave/",
+            data=json.dumps({"answers": answers}),
+            content_type="application/json",
+        )
+        request.user = self.user
+        return quiz_autosave(request, sitting.pk)
+
+    def test_batch_autosave(self):
+        sitting = self.new_sitting()
+        self.assertIsNotNone(sitting.deadline)
+        bundle = get_bundle(self.quiz.pk)
+        first, second = self.questions[:2]
+
+        with CaptureQueriesContext(connection) as queries:
+            saved = sitting.save_answers(
+                {first.pk: self.right[first.pk], second.pk: "0"}, bundle
+            )
+        self.assertEqual(saved, 2)
+        self.assertEqual(len([q for q in queries if "sittinganswer" in q["sql"]]), 2)
+
+        response = self.autosave(sitting, {str(second.pk): self.right[second.pk]})
+        self.assertEqual(json.loads(response.content)["saved"], 1)
+        self.assertTrue(sitting.finish())
+        self.assertEqual((sitting.current_score, sitting.percent), (2, 67))
+        self.assertFalse(sitting.finish())
+        self.assertEqual(self.autosave(sitting, {}).status_code, 409)
+
+    def test_untimed_sitting_rejects_autosave(self):
+        self.quiz.duration = None
+        self.quiz.save()
+        sitting = self.new_sitting()
+        question = sitting.get_first_question()
+        wrong = question.choice_set.get(correct=False)
+        sitting.record_answer(question, str(wrong.pk), is_correct=False)
+
+        response = self.autosave(sitting, {str(question.pk): self.right[question.pk]})
+        self.assertEqual(response.status_code, 409)
+        answer = sitting.answers.get(question=question)
+        self.assertEqual((answer.answer, answer.correct), (str(wrong.pk), False))
+
+    def test_untimed_answers_are_not_overwritten(self):
+        self.quiz.duration = None
+        self.quiz.save()
+        sitting = self.new_sitting()
+        question = sitting.get_first_question()
+        wrong = question.choice_set.get(correct=False)
+        sitting.record_answer(question, str(wrong.pk), is_correct=False)
+
+        saved = sitting.save_answers(
+            {pk: choice for pk, choice in self.right.items()}, get_bundle(self.quiz.pk)
+        )
+        self.assertEqual(saved, len(self.questions) - 1)
+        self.assertFalse(sitting.answers.get(question=question).correct)
+
+    def test_sweep_closes_expired_sittings(self):
+        expired, running = self.new_sitting(), self.new_sitting()
+        expired.save_answers(
+            {pk: choice for pk, choice in self.right.items()}, get_bundle(self.quiz.pk)
+        )
+        Sitting.objects.filter(pk=expired.pk).update(
+            deadline=now() - timedelta(minutes=1)
+        )
+
+        self.assertEqual(Sitting.objects.complete_expired(), [expired.pk])
+        expired.refresh_from_db()
+        running.refresh_from_db()
+        self.assertTrue(expired.complete)
+        self.assertEqual((expired.current_score, expired.passed), (3, True))
+        self.assertFalse(running.complete)
+        progress = QuizProgress.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((progress.score, progress.possible), (3, 3))
+        self.assertEqual(Sitting.objects.complete_expired(), [])
+
+
+class QuestionBankTestCase(QuizTestMixin, TestCase):
+    def test_import_statements_do_not_grow_with_the_bank(self):
+        items = [
+            bank_item(f"Question {n}", [("Yes", True), ("No", False)])
+            for n in range(200)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            report = import_questions(items, [self.quiz])
+
+        inserts = [q["sql"] for q in queries if "INSERT" in q["sql"]]
+        # Batches of rows, however many of them the backend takes at once
+        self.assertLess(len(inserts), 20)
+        self.assertEqual(len([sql for sql in inserts if "mcquestion" in sql]), 1)
+        self.assertEqual(report.questions, 200)
+        self.assertEqual(MCQuestion.objects.filter(content="Question 199").count(), 1)
+
+    def test_import_bulk_creates_questions(self):
+        upload = SimpleUploadedFile(
+            "bank.csv",
+            b"content,explanation,choice_order,correct,choices\n"
+            b"2 + 2?,Basic sums,random,B,3,4,5\n"
+            b'Primes?,,,"A,C",2,4,7\n'
+            b"No answer,,,,a,b\n",
+        )
+        other = Quiz.objects.create(course=self.course, title="Week 2")
+
+        with CaptureQueriesContext(connection) as queries:
+            report = import_questions(read_question_bank(upload), [self.quiz, other])
+
+        inserts = [q for q in queries if "INSERT" in q["sql"]]
+        # Questions, their MCQuestion rows, choices and quiz links
+        self.assertEqual(len(inserts), 4)
+        self.assertEqual((report.questions, report.choices), (2, 6))
+        self.assertEqual(list(report.errors), ["question 3"])
+        question = MCQuestion.objects.get(content="2 + 2?")
+        self.assertEqual(
+            (question.choice_order, question.explanation), ("random", "Basic sums")
+        )
+        self.assertEqual(
+            list(
+                question.choice_set.filter(correct=True).values_list(
+                    "choice_text", flat=True
+                )
+            ),
+            ["4"],
+        )
+        self.assertEqual(other.question_set.count(), 2)
+        self.assertEqual(len(get_bundle(self.quiz.pk).questions), 5)
+
+    def test_export_round_trips(self):
+        questions = MCQuestion.objects.filter(quiz=self.quiz)
+        for format in ["json", "csv", "gift"]:
+            chunks, _ = export_question_bank(questions, format)
+            upload = SimpleUploadedFile(f"bank.{format}", "".join(chunks).encode())
+            items = list(read_question_bank(upload))
+            self.assertEqual(
+                [(item["content"], item["choices"]) for item in items],
+                [(f"Question {n}", [("Yes", True), ("No", False)]) for n in range(3)],
+            )
+
+    def test_read_gift(self):
+        items = list(
+            read_gift(
+                "// a comment\n::Capital:: The capital of France \\{city\\}? "
+                "{=Paris#right ~%-50%London ~Rome ####Seine}\n\n"
+                "The sun is a star. {T}\n\nMatch {=a -> 1 =b -> 2}"
+            )
+        )
+        self.assertEqual(items[0]["content"], "The capital of France {city}?")
+        self.assertEqual(
+            items[0]["choices"], [("Paris", True), ("London", False), ("Rome", False)]
+        )
+        self.assertEqual(items[0]["explanation"], "Seine")
+        self.assertEqual(items[1]["choices"], [("True", True), ("False", False)])
+        self.assertEqual(items[2]["choices"], [])
+
+    def test_picker_renders_only_picked_questions(self):
+        form = QuizAddForm(instance=self.quiz)
+        MCQuestion.objects.create(content="Elsewhere")
+        html = str(form["questions"])
+        self.assertEqual(html.count("<option"), 3)
+        self.assertNotIn("Elsewhere", html)
+
+        admin = User.objects.create(username="admin", is_superuser=True)
+        request = RequestFactory().get("/quiz/questions/search/", {"q": "question"})
+        request.user = admin
+        page = json.loads(question_search(request).content)
+        self.assertEqual(
+            [item["id"] for item in page["results"]],
+            sorted((q.pk for q in self.questions), reverse=True),
+        )
+        self.assertIsNone(page["next_cursor"])
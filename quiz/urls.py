@@ -11,14 +11,40 @@ urlpatterns = [
         view=views.QuizMarkingDetail.as_view(),
         name="quiz_marking_detail",
     ),
+    path(
+        "marking/batch/",
+        view=views.quiz_marking_batch,
+        name="quiz_marking_batch",
+    ),
+    path(
+        "sitting/<int:pk>/autosave/",
+        view=views.quiz_autosave,
+        name="quiz_autosave",
+    ),
     path("<int:pk>/<slug>/take/", view=views.QuizTake.as_view(), name="quiz_take"),
     path("<slug>/quiz_add/", views.QuizCreateView.as_view(), name="quiz_create"),
     path("<slug>/<int:pk>/add/", views.QuizUpdateView.as_view(), name="quiz_update"),
     path("<slug>/<int:pk>/delete/", views.quiz_delete, name="quiz_delete"),
+    path(
+        "<slug>/<int:pk>/analytics/",
+        views.QuizAnalyticsView.as_view(),
+        name="quiz_analytics",
+    ),
     path(
         "mc-question/add/<slug>/<int:quiz_id>/",
         views.MCQuestionCreate.as_view(),
         name="mc_create",
     ),
+    path("questions/search/", views.question_search, name="question_search"),
+    path(
+        "<slug>/<int:quiz_id>/questions/import/",
+        views.question_import,
+        name="question_import",
+    ),
+    path(
+        "<slug>/<int:quiz_id>/questions/export/",
+        views.question_export,
+        name="question_export",
+    ),
     # path('mc-question/add/<int:pk>/<quiz_pk>/', MCQuestionCreate.as_view(), name='mc_create'),
 ]
@@ -1,8 +1,12 @@
+import json
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
 from django.views.generic import (
     CreateView,
     DetailView,
@@ -13,6 +17,7 @@ from django.views.generic import (
 )
 
 from accounts.decorators import lecturer_required
+from .bundle import get_bundle
 from .forms import (
     EssayForm,
     MCQuestionForm,
@@ -27,8 +32,10 @@ from .models import (
     Progress,
     Question,
     Quiz,
+    QuizStatistics,
     Sitting,
 )
+from .question_bank import export_question_bank, import_questions, read_question_bank
 
 
 # ########################################################
@@ -159,6 +166,82 @@ class MCQuestionCreate(CreateView):
             return self.form_invalid(form)
 
 
+QUESTION_SEARCH_PAGE_SIZE = 20
+
+
+@login_required
+@lecturer_required
+def question_search(request):
+    """
+    A page of the question bank for the quiz form's question picker,
+    newest first. ``q`` searches the question text and ``cursor`` is the
+    ``next_cursor`` of the previous page.
+    """
+    questions = Question.objects.order_by("-pk")
+    query = request.GET.get("q", "").strip()
+    if query:
+        questions = questions.filter(content__icontains=query)
+    cursor = request.GET.get("cursor", "")
+    if cursor.isdigit():
+        questions = questions.filter(pk__lt=int(cursor))
+    page = list(questions.values_list("pk", "content")[: QUESTION_SEARCH_PAGE_SIZE + 1])
+    has_next = len(page) > QUESTION_SEARCH_PAGE_SIZE
+    page = page[:QUESTION_SEARCH_PAGE_SIZE]
+    return JsonResponse(
+        {
+            "results": [{"id": pk, "text": content} for pk, content in page],
+            "next_cursor": page[-1][0] if has_next else None,
+        }
+    )
+
+
+@login_required
+@lecturer_required
+def question_import(request, slug, quiz_id):
+    """Add the questions of an uploaded JSON, CSV or GIFT question bank to a quiz"""
+    quiz = get_object_or_404(Quiz, pk=quiz_id, course__slug=slug)
+    upload = request.FILES.get("bank")
+    if request.method != "POST" or not upload:
+        messages.error(request, "Please choose a JSON, CSV or GIFT file to upload.")
+        return redirect("mc_create", slug=slug, quiz_id=quiz.pk)
+
+    try:
+        report = import_questions(read_question_bank(upload), [quiz])
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect("mc_create", slug=slug, quiz_id=quiz.pk)
+
+    messages.success(
+        request,
+        f"Imported {report.questions} question(s) with {report.choices} choice(s).",
+    )
+    for key, errors in list(report.errors.items())[:20]:
+        messages.warning(request, f"Skipped {key}: {' '.join(errors)}")
+    if len(report.errors) > 20:
+        messages.warning(
+            request, f"{len(report.errors) - 20} more question(s) skipped."
+        )
+    return redirect("mc_create", slug=slug, quiz_id=quiz.pk)
+
+
+@login_required
+@lecturer_required
+def question_export(request, slug, quiz_id):
+    """Download the multiple choice questions of a quiz as JSON, CSV or GIFT"""
+    quiz = get_object_or_404(Quiz, pk=quiz_id, course__slug=slug)
+    format = request.GET.get("format", "json")
+    try:
+        chunks, content_type = export_question_bank(
+            MCQuestion.objects.filter(quiz=quiz), format
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    fname = f"{quiz.slug}_questions.{format}"
+    response["Content-Disposition"] = f'attachment; filename="{fname}"'
+    return response
+
+
 # ########################################################
 # Quiz Progress and Marking Views
 # ########################################################
@@ -171,30 +254,70 @@ class QuizUserProgressView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         progress, _ = Progress.objects.get_or_create(user=self.request.user)
-        context["cat_scores"] = progress.list_all_cat_scores
-        context["exams"] = progress.show_exams()
-        context["exams_counter"] = context["exams"].count()
+        context["cat_scores"] = progress.list_all_cat_scores()
+        context["quiz_scores"] = progress.quiz_scores()
+
+        course = self.request.GET.get("course")
+        course = int(course) if course and course.isdigit() else None
+        exams, next_cursor = progress.exams_page(self.request.GET.get("after"), course)
+        context["exams"] = exams
+        context["next_cursor"] = next_cursor
+        context["exams_counter"] = progress.show_exams(course).count()
+        courses = Course.objects.order_by("title")
+        if not self.request.user.is_superuser:
+            courses = courses.filter(
+                sitting__user=self.request.user, sitting__complete=True
+            ).distinct()
+        context["courses"] = courses.only("id", "title")
+        context["course_id"] = course
         return context
 
 
+MAX_MARKS_PER_REQUEST = 1000
+
+
+def marking_queryset(user):
+    """Completed sittings ``user`` may mark"""
+    queryset = Sitting.objects.filter(complete=True)
+    if not user.is_superuser:
+        queryset = queryset.filter(
+            quiz__course__allocated_course__lecturer__pk=user.id
+        ).distinct()
+    return queryset
+
+
 @method_decorator([login_required, lecturer_required], name="dispatch")
 class QuizMarkingList(ListView):
     model = Sitting
-    template_name = "quiz/quiz_marking_list.html"
+    template_name = "quiz/sitting_list.html"
+    paginate_by = 25
 
     def get_queryset(self):
-        queryset = Sitting.objects.filter(complete=True)
-        if not self.request.user.is_superuser:
-            queryset = queryset.filter(
-                quiz__course__allocated_course__lecturer__pk=self.request.user.id
-            )
-        quiz_filter = self.request.GET.get("quiz_filter")
-        if quiz_filter:
-            queryset = queryset.filter(quiz__title__icontains=quiz_filter)
+        queryset = marking_queryset(self.request.user).select_related(
+            "user", "quiz", "quiz__course"
+        )
+        # Both filters hit indexed columns: the quiz foreign key and a prefix
+        # of the unique username.
+        quiz_filter = self.request.GET.get("quiz")
+        if quiz_filter and quiz_filter.isdigit():
+            queryset = queryset.filter(quiz_id=quiz_filter)
         user_filter = self.request.GET.get("user_filter")
         if user_filter:
-            queryset = queryset.filter(user__username__icontains=user_filter)
-        return queryset
+            queryset = queryset.filter(user__username__startswith=user_filter)
+        return queryset.order_by("-end", "-pk")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        quizzes = Quiz.objects.only("id", "title").order_by("title")
+        if not self.request.user.is_superuser:
+            quizzes = quizzes.filter(
+                course__allocated_course__lecturer__pk=self.request.user.id
+            ).distinct()
+        context["quizzes"] = quizzes
+        query = self.request.GET.copy()
+        query.pop("page", None)
+        context["query"] = query.urlencode()
+        return context
 
 
 @method_decorator([login_required, lecturer_required], name="dispatch")
@@ -202,20 +325,123 @@ class QuizMarkingDetail(DetailView):
     model = Sitting
     template_name = "quiz/quiz_marking_detail.html"
 
+    def get_queryset(self):
+        return marking_queryset(self.request.user).select_related("user", "quiz")
+
     def post(self, request, *args, **kwargs):
+        # Every question of the sitting is marked from one form submission;
+        # questions left unchecked are incorrect.
         sitting = self.get_object()
-        question_id = request.POST.get("qid")
-        if question_id:
-            question = Question.objects.get_subclass(id=int(question_id))
-            if int(question_id) in sitting.get_incorrect_questions:
-                sitting.remove_incorrect_question(question)
+        correct = set(request.POST.getlist("correct"))
+        Sitting.objects.mark_answers(
+            (sitting.pk, question_id, str(question_id) in correct)
+            for question_id in sitting._question_ids()
+        )
+        messages.success(request, "Marks saved.")
+        return redirect("quiz_marking_detail", pk=sitting.pk)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        questions = self.object.get_questions(with_answers=True)
+        bundle = get_bundle(self.object.quiz_id)
+        for question in questions:
+            if question.user_answer is None:
+                question.answer_text = ""
+            elif isinstance(question, MCQuestion):
+                question.answer_text = bundle.answer_choice_to_string(
+                    question.user_answer
+                )
             else:
-                sitting.add_incorrect_question(question)
-        return self.get(request, *args, **kwargs)
+                question.answer_text = question.user_answer
+        context["questions"] = questions
+        return context
+
+
+@login_required
+@lecturer_required
+@require_POST
+def quiz_marking_batch(request):
+    """
+    Mark answers of many sittings in one request. Expects a JSON body
+    ``{"marks": [{"sitting": 1, "question": 2, "correct": true}, ...]}``
+    and answers with the updated scores of the sittings involved.
+    """
+    try:
+        marks = [
+            (int(mark["sitting"]), int(mark["question"]), bool(mark["correct"]))
+            for mark in json.loads(request.body)["marks"]
+        ]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"error": "Invalid marks."}, status=400)
+    if len(marks) > MAX_MARKS_PER_REQUEST:
+        return JsonResponse(
+            {"error": f"At most {MAX_MARKS_PER_REQUEST} marks per request."},
+            status=400,
+        )
+
+    sitting_ids = {mark[0] for mark in marks}
+    allowed = set(
+        marking_queryset(request.user)
+        .filter(pk__in=sitting_ids)
+        .values_list("pk", flat=True)
+    )
+    if allowed != sitting_ids:
+        return JsonResponse(
+            {"error": "Unknown sittings.", "sittings": sorted(sitting_ids - allowed)},
+            status=403,
+        )
+
+    updated = Sitting.objects.mark_answers(marks)
+    scores = {
+        sitting.pk: {
+            "score": sitting.current_score,
+            "percent": sitting.get_percent_correct,
+        }
+        for sitting in Sitting.objects.filter(pk__in=sitting_ids).only(
+            "current_score", "question_count"
+        )
+    }
+    return JsonResponse({"updated": updated, "scores": scores})
+
+
+@method_decorator([login_required, lecturer_required], name="dispatch")
+class QuizAnalyticsView(TemplateView):
+    template_name = "quiz/analytics.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["questions"] = self.object.get_questions(with_answers=True)
+        quiz = get_object_or_404(
+            Quiz.objects.select_related("course"),
+            pk=self.kwargs["pk"],
+            course__slug=self.kwargs["slug"],
+        )
+        # Kept up to date as sittings complete, see quiz.analytics
+        statistics = QuizStatistics.objects.filter(quiz=quiz).first()
+        if statistics is None:
+            statistics = QuizStatistics(quiz=quiz)
+        by_question = {row.question_id: row for row in quiz.question_statistics.all()}
+        bundle = get_bundle(quiz.pk)
+        items = []
+        for question in bundle.questions.values():
+            row = by_question.get(question.id)
+            choices = [
+                (choice, row.choice_rate(choice.id) if row else None)
+                for choice in bundle.choices.get(question.id, ())
+            ]
+            items.append({"question": question, "stats": row, "choices": choices})
+        total = statistics.sittings or 1
+        context.update(
+            {
+                "quiz": quiz,
+                "course": quiz.course,
+                "statistics": statistics,
+                "items": items,
+                "histogram": [
+                    (n * 100 // len(statistics.histogram), count, count * 100 / total)
+                    for n, count in enumerate(statistics.histogram)
+                ],
+            }
+        )
         return context
 
 
@@ -224,6 +450,46 @@ class QuizMarkingDetail(DetailView):
 # ########################################################
 
 
+def posted_answers(data):
+    """``{question_id: answer}`` from the ``q-<question_id>`` fields of a form"""
+    answers = {}
+    for key, value in data.items():
+        prefix, _, question_id = key.partition("-")
+        if prefix == "q" and question_id.isdigit() and value != "":
+            answers[int(question_id)] = value
+    return answers
+
+
+@login_required
+@require_POST
+def quiz_autosave(request, pk):
+    """
+    Save a batch of answers of a timed sitting. Expects a JSON body
+    ``{"answers": {"<question_id>": "<answer>", ...}}`` and answers with the
+    number saved and the seconds left; 409 once the sitting is closed or
+    when it is not timed, untimed sittings are answered one question at a
+    time.
+    """
+    sitting = get_object_or_404(Sitting, pk=pk, user=request.user)
+    if sitting.deadline is None:
+        return JsonResponse({"error": "This sitting is not timed."}, status=409)
+    if sitting.complete or sitting.is_expired():
+        return JsonResponse({"error": "This sitting is closed."}, status=409)
+    try:
+        answers = {
+            int(question_id): str(answer)
+            for question_id, answer in json.loads(request.body)["answers"].items()
+            if answer is not None
+        }
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({"error": "Invalid answers."}, status=400)
+    if len(answers) > sitting.question_count:
+        return JsonResponse({"error": "Too many answers."}, status=400)
+
+    saved = sitting.save_answers(answers, get_bundle(sitting.quiz_id))
+    return JsonResponse({"saved": saved, "seconds_left": sitting.seconds_left()})
+
+
 @method_decorator([login_required], name="dispatch")
 class QuizTake(FormView):
     form_class = QuestionForm
@@ -233,7 +499,8 @@ class QuizTake(FormView):
     def dispatch(self, request, *args, **kwargs):
         self.quiz = get_object_or_404(Quiz, slug=self.kwargs["slug"])
         self.course = get_object_or_404(Course, pk=self.kwargs["pk"])
-        if not Question.objects.filter(quiz=self.quiz).exists():
+        self.bundle = get_bundle(self.quiz.pk)
+        if not self.bundle:
             messages.warning(request, "This quiz has no questions available.")
             return redirect("quiz_index", slug=self.course.slug)
 
@@ -247,8 +514,11 @@ class QuizTake(FormView):
             )
             return redirect("quiz_index", slug=self.course.slug)
 
+        if self.quiz.duration:
+            return self.take_timed(request)
+
         # Set self.question and self.progress here
-        self.question = self.sitting.get_first_question()
+        self.question = self.sitting.get_first_question(self.bundle)
         self.progress = self.sitting.progress()
 
         return super().dispatch(request, *args, **kwargs)
@@ -256,6 +526,10 @@ class QuizTake(FormView):
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs["question"] = self.question
+        if not isinstance(self.question, EssayQuestion):
+            kwargs["choices"] = self.bundle.get_choices_list(
+                self.question, self.sitting.seed
+            )
         return kwargs
 
     def get_form_class(self):
@@ -265,38 +539,32 @@ class QuizTake(FormView):
 
     def form_valid(self, form):
         self.form_valid_user(form)
-        if not self.sitting.get_first_question():
+        if not self.question:
             return self.final_result_user()
         return super().get(self.request)
 
     def form_valid_user(self, form):
-        progress, _ = Progress.objects.get_or_create(user=self.request.user)
         guess = form.cleaned_data["answers"]
-        is_correct = self.question.check_if_correct(guess)
-
-        if is_correct:
-            self.sitting.add_to_score(1)
-            progress.update_score(self.question, 1, 1)
-        else:
-            self.sitting.add_incorrect_question(self.question)
-            progress.update_score(self.question, 0, 1)
+        is_correct = self.bundle.check_if_correct(self.question, guess)
 
         if not self.quiz.answers_at_end:
             self.previous = {
                 "previous_answer": guess,
                 "previous_outcome": is_correct,
                 "previous_question": self.question,
-                "answers": self.question.get_choices(),
+                "answers": self.bundle.get_choices(self.question, self.sitting.seed),
                 "question_type": {self.question.__class__.__name__: True},
             }
         else:
             self.previous = {}
 
-        self.sitting.add_user_answer(self.question, guess)
-        self.sitting.remove_first_question()
+        # One write per answer, see Sitting.record_answer
+        finished = self.sitting.record_answer(self.question, guess, is_correct)
 
         # Update self.question and self.progress for the next question
-        self.question = self.sitting.get_first_question()
+        self.question = (
+            False if finished else self.sitting.get_first_question(self.bundle)
+        )
         self.progress = self.sitting.progress()
 
     def get_context_data(self, **kwargs):
@@ -310,29 +578,63 @@ class QuizTake(FormView):
             context["progress"] = self.progress
         return context
 
-    def final_result_user(self):
-        from django.utils import timezone
-        self.sitting.mark_quiz_complete()
-
-        # Update or create the Sitting so it always syncs in Grades tab
-        sitting_obj, created = Sitting.objects.update_or_create(
-            user=self.request.user,
-            quiz=self.quiz,
-            course=self.course,
-            defaults={
-                "score": self.sitting.get_current_score,
-                "complete": True,
-                "end": timezone.now(),
+    def take_timed(self, request):
+        """
+        Timed quizzes show every question on one page. Answers are autosaved
+        in batches (see quiz_autosave) and the final POST carries whatever is
+        still unsaved; after the deadline the sitting is closed instead.
+        """
+        if request.method == "POST" and not self.sitting.is_expired():
+            self.sitting.save_answers(posted_answers(request.POST), self.bundle)
+        if request.method == "POST" or self.sitting.is_expired():
+            return self.final_result_user(add_progress=self.sitting.finish())
+
+        saved = {
+            answer.question_id: answer.answer
+            for answer in self.sitting._answers()
+            if answer.answered_at is not None
+        }
+        questions = []
+        for question_id in self.sitting._question_ids():
+            question = self.bundle.question(question_id)
+            if question is None:
+                continue
+            questions.append(
+                {
+                    "question": question,
+                    "is_essay": isinstance(question, EssayQuestion),
+                    "choices": self.bundle.get_choices(question, self.sitting.seed),
+                    "answer": saved.get(question_id, ""),
+                }
+            )
+        return render(
+            request,
+            "quiz/exam.html",
+            {
+                "quiz": self.quiz,
+                "course": self.course,
+                "sitting": self.sitting,
+                "questions": questions,
+                "seconds_left": self.sitting.seconds_left(),
             },
         )
 
+    def final_result_user(self, add_progress=True):
+        # The sitting was marked complete with the last answer; the quiz
+        # totals are added to the user's progress once, here.
+        if add_progress:
+            progress, _ = Progress.objects.get_or_create(user=self.request.user)
+            progress.add_quiz_score(
+                self.quiz, self.sitting.get_current_score, self.sitting.get_max_score
+            )
+
         results = {
             "course": self.course,
             "quiz": self.quiz,
             "score": self.sitting.get_current_score,
             "max_score": self.sitting.get_max_score,
             "percent": self.sitting.get_percent_correct,
-            "sitting": sitting_obj,  # use the saved one
+            "sitting": self.sitting,
             "previous": getattr(self, "previous", {}),
         }
 
@@ -344,4 +646,3 @@ class QuizTake(FormView):
         if self.request.user.is_superuser or self.request.user.is_lecturer:
             self.sitting.delete()
         return render(self.request, self.result_template_name, results)
-
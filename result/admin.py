@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
 
-from .models import TakenCourse, Result
+from .models import ResultPublication, TakenCourse, Result
 
 
 class ScoreAdmin(admin.ModelAdmin):
@@ -19,5 +19,18 @@ class ScoreAdmin(admin.ModelAdmin):
     ]
 
 
+class ResultPublicationAdmin(admin.ModelAdmin):
+    list_display = ["session", "published_at", "published_by", "course_results"]
+    readonly_fields = ["session", "published_by", "course_results", "results"]
+
+    def has_add_permission(self, request):
+        # Sessions are published from the session list, see result.archive
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(TakenCourse, ScoreAdmin)
 admin.site.register(Result)
+admin.site.register(ResultPublication, ResultPublicationAdmin)
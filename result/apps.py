@@ -3,3 +3,29 @@ from django.apps import AppConfig
 
 class ResultConfig(AppConfig):
     name = "result"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from course.models import Course
+        from .models import TakenCourse
+        from .signals import (
+            refresh_course_records,
+            refresh_student_records,
+            refresh_taken_course_ranks,
+        )
+
+        post_save.connect(
+            refresh_student_records, sender=TakenCourse, dispatch_uid="result_records"
+        )
+        post_delete.connect(
+            refresh_student_records, sender=TakenCourse, dispatch_uid="result_records"
+        )
+        post_save.connect(
+            refresh_course_records, sender=Course, dispatch_uid="result_records"
+        )
+        post_save.connect(
+            refresh_taken_course_ranks, sender=TakenCourse, dispatch_uid="result_ranks"
+        )
+        post_delete.connect(
+            refresh_taken_course_ranks, sender=TakenCourse, dispatch_uid="result_ranks"
+        )
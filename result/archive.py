@@ -0,0 +1,155 @@
+"""
+Publication of a session's results. Publishing copies the live TakenCourse
+and Result rows of the session into the append-only archive tables and
+removes them from the live ones, so score entry works on the current
+session alone while transcripts (the academic records) are built from
+the archive.
+
+TakenCourse has no session column: the live rows are taken to be the
+current session's, which holds once every earlier session was published.
+A database with older history still live (seen from Result rows of other
+sessions) is refused unless that history is folded in explicitly.
+
+The archive is one table per kind, keyed by publication; on PostgreSQL it
+could be partitioned by publication, which this module does not rely on.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from .grading import SCORE_FIELDS
+from .models import (
+    ArchivedCourseResult,
+    ArchivedResult,
+    Result,
+    ResultPublication,
+    TakenCourse,
+)
+from .ranking import clear_session_ranks
+from .records import LANGUAGES, TITLE_FIELDS, refresh_records
+from .signals import muted
+
+CHUNK_SIZE = 500
+COURSE_FIELDS = (
+    ["pk", "student_id", "course_id", "course__code", "course__slug"]
+    + ["course__credit", "course__level", "course__semester"]
+    + TITLE_FIELDS
+    + SCORE_FIELDS
+    + ["total", "point", "grade", "comment"]
+)
+
+
+def archived_course(publication, values):
+    return ArchivedCourseResult(
+        publication=publication,
+        student_id=values["student_id"],
+        course_id=values["course_id"],
+        code=values["course__code"],
+        slug=values["course__slug"],
+        titles={
+            language: values[f"course__title_{language}"]
+            for language in LANGUAGES
+            if values[f"course__title_{language}"]
+        },
+        credit=max(values["course__credit"] or 0, 0),
+        level=values["course__level"],
+        semester=values["course__semester"],
+        grade=values["grade"],
+        comment=values["comment"],
+        **{name: values[name] for name in SCORE_FIELDS + ["total", "point"]},
+    )
+
+
+def to_decimal(value):
+    return None if value is None else round(Decimal(str(value)), 2)
+
+
+def earlier_sessions(session):
+    """Sessions other than ``session`` that still have live results"""
+    return sorted(
+        {
+            name or "-"
+            for name in Result.objects.exclude(session=str(session))
+            .values_list("session", flat=True)
+            .distinct()
+        }
+    )
+
+
+def publish_session(session, user=None, include_earlier=False):
+    """
+    Freeze the results of ``session``, which must be the current one, into
+    the archive and return the ResultPublication. The live TakenCourse rows
+    are taken to be the session's; they and its Result rows are removed,
+    with the session's cohort ranks. ``include_earlier`` archives results
+    of earlier sessions still live under this publication as well.
+    Raises ValueError if the session can't be published.
+    """
+    if not session.is_current_session:
+        raise ValueError(
+            f"Only the current session's results are live, {session} is not current."
+        )
+    with transaction.atomic():
+        if ResultPublication.objects.filter(session=session).exists():
+            raise ValueError(f"The results of {session} are already published.")
+        earlier = earlier_sessions(session)
+        if earlier and not include_earlier:
+            raise ValueError(
+                f"Results of {', '.join(earlier)} are still live and their courses "
+                f"can't be told apart from {session}'s. Publish with the earlier "
+                "sessions included to archive them all under this session."
+            )
+        publication = ResultPublication.objects.create(
+            session=session, published_by=user
+        )
+
+        student_ids, course_ids = set(), set()
+        course_results = 0
+        live = TakenCourse.objects.order_by("pk").values(*COURSE_FIELDS)
+        last_pk = 0
+        while True:
+            chunk = list(live.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+            if not chunk:
+                break
+            last_pk = chunk[-1]["pk"]
+            ArchivedCourseResult.objects.bulk_create(
+                [archived_course(publication, values) for values in chunk]
+            )
+            student_ids.update(values["student_id"] for values in chunk)
+            course_ids.update(values["course_id"] for values in chunk)
+            course_results += len(chunk)
+
+        results = Result.objects.all()
+        if not include_earlier:
+            results = results.filter(session=str(session))
+        archived_results = ArchivedResult.objects.bulk_create(
+            [
+                ArchivedResult(
+                    publication=publication,
+                    student_id=student_id,
+                    session=result_session or "",
+                    semester=semester,
+                    level=level or "",
+                    gpa=to_decimal(gpa),
+                    cgpa=to_decimal(cgpa),
+                )
+                for student_id, result_session, semester, level, gpa, cgpa in (
+                    results.values_list(
+                        "student_id", "session", "semester", "level", "gpa", "cgpa"
+                    )
+                )
+            ],
+            batch_size=CHUNK_SIZE,
+        )
+
+        # The records are refreshed once below rather than per deleted row
+        with muted():
+            TakenCourse.objects.all().delete()
+            results.delete()
+        clear_session_ranks([session, *earlier], course_ids)
+
+        publication.course_results = course_results
+        publication.results = len(archived_results)
+        publication.save(update_fields=["course_results", "results"])
+        refresh_records(student_ids)
+    return publication
@@ -0,0 +1,66 @@
+"""Grades, comments and the grading scale of course results"""
+
+A_PLUS = "A+"
+A = "A"
+A_MINUS = "A-"
+B_PLUS = "B+"
+B = "B"
+B_MINUS = "B-"
+C_PLUS = "C+"
+C = "C"
+C_MINUS = "C-"
+D = "D"
+F = "F"
+NG = "NG"
+
+GRADE_CHOICES = (
+    (A_PLUS, "A+"),
+    (A, "A"),
+    (A_MINUS, "A-"),
+    (B_PLUS, "B+"),
+    (B, "B"),
+    (B_MINUS, "B-"),
+    (C_PLUS, "C+"),
+    (C, "C"),
+    (C_MINUS, "C-"),
+    (D, "D"),
+    (F, "F"),
+    (NG, "NG"),
+)
+
+PASS = "PASS"
+FAIL = "FAIL"
+
+COMMENT_CHOICES = (
+    (PASS, "PASS"),
+    (FAIL, "FAIL"),
+)
+
+GRADE_BOUNDARIES = [
+    (90, A_PLUS),
+    (85, A),
+    (80, A_MINUS),
+    (75, B_PLUS),
+    (70, B),
+    (65, B_MINUS),
+    (60, C_PLUS),
+    (55, C),
+    (50, C_MINUS),
+    (45, D),
+    (0, F),
+]
+
+GRADE_POINT_MAPPING = {
+    A_PLUS: 4.0,
+    A: 4.0,
+    A_MINUS: 3.75,
+    B_PLUS: 3.5,
+    B: 3.0,
+    B_MINUS: 2.75,
+    C_PLUS: 2.5,
+    C: 2.0,
+    C_MINUS: 1.75,
+    D: 1.0,
+    F: 0.0,
+    NG: 0.0,
+}
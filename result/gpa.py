@@ -0,0 +1,70 @@
+from core.models import Semester, Session
+from accounts.models import Student
+from .models import ArchivedCourseResult, Result, TakenCourse, grade_point_average
+
+
+def recompute_results(student_ids=None, semester=None, session=None):
+    """
+    Recompute GPA and CGPA for a cohort and upsert their ``Result`` rows.
+
+    ``student_ids`` limits the run to those students, ``None`` means every
+    student. Only students taking courses in the semester get a result.
+    The semester and session default to the current ones. The
+    number of queries does not depend on the size of the cohort.
+    Returns the number of results written.
+    """
+    if session is None:
+        session = Session.objects.filter(is_current_session=True).first()
+    if semester is None:
+        semester = Semester.objects.filter(
+            is_current_semester=True, session=session
+        ).first()
+    if not semester or not session:
+        return 0
+
+    students = Student.objects.all()
+    taken_courses = TakenCourse.objects.all()
+    archived_courses = ArchivedCourseResult.objects.all()
+    results = Result.objects.filter(semester=str(semester), session=str(session))
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        students = students.filter(pk__in=student_ids)
+        taken_courses = taken_courses.filter(student_id__in=student_ids)
+        archived_courses = archived_courses.filter(student_id__in=student_ids)
+        results = results.filter(student_id__in=student_ids)
+
+    semester_courses = taken_courses.semester_courses(semester.semester)
+    students = students.filter(pk__in=semester_courses.values("student_id"))
+    levels = dict(students.values_list("pk", "level"))
+    semester_totals = semester_courses.grade_point_totals()
+    # CGPA counts the published sessions too
+    overall_totals = taken_courses.grade_point_totals()
+    for student_id, (points, credits) in archived_courses.grade_point_totals().items():
+        live_points, live_credits = overall_totals.get(student_id, (0, 0))
+        overall_totals[student_id] = (live_points + points, live_credits + credits)
+    existing = {(r.student_id, r.level): r for r in results}
+
+    to_update, to_create = [], []
+    for student_id, level in levels.items():
+        gpa = float(grade_point_average(*semester_totals.get(student_id, (0, 0))))
+        cgpa = float(grade_point_average(*overall_totals.get(student_id, (0, 0))))
+        result = existing.get((student_id, level))
+        if result is None:
+            to_create.append(
+                Result(
+                    student_id=student_id,
+                    gpa=gpa,
+                    cgpa=cgpa,
+                    semester=str(semester),
+                    session=str(session),
+                    level=level,
+                )
+            )
+        elif result.gpa != gpa or result.cgpa != cgpa:
+            result.gpa = gpa
+            result.cgpa = cgpa
+            to_update.append(result)
+
+    Result.objects.bulk_update(to_update, ["gpa", "cgpa"], batch_size=500)
+    Result.objects.bulk_create(to_create, batch_size=500)
+    return len(to_update) + len(to_create)
@@ -0,0 +1,130 @@
+import csv
+import io
+import os
+import zipfile
+from itertools import islice
+
+from .grading import SCORE_FIELDS
+from .models import TakenCourse
+from .score_ingest import ScoreIngestReport, clean_scores, store_scores
+
+ID_COLUMN = "id_no"
+EXPORT_COLUMNS = (
+    [ID_COLUMN, "full_name"] + SCORE_FIELDS + ["total", "grade", "point", "comment"]
+)
+CHUNK_SIZE = 500
+
+
+class Echo:
+    """A file-like object that hands back what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def export_gradebook(course, chunk_size=CHUNK_SIZE):
+    """
+    Yield the course's gradebook as CSV lines. Rows are streamed from the
+    database with ``iterator`` so memory use does not grow with the class.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    taken_courses = (
+        TakenCourse.objects.filter(course=course)
+        .select_related("student__student")
+        .order_by("student__student__username")
+    )
+    for taken in taken_courses.iterator(chunk_size=chunk_size):
+        user = taken.student.student
+        yield writer.writerow(
+            [user.username, user.get_full_name]
+            + [getattr(taken, name) for name in EXPORT_COLUMNS[2:]]
+        )
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        for row in csv.DictReader(text):
+            yield row
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"The gradebook is not a readable CSV file: {e}") from e
+
+
+def read_xlsx(file):
+    # openpyxl is only needed for spreadsheet uploads
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError(f"The gradebook is not a readable XLSX file: {e}") from e
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell or "").strip() for cell in next(rows, [])]
+        for values in rows:
+            yield {
+                column: "" if value is None else str(value)
+                for column, value in zip(header, values)
+            }
+    finally:
+        workbook.close()
+
+
+READERS = {".csv": read_csv, ".xlsx": read_xlsx}
+
+
+def read_gradebook(file):
+    """Yield one dict per row of an uploaded CSV or XLSX gradebook"""
+    extension = os.path.splitext(file.name)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported gradebook format: {extension or file.name}")
+    return READERS[extension](file)
+
+
+def import_gradebook(course, rows, semester=None, session=None, chunk_size=CHUNK_SIZE):
+    """
+    Import gradebook rows for ``course`` one chunk at a time.
+
+    Rows are matched on the student's ID number. Invalid rows, and rows of
+    a student already seen earlier in the file, are reported by line number
+    and skipped; valid rows in each chunk are stored with a single bulk
+    update. Returns a ScoreIngestReport.
+    """
+    report = ScoreIngestReport()
+    seen = set()
+    rows = enumerate(rows, start=2)  # line 1 is the header
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        taken_courses = {
+            taken.student.student.username: taken
+            for taken in TakenCourse.objects.filter(
+                course=course,
+                student__student__username__in=[
+                    (row.get(ID_COLUMN) or "").strip() for _, row in chunk
+                ],
+            ).select_related("student__student", "course")
+        }
+        loaded, cleaned = {}, {}
+        for line, row in chunk:
+            key = f"line {line}"
+            taken = taken_courses.get((row.get(ID_COLUMN) or "").strip())
+            if taken is None:
+                report.add_error(key, "This student is not taking the course.")
+                continue
+            if taken.pk in seen:
+                report.add_error(key, "Duplicate row for this student.")
+                continue
+            seen.add(taken.pk)
+            scores = clean_scores(
+                key, [(row.get(name) or "").strip() for name in SCORE_FIELDS], report
+            )
+            if scores is not None:
+                loaded[taken.pk] = taken
+                cleaned[taken.pk] = scores
+        if cleaned:
+            report.rows += store_scores(loaded, cleaned, semester, session)
+    return report
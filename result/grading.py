@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+import numpy as np
+
+from .constants import FAIL, GRADE_BOUNDARIES, GRADE_POINT_MAPPING, NG, PASS, F
+
+SCORE_FIELDS = ["assignment", "mid_exam", "quiz", "attendance", "final_exam"]
+
+# Scores are stored with two decimal places, so the kernel works in integer
+# hundredths to keep totals and boundary comparisons exact.
+# GRADE_BOUNDARIES is ordered from the highest grade down; searchsorted needs
+# ascending boundaries. Index 0 is for totals below the lowest boundary.
+_BOUNDS = np.array(
+    [boundary * 100 for boundary, _ in reversed(GRADE_BOUNDARIES)], dtype=np.int64
+)
+_GRADES = np.array([NG] + [grade for _, grade in reversed(GRADE_BOUNDARIES)])
+_GRADE_INDEX = {grade: index for index, grade in enumerate(_GRADES)}
+_POINTS = np.array(
+    [round(GRADE_POINT_MAPPING.get(grade, 0.0) * 100) for grade in _GRADES],
+    dtype=np.int64,
+)
+_COMMENTS = np.array([FAIL if grade in (F, NG) else PASS for grade in _GRADES])
+
+
+def to_hundredths(values):
+    """Convert decimal scores (any array-like) to an int64 array of hundredths"""
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def from_hundredths(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def grade_index(totals):
+    """Position of each total (in hundredths) in the grade tables"""
+    return np.searchsorted(_BOUNDS, totals, side="right")
+
+
+def grade_batch(scores, credits):
+    """
+    Grade many rows in one vectorised pass.
+
+    ``scores`` is a rows x components array-like of scores and ``credits``
+    the matching course credits. Returns (totals, grades, points, comments)
+    as NumPy arrays, with totals and points in hundredths.
+    """
+    credits = np.asarray(credits, dtype=np.int64)
+    if not len(credits):
+        empty = np.array([], dtype=np.int64)
+        return empty, _GRADES[empty], empty, _COMMENTS[empty]
+    totals = to_hundredths(scores).reshape(len(credits), -1).sum(axis=1)
+    index = grade_index(totals)
+    return totals, _GRADES[index], credits * _POINTS[index], _COMMENTS[index]
+
+
+def grade_scores(scores, credits):
+    """
+    Grade many rows at once and return a list of (total, grade, point,
+    comment) tuples with Decimal totals and points, using the same rules as
+    ``TakenCourse.save``.
+    """
+    totals, grades, points, comments = grade_batch(scores, credits)
+    return [
+        (from_hundredths(total), str(grade), from_hundredths(point), str(comment))
+        for total, grade, point, comment in zip(
+            totals.tolist(), grades.tolist(), points.tolist(), comments.tolist()
+        )
+    ]
+
+
+def total_of(scores):
+    return from_hundredths(to_hundredths(scores).sum())
+
+
+def grade_of(total):
+    return str(_GRADES[grade_index(to_hundredths(total))])
+
+
+def point_of(grade, credit):
+    return from_hundredths(credit * _POINTS[_GRADE_INDEX.get(grade, 0)])
+
+
+def comment_of(grade):
+    return str(_COMMENTS[_GRADE_INDEX.get(grade, 0)])
+
+
+def apply_grades(taken_courses):
+    """
+    Set total, grade, point and comment on TakenCourse instances in one pass.
+    The instances need their course loaded (select_related) for the credit.
+    """
+    taken_courses = list(taken_courses)
+    graded = grade_scores(
+        [[getattr(taken, name) for name in SCORE_FIELDS] for taken in taken_courses],
+        [taken.course.credit for taken in taken_courses],
+    )
+    for taken, (total, grade, point, comment) in zip(taken_courses, graded):
+        taken.total = total
+        taken.grade = grade
+        taken.point = point
+        taken.comment = comment
+    return taken_courses
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Semester, Session
+from result.sheet_export import export_result_sheets, result_sheets_filename
+
+
+class Command(BaseCommand):
+    help = "Render the result sheets of every course in a semester into a ZIP"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--semester", type=int, help="Semester id, the current one by default"
+        )
+        parser.add_argument(
+            "--session", type=int, help="Session id, the current one by default"
+        )
+        parser.add_argument("--output", help="ZIP file to write")
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help="Render processes, PDF_EXPORT_PROCESSES by default; 0 renders here",
+        )
+
+    def handle(self, *args, **options):
+        semester = self.lookup(Semester, options["semester"], is_current_semester=True)
+        session = self.lookup(Session, options["session"], is_current_session=True)
+        output = options["output"] or result_sheets_filename(semester, session)
+
+        failed = []
+
+        def progress(row):
+            course, filename, students, source, seconds, error = row
+            if error:
+                failed.append(filename)
+                self.stderr.write(f"{course}: {error}")
+            else:
+                self.stdout.write(
+                    f"{course}: {students} student(s), {source} in {seconds}s"
+                )
+
+        with open(output, "wb") as archive:
+            for chunk in export_result_sheets(
+                semester, session, options["processes"], progress
+            ):
+                archive.write(chunk)
+        if failed:
+            raise CommandError(
+                f"Wrote {output} without {len(failed)} sheet(s) that failed to "
+                "render, see timings.csv."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}."))
+
+    def lookup(self, model, pk, **current):
+        if pk is None:
+            found = model.objects.filter(**current).first()
+        else:
+            found = model.objects.filter(pk=pk).first()
+        if found is None:
+            raise CommandError(f"No {model._meta.verbose_name} found.")
+        return found
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Session
+from result.archive import publish_session
+
+
+class Command(BaseCommand):
+    help = "Freeze the current session's results into the published archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--include-earlier",
+            action="store_true",
+            help=(
+                "Also archive results of earlier sessions that are still live, "
+                "under the current session"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        session = Session.objects.filter(is_current_session=True).first()
+        if session is None:
+            raise CommandError("No current session is set.")
+        try:
+            publication = publish_session(
+                session, include_earlier=options["include_earlier"]
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Published {session}: {publication.course_results} course "
+                f"result(s), {publication.results} semester result(s)."
+            )
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from result.records import rebuild_all_records
+
+
+class Command(BaseCommand):
+    help = "Rebuild every student's academic records from their taken courses"
+
+    def handle(self, *args, **options):
+        written = rebuild_all_records()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} record(s)."))
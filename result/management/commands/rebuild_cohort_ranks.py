@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from result.ranking import rebuild_all_ranks
+
+
+class Command(BaseCommand):
+    help = "Rank every course and the current semester's results from scratch"
+
+    def handle(self, *args, **options):
+        written = rebuild_all_ranks()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rank(s)."))
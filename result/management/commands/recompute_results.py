@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from result.gpa import recompute_results
+
+
+class Command(BaseCommand):
+    help = "Recompute GPA and CGPA of every student for the current semester"
+
+    def handle(self, *args, **options):
+        written = recompute_results()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} result(s)."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from course.models import Course
+from result.score_sync import sync_quiz_scores
+
+
+class Command(BaseCommand):
+    help = "Copy completed quiz averages into the students' TakenCourse quiz scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            action="append",
+            type=int,
+            dest="courses",
+            help="Only sync the course with this id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        courses = options["courses"]
+        if courses:
+            missing = set(courses) - set(
+                Course.objects.filter(pk__in=courses).values_list("pk", flat=True)
+            )
+            if missing:
+                self.stderr.write(f"Unknown course id(s): {sorted(missing)}")
+        updated = sync_quiz_scores(courses)
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} score row(s)."))
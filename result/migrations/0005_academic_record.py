@@ -0,0 +1,101 @@
+# Generated by Django 4.0.8 on 2026-10-17 21:00
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_user_activation_key"),
+        ("result", "0004_alter_result_semester"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AcademicRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[("BEGINNER", "BEGINNER"), ("ADVANCED", "ADVANCED")],
+                        max_length=25,
+                    ),
+                ),
+                (
+                    "semester",
+                    models.CharField(
+                        choices=[
+                            ("First", "First"),
+                            ("Second", "Second"),
+                            ("Third", "Third"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("position", models.PositiveSmallIntegerField(default=0)),
+                ("credits", models.PositiveIntegerField(default=0)),
+                (
+                    "points",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=7
+                    ),
+                ),
+                (
+                    "gpa",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=4
+                    ),
+                ),
+                (
+                    "cgpa",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=4
+                    ),
+                ),
+                (
+                    "previous_cgpa",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=4
+                    ),
+                ),
+                ("courses", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="academic_records",
+                        to="accounts.student",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["student", "position"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="academicrecord",
+            index=models.Index(
+                fields=["student", "level", "position"],
+                name="result_acad_student_276758_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="academicrecord",
+            constraint=models.UniqueConstraint(
+                fields=("student", "level", "semester"),
+                name="unique_student_level_semester",
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.0.8 on 2026-10-17 21:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_user_activation_key"),
+        ("result", "0005_academic_record"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CohortRank",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("course", "Course"),
+                            ("program_level", "Program and level"),
+                            ("session", "Session"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("cohort", models.CharField(max_length=150)),
+                ("label", models.CharField(blank=True, max_length=255)),
+                ("score", models.DecimalField(decimal_places=2, max_digits=6)),
+                ("rank", models.PositiveIntegerField()),
+                ("percentile", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("cohort_size", models.PositiveIntegerField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cohort_ranks",
+                        to="accounts.student",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="cohortrank",
+            index=models.Index(
+                fields=["scope", "cohort", "rank"], name="result_coho_scope_843a30_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="cohortrank",
+            constraint=models.UniqueConstraint(
+                fields=("scope", "cohort", "student"),
+                name="unique_scope_cohort_student",
+            ),
+        ),
+    ]
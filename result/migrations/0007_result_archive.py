@@ -0,0 +1,223 @@
+# Generated by Django 4.0.8 on 2026-10-17 21:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0007_alter_course_summary_alter_course_summary_en_and_more"),
+        ("accounts", "0004_user_activation_key"),
+        ("core", "0004_pdfjob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("result", "0006_cohort_rank"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResultPublication",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("published_at", models.DateTimeField(auto_now_add=True)),
+                ("course_results", models.PositiveIntegerField(default=0)),
+                ("results", models.PositiveIntegerField(default=0)),
+                (
+                    "published_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="publication",
+                        to="core.session",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "semester",
+                    models.CharField(
+                        choices=[
+                            ("First", "First"),
+                            ("Second", "Second"),
+                            ("Third", "Third"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "level",
+                    models.CharField(
+                        blank=True,
+                        choices=[("BEGINNER", "BEGINNER"), ("ADVANCED", "ADVANCED")],
+                        max_length=25,
+                    ),
+                ),
+                ("gpa", models.DecimalField(decimal_places=2, max_digits=4, null=True)),
+                (
+                    "cgpa",
+                    models.DecimalField(decimal_places=2, max_digits=4, null=True),
+                ),
+                (
+                    "publication",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="result.resultpublication",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_results",
+                        to="accounts.student",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedCourseResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(max_length=200)),
+                ("slug", models.SlugField(blank=True)),
+                ("titles", models.JSONField(default=dict)),
+                ("credit", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[("BEGINNER", "BEGINNER"), ("ADVANCED", "ADVANCED")],
+                        max_length=25,
+                    ),
+                ),
+                (
+                    "semester",
+                    models.CharField(
+                        choices=[
+                            ("First", "First"),
+                            ("Second", "Second"),
+                            ("Third", "Third"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("assignment", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("mid_exam", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("quiz", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("attendance", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("final_exam", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("total", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("point", models.DecimalField(decimal_places=2, max_digits=5)),
+                (
+                    "grade",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("A+", "A+"),
+                            ("A", "A"),
+                            ("A-", "A-"),
+                            ("B+", "B+"),
+                            ("B", "B"),
+                            ("B-", "B-"),
+                            ("C+", "C+"),
+                            ("C", "C"),
+                            ("C-", "C-"),
+                            ("D", "D"),
+                            ("F", "F"),
+                            ("NG", "NG"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                (
+                    "comment",
+                    models.CharField(
+                        blank=True,
+                        choices=[("PASS", "PASS"), ("FAIL", "FAIL")],
+                        max_length=4,
+                    ),
+                ),
+                (
+                    "course",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="course.course",
+                    ),
+                ),
+                (
+                    "publication",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="result.resultpublication",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_courses",
+                        to="accounts.student",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archivedresult",
+            index=models.Index(
+                fields=["student", "publication"], name="result_arch_student_fb7bed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedcourseresult",
+            index=models.Index(
+                fields=["student", "publication"], name="result_arch_student_fbf9ee_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedcourseresult",
+            index=models.Index(
+                fields=["publication", "code"], name="result_arch_publica_ba723f_idx"
+            ),
+        ),
+    ]
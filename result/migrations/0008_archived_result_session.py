@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-17 21:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("result", "0007_result_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedresult",
+            name="session",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
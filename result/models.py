@@ -2,76 +2,44 @@ from decimal import Decimal
 from django.conf import settings
 
 from django.db import models
+from django.db.models import Sum
 from django.urls import reverse
 
 from accounts.models import Student
-from core.models import Semester
+from core.models import Semester, Session
 from course.models import Course
+from .constants import COMMENT_CHOICES, GRADE_CHOICES
+from .grading import SCORE_FIELDS, comment_of, grade_of, point_of, total_of
 
-A_PLUS = "A+"
-A = "A"
-A_MINUS = "A-"
-B_PLUS = "B+"
-B = "B"
-B_MINUS = "B-"
-C_PLUS = "C+"
-C = "C"
-C_MINUS = "C-"
-D = "D"
-F = "F"
-NG = "NG"
-
-GRADE_CHOICES = (
-    (A_PLUS, "A+"),
-    (A, "A"),
-    (A_MINUS, "A-"),
-    (B_PLUS, "B+"),
-    (B, "B"),
-    (B_MINUS, "B-"),
-    (C_PLUS, "C+"),
-    (C, "C"),
-    (C_MINUS, "C-"),
-    (D, "D"),
-    (F, "F"),
-    (NG, "NG"),
-)
-
-PASS = "PASS"
-FAIL = "FAIL"
-
-COMMENT_CHOICES = (
-    (PASS, "PASS"),
-    (FAIL, "FAIL"),
-)
-
-GRADE_BOUNDARIES = [
-    (90, A_PLUS),
-    (85, A),
-    (80, A_MINUS),
-    (75, B_PLUS),
-    (70, B),
-    (65, B_MINUS),
-    (60, C_PLUS),
-    (55, C),
-    (50, C_MINUS),
-    (45, D),
-    (0, F),
-]
-
-GRADE_POINT_MAPPING = {
-    A_PLUS: 4.0,
-    A: 4.0,
-    A_MINUS: 3.75,
-    B_PLUS: 3.5,
-    B: 3.0,
-    B_MINUS: 2.75,
-    C_PLUS: 2.5,
-    C: 2.0,
-    C_MINUS: 1.75,
-    D: 1.0,
-    F: 0.0,
-    NG: 0.0,
-}
+
+def grade_point_average(points, credits):
+    """Divide grade points by credits, rounded the way results are shown"""
+    if credits:
+        return round(Decimal(points) / Decimal(credits), 2)
+    return Decimal("0.00")
+
+
+class TakenCourseQuerySet(models.query.QuerySet):
+    def grade_point_totals(self):
+        """
+        Sum points and credits per student on the database side.
+        Returns {student_id: (points, credits)}.
+        """
+        rows = (
+            self.values("student_id")
+            .annotate(points=Sum("point"), credits=Sum("course__credit"))
+            .order_by()
+        )
+        return {
+            row["student_id"]: (row["points"] or 0, row["credits"] or 0)
+            for row in rows
+        }
+
+    def semester_courses(self, semester):
+        """Courses taken at the student's current level in the given semester"""
+        return self.filter(
+            course__level=models.F("student__level"), course__semester=semester
+        )
 
 
 class TakenCourse(models.Model):
@@ -105,6 +73,8 @@ class TakenCourse(models.Model):
         choices=COMMENT_CHOICES, max_length=200, blank=True, editable=False
     )
 
+    objects = TakenCourseQuerySet.as_manager()
+
     def get_absolute_url(self):
         return reverse("course_detail", kwargs={"slug": self.course.slug})
 
@@ -112,32 +82,16 @@ class TakenCourse(models.Model):
         return f"{self.course.title} ({self.course.code})"
 
     def get_total(self):
-        return sum(
-            [
-                Decimal(self.assignment),
-                Decimal(self.mid_exam),
-                Decimal(self.quiz),
-                Decimal(self.attendance),
-                Decimal(self.final_exam),
-            ]
-        )
+        return total_of([getattr(self, name) for name in SCORE_FIELDS])
 
     def get_grade(self):
-        total = self.total
-        for boundary, grade in GRADE_BOUNDARIES:
-            if total >= boundary:
-                return grade
-        return NG
+        return grade_of(self.total)
 
     def get_comment(self):
-        if self.grade in [F, NG]:
-            return FAIL
-        return PASS
+        return comment_of(self.grade)
 
     def get_point(self):
-        credit = self.course.credit
-        grade_point = GRADE_POINT_MAPPING.get(self.grade, 0.0)
-        return Decimal(credit) * Decimal(grade_point)
+        return point_of(self.grade, self.course.credit)
 
     def save(self, *args, **kwargs):
         self.total = self.get_total()
@@ -151,30 +105,23 @@ class TakenCourse(models.Model):
         if not current_semester:
             return Decimal("0.00")
 
-        taken_courses = TakenCourse.objects.filter(
-            student=self.student,
-            course__level=self.student.level,
-            course__semester=current_semester.semester,
+        totals = (
+            TakenCourse.objects.filter(student_id=self.student_id)
+            .semester_courses(current_semester.semester)
+            .grade_point_totals()
         )
-
-        total_points = sum(tc.point for tc in taken_courses)
-        total_credits = sum(tc.course.credit for tc in taken_courses)
-
-        if total_credits > 0:
-            gpa = total_points / Decimal(total_credits)
-            return round(gpa, 2)
-        return Decimal("0.00")
+        return grade_point_average(*totals.get(self.student_id, (0, 0)))
 
     def calculate_cgpa(self):
-        taken_courses = TakenCourse.objects.filter(student=self.student)
-
-        total_points = sum(tc.point for tc in taken_courses)
-        total_credits = sum(tc.course.credit for tc in taken_courses)
-
-        if total_credits > 0:
-            cgpa = total_points / Decimal(total_credits)
-            return round(cgpa, 2)
-        return Decimal("0.00")
+        totals = TakenCourse.objects.filter(
+            student_id=self.student_id
+        ).grade_point_totals()
+        points, credits = totals.get(self.student_id, (0, 0))
+        archived = ArchivedCourseResult.objects.filter(
+            student_id=self.student_id
+        ).grade_point_totals()
+        archived_points, archived_credits = archived.get(self.student_id, (0, 0))
+        return grade_point_average(points + archived_points, credits + archived_credits)
 
 
 class Result(models.Model):
@@ -187,3 +134,215 @@ class Result(models.Model):
 
     def __str__(self):
         return f"Result for {self.student} - Semester: {self.semester}, Level: {self.level}"
+
+
+class AcademicRecord(models.Model):
+    """
+    A student's results for one level and semester, kept in step with their
+    TakenCourse rows by ``result.records`` so result pages need one read.
+    ``courses`` holds a row per course taken, see ``records.course_row``.
+    """
+
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="academic_records"
+    )
+    level = models.CharField(max_length=25, choices=settings.LEVEL_CHOICES)
+    semester = models.CharField(max_length=100, choices=settings.SEMESTER_CHOICES)
+    position = models.PositiveSmallIntegerField(default=0)
+    credits = models.PositiveIntegerField(default=0)
+    points = models.DecimalField(
+        max_digits=7, decimal_places=2, default=Decimal("0.00")
+    )
+    gpa = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal("0.00"))
+    cgpa = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal("0.00"))
+    previous_cgpa = models.DecimalField(
+        max_digits=4, decimal_places=2, default=Decimal("0.00")
+    )
+    courses = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["student", "position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "level", "semester"],
+                name="unique_student_level_semester",
+            )
+        ]
+        indexes = [models.Index(fields=["student", "level", "position"])]
+
+    def __str__(self):
+        return f"Record for {self.student} - {self.level}, {self.semester} semester"
+
+    @property
+    def course_rows(self):
+        from .records import display_rows
+
+        return display_rows(self.courses)
+
+
+class CohortRank(models.Model):
+    """
+    A student's rank and percentile within a cohort, a snapshot kept by
+    ``result.ranking``: the takers of a course (by total), a program and
+    level (by GPA) or everyone in a session and semester (by CGPA).
+    """
+
+    COURSE = "course"
+    PROGRAM_LEVEL = "program_level"
+    SESSION = "session"
+    SCOPE_CHOICES = (
+        (COURSE, "Course"),
+        (PROGRAM_LEVEL, "Program and level"),
+        (SESSION, "Session"),
+    )
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    cohort = models.CharField(max_length=150)
+    label = models.CharField(max_length=255, blank=True)
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="cohort_ranks"
+    )
+    score = models.DecimalField(max_digits=6, decimal_places=2)
+    rank = models.PositiveIntegerField()
+    # Share of the cohort scoring lower, 0 to 100
+    percentile = models.DecimalField(max_digits=5, decimal_places=2)
+    cohort_size = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "cohort", "student"],
+                name="unique_scope_cohort_student",
+            )
+        ]
+        indexes = [models.Index(fields=["scope", "cohort", "rank"])]
+
+    def __str__(self):
+        return f"{self.student} - {self.label or self.cohort}: {self.rank}/{self.cohort_size}"
+
+
+class ResultPublication(models.Model):
+    """A session whose results were frozen into the archive"""
+
+    session = models.OneToOneField(
+        Session, on_delete=models.PROTECT, related_name="publication"
+    )
+    published_at = models.DateTimeField(auto_now_add=True)
+    published_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    course_results = models.PositiveIntegerField(default=0)
+    results = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Published results of {self.session}"
+
+
+class ArchiveQuerySet(models.QuerySet):
+    """Published results are only ever added"""
+
+    def update(self, **kwargs):
+        raise ValueError("Published results cannot be changed.")
+
+    def delete(self):
+        raise ValueError("Published results cannot be deleted.")
+
+    def grade_point_totals(self):
+        """Like ``TakenCourseQuerySet.grade_point_totals`` over archived courses"""
+        rows = (
+            self.values("student_id")
+            .annotate(points=Sum("point"), credits=Sum("credit"))
+            .order_by()
+        )
+        return {
+            row["student_id"]: (row["points"] or 0, row["credits"] or 0)
+            for row in rows
+        }
+
+
+class ArchivedRow(models.Model):
+    objects = ArchiveQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Published results cannot be changed.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Published results cannot be deleted.")
+
+
+class ArchivedCourseResult(ArchivedRow):
+    """
+    A TakenCourse of a published session, with what the transcript shows
+    of the course copied in so later edits to the course don't change it.
+    Rows go away only with their student.
+    """
+
+    publication = models.ForeignKey(
+        ResultPublication, on_delete=models.PROTECT, related_name="+"
+    )
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="archived_courses"
+    )
+    course = models.ForeignKey(
+        Course, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    code = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=50, blank=True)
+    # Title per language code
+    titles = models.JSONField(default=dict)
+    credit = models.PositiveSmallIntegerField(default=0)
+    level = models.CharField(max_length=25, choices=settings.LEVEL_CHOICES)
+    semester = models.CharField(max_length=10, choices=settings.SEMESTER_CHOICES)
+    assignment = models.DecimalField(max_digits=5, decimal_places=2)
+    mid_exam = models.DecimalField(max_digits=5, decimal_places=2)
+    quiz = models.DecimalField(max_digits=5, decimal_places=2)
+    attendance = models.DecimalField(max_digits=5, decimal_places=2)
+    final_exam = models.DecimalField(max_digits=5, decimal_places=2)
+    total = models.DecimalField(max_digits=5, decimal_places=2)
+    point = models.DecimalField(max_digits=5, decimal_places=2)
+    grade = models.CharField(choices=GRADE_CHOICES, max_length=2, blank=True)
+    comment = models.CharField(choices=COMMENT_CHOICES, max_length=4, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "publication"]),
+            models.Index(fields=["publication", "code"]),
+        ]
+
+    def __str__(self):
+        return f"{self.code} - {self.student}"
+
+
+class ArchivedResult(ArchivedRow):
+    """A semester Result of a published session"""
+
+    publication = models.ForeignKey(
+        ResultPublication, on_delete=models.PROTECT, related_name="+"
+    )
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="archived_results"
+    )
+    # Result.session; differs from the publication's only for results folded
+    # in with ``include_earlier``
+    session = models.CharField(max_length=100, blank=True)
+    semester = models.CharField(max_length=10, choices=settings.SEMESTER_CHOICES)
+    level = models.CharField(max_length=25, choices=settings.LEVEL_CHOICES, blank=True)
+    gpa = models.DecimalField(max_digits=4, decimal_places=2, null=True)
+    cgpa = models.DecimalField(max_digits=4, decimal_places=2, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["student", "publication"])]
+
+    def __str__(self):
+        return f"Archived result for {self.student} - Semester: {self.semester}"
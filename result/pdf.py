@@ -0,0 +1,460 @@
+import hashlib
+import io
+import json
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, Q
+
+from reportlab.platypus import (
+    SimpleDocTemplate,
+    Paragraph,
+    Spacer,
+    Table,
+    TableStyle,
+    Image,
+)
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+
+from accounts.models import Student, User
+from core.models import Semester, Session
+from core.pdf import font, logo_image, styles
+from course.models import Course, CourseAllocation
+from .constants import FAIL, PASS
+from .models import TakenCourse
+
+CM = 2.54
+
+# Bump when the layout of the result sheet changes so cached copies are
+# rendered again.
+RESULT_SHEET_VERSION = 1
+RESULT_SHEET_DIR = "result_sheet"
+
+
+def result_sheet_rows(course):
+    """
+    Everything the result sheet shows per student, read with one query:
+    (id no., full name, total, grade, point, comment)
+    """
+    rows = (
+        TakenCourse.objects.filter(course=course)
+        .order_by("pk")
+        .values_list(
+            "student__student__username",
+            "student__student__first_name",
+            "student__student__last_name",
+            "total",
+            "grade",
+            "point",
+            "comment",
+        )
+    )
+    return [
+        (
+            username,
+            # Same rule as User.get_full_name
+            f"{first_name} {last_name}" if first_name and last_name else username,
+            total,
+            grade,
+            point,
+            comment,
+        )
+        for username, first_name, last_name, total, grade, point, comment in rows
+    ]
+
+
+def pass_fail_counts(course):
+    return TakenCourse.objects.filter(course=course).aggregate(
+        no_of_pass=Count("pk", filter=Q(comment=PASS)),
+        no_of_fail=Count("pk", filter=Q(comment=FAIL)),
+    )
+
+
+def render_result_sheet(sheet):
+    """Build the result sheet PDF described by ``sheet`` and return its bytes"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        rightMargin=0,
+        leftMargin=6.5 * CM,
+        topMargin=0.3 * CM,
+        bottomMargin=0,
+    )
+    style = styles()
+    Story = [Spacer(1, 0.2)]
+
+    im = logo_image()
+    im.__setattr__("_offs_x", -200)
+    im.__setattr__("_offs_y", -45)
+    Story.append(im)
+
+    title = (
+        "<b> "
+        + sheet["semester"]
+        + " Semester "
+        + sheet["session"]
+        + " Result Sheet</b>"
+    )
+    title = Paragraph(title.upper(), style["Title"])
+    Story.append(title)
+    Story.append(Spacer(1, 0.1 * inch))
+
+    title = "<b>Course lecturer: " + sheet["lecturer"] + "</b>"
+    title = Paragraph(title.upper(), style["Subtitle"])
+    Story.append(title)
+    Story.append(Spacer(1, 0.1 * inch))
+
+    title = "<b>Level: </b>" + sheet["level"]
+    title = Paragraph(title.upper(), style["Subtitle"])
+    Story.append(title)
+    Story.append(Spacer(1, 0.6 * inch))
+
+    header = [("S/N", "ID NO.", "FULL NAME", "TOTAL", "GRADE", "POINT", "COMMENT")]
+    table_header = Table(header, [inch], [0.5 * inch])
+    table_header.setStyle(
+        TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), colors.black),
+                ("TEXTCOLOR", (1, 0), (-1, -1), colors.white),
+                ("TEXTCOLOR", (0, 0), (0, 0), colors.cyan),
+                ("FONTNAME", (0, 0), (-1, -1), font("FreeSansBold")),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("BOX", (0, 0), (-1, -1), 1, colors.black),
+            ]
+        )
+    )
+    Story.append(table_header)
+
+    body_style = TableStyle(
+        [
+            ("INNERGRID", (0, 0), (-1, -1), 0.05, colors.black),
+            ("BOX", (0, 0), (-1, -1), 0.1, colors.black),
+        ]
+    )
+    for count, (username, full_name, total, grade, point, comment) in enumerate(
+        sheet["rows"], start=1
+    ):
+        data = [
+            (
+                count,
+                username.upper(),
+                Paragraph(full_name.capitalize(), style["Normal"]),
+                total,
+                grade,
+                point,
+                comment,
+            )
+        ]
+        t_body = Table(data, colWidths=[inch])
+        t_body.setStyle(body_style)
+        Story.append(t_body)
+
+    Story.append(Spacer(1, 1 * inch))
+    tbl_data = [
+        [
+            Paragraph("<b>Date:</b>_____________________________", style["Normal"]),
+            Paragraph(
+                "<b>No. of PASS:</b> " + str(sheet["no_of_pass"]), style["Right"]
+            ),
+        ],
+        [
+            Paragraph(
+                "<b>Siganture / Stamp:</b> _____________________________",
+                style["Normal"],
+            ),
+            Paragraph(
+                "<b>No. of FAIL: </b>" + str(sheet["no_of_fail"]), style["Right"]
+            ),
+        ],
+    ]
+    tbl = Table(tbl_data)
+    Story.append(tbl)
+
+    doc.build(Story)
+    return buffer.getvalue()
+
+
+def course_lecturers(course_ids, session):
+    """Course id -> names of the lecturers allocated to it in ``session``"""
+    rows = (
+        CourseAllocation.courses.through.objects.filter(
+            course_id__in=course_ids,
+            courseallocation__session__in=[session] if session else [],
+        )
+        .order_by("courseallocation__lecturer__username")
+        .values_list(
+            "course_id",
+            "courseallocation__lecturer__username",
+            "courseallocation__lecturer__first_name",
+            "courseallocation__lecturer__last_name",
+        )
+    )
+    lecturers = {}
+    for course_id, username, first_name, last_name in rows:
+        name = f"{first_name} {last_name}" if first_name and last_name else username
+        lecturers.setdefault(course_id, []).append(name)
+    return {course_id: ", ".join(names) for course_id, names in lecturers.items()}
+
+
+def result_sheet_data(course, semester, session):
+    """Collect the plain data a course result sheet is rendered from"""
+    return {
+        "course": str(course),
+        "semester": str(semester),
+        "session": str(session),
+        # Named as the bulk export names it, so both share the cached copy
+        "lecturer": course_lecturers([course.pk], session).get(course.pk, ""),
+        "level": str(course.level),
+        "rows": result_sheet_rows(course),
+        **pass_fail_counts(course),
+    }
+
+
+def result_sheet_digest(sheet):
+    payload = json.dumps(
+        [RESULT_SHEET_VERSION, sheet], default=str, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def result_sheet_name(course_id, sheet):
+    folder = posixpath.join(RESULT_SHEET_DIR, str(course_id))
+    return posixpath.join(folder, result_sheet_digest(sheet) + ".pdf")
+
+
+def stored_result_sheet(course_id, sheet):
+    """The stored PDF of ``sheet`` if it was rendered before, else None"""
+    name = result_sheet_name(course_id, sheet)
+    if default_storage.exists(name):
+        with default_storage.open(name) as pdf:
+            return pdf.read()
+    return None
+
+
+def store_result_sheet(course_id, sheet, content):
+    """Keep a rendered sheet, replacing the older copies of the course"""
+    name = result_sheet_name(course_id, sheet)
+    folder = posixpath.dirname(name)
+    try:
+        _, stale = default_storage.listdir(folder)
+    except (FileNotFoundError, NotImplementedError):
+        stale = []
+    for filename in stale:
+        default_storage.delete(posixpath.join(folder, filename))
+    default_storage.save(name, ContentFile(content))
+
+
+def cached_result_sheet(course, semester, session):
+    """
+    Return the result sheet PDF for ``course``, rendering it only when the
+    scores (or anything else printed on it) changed since the last download.
+    Rendered sheets are kept in the default storage, keyed by a hash of
+    their content; older copies for the course are removed.
+    """
+    sheet = result_sheet_data(course, semester, session)
+    content = stored_result_sheet(course.pk, sheet)
+    if content is None:
+        content = render_result_sheet(sheet)
+        store_result_sheet(course.pk, sheet, content)
+    return content
+
+
+REGISTRATION_HEADER_STYLE = TableStyle(
+    [
+        ("ALIGN", (-2, -2), (-2, -2), "CENTER"),
+        ("VALIGN", (-2, -2), (-2, -2), "MIDDLE"),
+        ("ALIGN", (1, 0), (1, 0), "CENTER"),
+        ("VALIGN", (1, 0), (1, 0), "MIDDLE"),
+        ("ALIGN", (0, 0), (0, 0), "CENTER"),
+        ("VALIGN", (0, 0), (0, 0), "MIDDLE"),
+        ("ALIGN", (-4, 0), (-4, 0), "LEFT"),
+        ("VALIGN", (-4, 0), (-4, 0), "MIDDLE"),
+        ("ALIGN", (-3, 0), (-3, 0), "LEFT"),
+        ("VALIGN", (-3, 0), (-3, 0), "MIDDLE"),
+        ("TEXTCOLOR", (0, -1), (-1, -1), colors.black),
+        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.black),
+        ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+    ]
+)
+REGISTRATION_BODY_STYLE = TableStyle(
+    [
+        ("ALIGN", (-2, -2), (-2, -2), "CENTER"),
+        ("ALIGN", (1, 0), (1, 0), "CENTER"),
+        ("ALIGN", (0, 0), (0, 0), "CENTER"),
+        ("ALIGN", (-4, 0), (-4, 0), "LEFT"),
+        ("TEXTCOLOR", (0, -1), (-1, -1), colors.black),
+        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.black),
+        ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+    ]
+)
+
+
+def registration_semester(courses, semester, title, total_label):
+    """Flowables listing the registered ``courses`` of one semester"""
+    style = styles()
+    story = [Paragraph(f"<b>{title}</b>", style["Section"])]
+    header = [
+        (
+            "S/No",
+            "Course Code",
+            "Course Title",
+            "Unit",
+            Paragraph(
+                "<b>Name, Signature of course lecturer & Date</b>", style["Section"]
+            ),
+        )
+    ]
+    table_header = Table(header, 1 * [1.4 * inch], 1 * [0.5 * inch])
+    table_header.setStyle(REGISTRATION_HEADER_STYLE)
+    story.append(table_header)
+
+    units = 0
+    semester_courses = [c.course for c in courses if c.course.semester == semester]
+    for count, course in enumerate(semester_courses, start=1):
+        units += int(course.credit)
+        data = [
+            (
+                count,
+                course.code.upper(),
+                Paragraph(course.title, style["Section"]),
+                course.credit,
+                "",
+            )
+        ]
+        table_body = Table(data, 1 * [1.4 * inch], 1 * [0.3 * inch])
+        table_body.setStyle(REGISTRATION_BODY_STYLE)
+        story.append(table_body)
+
+    story.append(Paragraph(f"<b>{total_label} : {units}</b>", style["Small"]))
+    return story
+
+
+def render_registration_form(user):
+    """Build the course registration form PDF of a student user"""
+    current_session = Session.objects.get(is_current_session=True)
+    student = Student.objects.get(student__pk=user.id)
+    courses = list(
+        TakenCourse.objects.filter(student__student__id=user.id).select_related(
+            "course"
+        )
+    )
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, rightMargin=15, leftMargin=15, topMargin=0, bottomMargin=0
+    )
+    style = styles()
+
+    Story = [Spacer(1, 0.5)]
+    Story.append(Spacer(1, 0.4 * inch))
+
+    title = "<b>EZOD UNIVERSITY OF TECHNOLOGY, ADAMA</b>"  # TODO: Make this dynamic
+    Story.append(Paragraph(title.upper(), style["Heading"]))
+    school_title = (
+        "<b>SCHOOL OF ELECTRICAL ENGINEERING & COMPUTING</b>"  # TODO: Make this dynamic
+    )
+    Story.append(Paragraph(school_title.upper(), style["School"]))
+    Story.append(Spacer(1, 0.1 * inch))
+    department_title = (
+        "<b>DEPARTMENT OF COMPUTER SCIENCE & ENGINEERING</b>"  # TODO: Make this dynamic
+    )
+    Story.append(Paragraph(department_title, style["Department"]))
+    Story.append(Spacer(1, 0.3 * inch))
+
+    title = "<b><u>STUDENT COURSE REGISTRATION FORM</u></b>"
+    Story.append(Paragraph(title.upper(), style["Heading"]))
+
+    tbl_data = [
+        [
+            Paragraph(
+                "<b>Registration Number : " + user.username.upper() + "</b>",
+                style["Normal"],
+            )
+        ],
+        [
+            Paragraph(
+                "<b>Name : " + user.get_full_name.upper() + "</b>",
+                style["Normal"],
+            )
+        ],
+        [
+            Paragraph(
+                "<b>Session : " + current_session.session.upper() + "</b>",
+                style["Normal"],
+            ),
+            Paragraph("<b>Level: " + student.level + "</b>", style["Normal"]),
+        ],
+    ]
+    tbl = Table(tbl_data)
+    Story.append(tbl)
+    Story.append(Spacer(1, 0.6 * inch))
+
+    Story.extend(
+        registration_semester(
+            courses, settings.FIRST, "FIRST SEMESTER", "Total First Semester Credit"
+        )
+    )
+    Story.append(Spacer(1, 0.6 * inch))
+    Story.extend(
+        registration_semester(
+            courses, settings.SECOND, "SECOND SEMESTER", "Total Second Semester Credit"
+        )
+    )
+
+    Story.append(Spacer(1, 2))
+    certification_text = (
+        "CERTIFICATION OF REGISTRATION: I certify that <b>"
+        + str(user.get_full_name.upper())
+        + "</b>\
+    has been duly registered for the <b>"
+        + student.level
+        + " level </b> of study in the department\
+    of COMPUTER SICENCE & ENGINEERING and that the courses and credits \
+    registered are as approved by the senate of the University"
+    )
+    Story.append(Paragraph(certification_text, style["Certification"]))
+
+    im_logo = logo_image()
+    setattr(im_logo, "_offs_x", -218)
+    setattr(im_logo, "_offs_y", 480)
+    Story.append(im_logo)
+
+    picture = settings.BASE_DIR + user.get_picture()
+    im = Image(picture, 1.0 * inch, 1.0 * inch)
+    setattr(im, "_offs_x", 218)
+    setattr(im, "_offs_y", 550)
+    Story.append(im)
+
+    doc.build(Story)
+    return buffer.getvalue()
+
+
+def result_sheet_filename(course, semester, session):
+    fname = (
+        str(semester)
+        + "_semester_"
+        + str(session)
+        + "_"
+        + str(course)
+        + "_resultSheet.pdf"
+    )
+    return fname.replace("/", "-")
+
+
+def result_sheet_job(params):
+    """PDF job entry point, see core.jobs"""
+    course = Course.objects.get(pk=params["course_id"])
+    semester = Semester.objects.get(pk=params["semester_id"])
+    session = Session.objects.get(pk=params["session_id"])
+    content = cached_result_sheet(course, semester, session)
+    return result_sheet_filename(course, semester, session), content
+
+
+def registration_form_job(params):
+    """PDF job entry point, see core.jobs"""
+    user = User.objects.get(pk=params["user_id"])
+    fname = (user.username + ".pdf").replace("/", "-")
+    return fname, render_registration_form(user)
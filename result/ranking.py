@@ -0,0 +1,289 @@
+"""
+Cohort ranks and percentiles, computed by the database with window
+functions and kept as a snapshot in ``CohortRank``:
+
+- per course, the takers ranked by total score
+- per program and level, by GPA of the semester
+- per session and semester, everyone ranked by CGPA
+
+Each refresh rewrites whole cohorts, and only the cohorts the changed
+scores belong to, so pages read ranks and their distribution directly.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import PercentRank, Rank
+
+from accounts.models import Student
+from core.models import Semester, Session
+from .models import CohortRank, Result, TakenCourse
+
+# Percentile bands of the rank distribution, as [low, high)
+BANDS = [(0, 25), (25, 50), (50, 75), (75, 101)]
+
+
+def ranked(queryset, score, partition_by=None):
+    """Annotate ``queryset`` with rank (1 = best), percentile and cohort size"""
+    partition_by = partition_by or None
+    return queryset.annotate(
+        rank=Window(Rank(), partition_by=partition_by, order_by=F(score).desc()),
+        percent_rank=Window(
+            PercentRank(), partition_by=partition_by, order_by=F(score).asc()
+        ),
+        cohort_size=Window(Count("pk"), partition_by=partition_by),
+    )
+
+
+def to_percentile(percent_rank):
+    return round(Decimal(str(percent_rank or 0)) * 100, 2)
+
+
+def to_score(value):
+    return round(Decimal(str(value or 0)), 2)
+
+
+def course_cohort(course_id):
+    return str(course_id)
+
+
+def program_level_cohort(session, semester, program_id, level):
+    return f"{session}|{semester}|{program_id}|{level}"
+
+
+def session_cohort(session, semester):
+    return f"{session}|{semester}"
+
+
+def replace_cohorts(scope, cohorts, ranks):
+    with transaction.atomic():
+        CohortRank.objects.filter(scope=scope, cohort__in=cohorts).delete()
+        CohortRank.objects.bulk_create(ranks, batch_size=500)
+    return len(ranks)
+
+
+def refresh_course_ranks(course_ids):
+    """Rank the takers of the given courses by total, returns the rows written"""
+    cohorts = [course_cohort(course_id) for course_id in set(course_ids)]
+    if not cohorts:
+        return 0
+    rows = ranked(
+        TakenCourse.objects.filter(course_id__in=set(course_ids)),
+        "total",
+        [F("course_id")],
+    ).values_list(
+        "course_id",
+        "course__code",
+        "student_id",
+        "total",
+        "rank",
+        "percent_rank",
+        "cohort_size",
+    )
+    ranks = [
+        CohortRank(
+            scope=CohortRank.COURSE,
+            cohort=course_cohort(course_id),
+            label=code,
+            student_id=student_id,
+            score=to_score(total),
+            rank=rank,
+            percentile=to_percentile(percent_rank),
+            cohort_size=cohort_size,
+        )
+        for course_id, code, student_id, total, rank, percent_rank, cohort_size in rows
+    ]
+    return replace_cohorts(CohortRank.COURSE, cohorts, ranks)
+
+
+def semester_results(semester, session):
+    """The students' results at their current level for the semester"""
+    return Result.objects.filter(
+        semester=str(semester),
+        session=str(session),
+        level=F("student__level"),
+        gpa__isnull=False,
+    )
+
+
+def refresh_result_ranks(semester=None, session=None, student_ids=None):
+    """
+    Rank results of the semester within program and level (by GPA) and
+    within the session (by CGPA). ``student_ids`` limits the program and
+    level cohorts refreshed to the ones those students are in.
+    Returns the rows written.
+    """
+    if session is None:
+        session = Session.objects.filter(is_current_session=True).first()
+    if semester is None:
+        semester = Semester.objects.filter(
+            is_current_semester=True, session=session
+        ).first()
+    if not semester or not session:
+        return 0
+
+    results = semester_results(semester, session)
+    if student_ids is not None:
+        groups = set(
+            Student.objects.filter(pk__in=set(student_ids)).values_list(
+                "program_id", "level"
+            )
+        )
+        if not groups:
+            return 0
+        in_groups = Q()
+        for program_id, level in groups:
+            in_groups |= Q(student__program_id=program_id, student__level=level)
+        program_results = results.filter(in_groups)
+        cohorts = [
+            program_level_cohort(session, semester, program_id, level)
+            for program_id, level in groups
+        ]
+    else:
+        program_results = results
+        cohorts = None
+
+    rows = ranked(
+        program_results, "gpa", [F("student__program_id"), F("level")]
+    ).values_list(
+        "student__program_id",
+        "student__program__title",
+        "level",
+        "student_id",
+        "gpa",
+        "rank",
+        "percent_rank",
+        "cohort_size",
+    )
+    program_ranks = [
+        CohortRank(
+            scope=CohortRank.PROGRAM_LEVEL,
+            cohort=program_level_cohort(session, semester, program_id, level),
+            label=f"{program or '-'} {level}",
+            student_id=student_id,
+            score=to_score(gpa),
+            rank=rank,
+            percentile=to_percentile(percent_rank),
+            cohort_size=cohort_size,
+        )
+        for program_id, program, level, student_id, gpa, rank, percent_rank, cohort_size in rows
+    ]
+
+    rows = ranked(results, "cgpa").values_list(
+        "student_id", "cgpa", "rank", "percent_rank", "cohort_size"
+    )
+    cohort = session_cohort(session, semester)
+    session_ranks = [
+        CohortRank(
+            scope=CohortRank.SESSION,
+            cohort=cohort,
+            label=f"{session} {semester}",
+            student_id=student_id,
+            score=to_score(cgpa),
+            rank=rank,
+            percentile=to_percentile(percent_rank),
+            cohort_size=cohort_size,
+        )
+        for student_id, cgpa, rank, percent_rank, cohort_size in rows
+    ]
+    with transaction.atomic():
+        if cohorts is None:
+            # Every program and level of the semester, including emptied ones
+            cohorts = set(
+                CohortRank.objects.filter(
+                    scope=CohortRank.PROGRAM_LEVEL,
+                    cohort__startswith=session_cohort(session, semester) + "|",
+                ).values_list("cohort", flat=True)
+            )
+        written = replace_cohorts(CohortRank.PROGRAM_LEVEL, cohorts, program_ranks)
+        written += replace_cohorts(CohortRank.SESSION, [cohort], session_ranks)
+    return written
+
+
+def rebuild_all_ranks(semester=None, session=None):
+    """Rank every course and the semester's results from scratch"""
+    course_ids = list(
+        TakenCourse.objects.order_by("course_id")
+        .values_list("course_id", flat=True)
+        .distinct()
+    )
+    CohortRank.objects.filter(scope=CohortRank.COURSE).exclude(
+        cohort__in=[course_cohort(course_id) for course_id in course_ids]
+    ).delete()
+    written = refresh_course_ranks(course_ids)
+    return written + refresh_result_ranks(semester, session)
+
+
+def clear_session_ranks(sessions, course_ids):
+    """
+    Drop the ranks of published sessions: the cohorts of their courses and
+    their program/level and session cohorts
+    """
+    published = Q(
+        scope=CohortRank.COURSE, cohort__in=[course_cohort(pk) for pk in course_ids]
+    )
+    for session in sessions:
+        published |= Q(
+            scope__in=[CohortRank.PROGRAM_LEVEL, CohortRank.SESSION],
+            cohort__startswith=f"{session}|",
+        )
+    return CohortRank.objects.filter(published).delete()[0]
+
+
+def rank_distribution(scope, cohorts=None, prefix=None):
+    """
+    The size, best score and how many students fall in each percentile
+    band, per cohort of ``scope`` (optionally only the given ``cohorts`` or
+    the ones starting with ``prefix``), in one query:
+    {cohort: {"label", "size", "top", "bands": [{"label", "count"}]}}
+    """
+    ranks = CohortRank.objects.filter(scope=scope)
+    if cohorts is not None:
+        ranks = ranks.filter(cohort__in=cohorts)
+    if prefix is not None:
+        ranks = ranks.filter(cohort__startswith=prefix)
+    band_counts = {
+        f"band_{low}": Count("pk", filter=Q(percentile__gte=low, percentile__lt=high))
+        for low, high in BANDS
+    }
+    rows = (
+        ranks.values("cohort", "label")
+        .annotate(size=Count("pk"), top=Max("score"), **band_counts)
+        .order_by("label", "cohort")
+    )
+    return {
+        row["cohort"]: {
+            "label": row["label"],
+            "size": row["size"],
+            "top": row["top"],
+            "bands": [
+                {"label": f"{low}-{min(high, 100)}%", "count": row[f"band_{low}"]}
+                for low, high in BANDS
+            ],
+        }
+        for row in rows
+    }
+
+
+def semester_rank_distribution(semester, session):
+    """Rank distributions of the semester's program and level cohorts"""
+    if not semester or not session:
+        return []
+    prefix = session_cohort(session, semester) + "|"
+    return list(rank_distribution(CohortRank.PROGRAM_LEVEL, prefix=prefix).values())
+
+
+def course_rank_distribution(course):
+    return rank_distribution(CohortRank.COURSE, [course_cohort(course.pk)]).get(
+        course_cohort(course.pk)
+    )
+
+
+def course_ranks(course):
+    """{student id: CohortRank} for the takers of ``course``"""
+    return {
+        rank.student_id: rank
+        for rank in CohortRank.objects.filter(
+            scope=CohortRank.COURSE, cohort=course_cohort(course.pk)
+        )
+    }
@@ -0,0 +1,197 @@
+"""
+Materialized academic records: per student, level and semester, the
+courses taken with their scores, the credits and points, GPA, CGPA and
+the CGPA before that semester.
+
+Records are rebuilt per student from TakenCourse and the published
+sessions' ArchivedCourseResult whenever the student's courses change,
+through the signals in ``result.signals`` or explicitly by bulk writers,
+which send no signals.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import translation
+
+from .grading import SCORE_FIELDS
+from .models import (
+    AcademicRecord,
+    ArchivedCourseResult,
+    TakenCourse,
+    grade_point_average,
+)
+
+LANGUAGES = [code for code, _ in settings.LANGUAGES]
+DEFAULT_LANGUAGE = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+LEVEL_ORDER = {level: n for n, (level, _) in enumerate(settings.LEVEL_CHOICES)}
+SEMESTER_ORDER = {
+    semester: n for n, (semester, _) in enumerate(settings.SEMESTER_CHOICES)
+}
+DECIMAL_FIELDS = SCORE_FIELDS + ["total", "point"]
+TITLE_FIELDS = [f"course__title_{language}" for language in LANGUAGES]
+ROW_FIELDS = (
+    ["student_id", "course_id", "course__slug", "course__code", "course__credit"]
+    + ["course__level", "course__semester", "course__title"]
+    + TITLE_FIELDS
+    + DECIMAL_FIELDS
+    + ["grade", "comment"]
+)
+ARCHIVE_FIELDS = (
+    ["student_id", "course_id", "slug", "code", "credit", "level", "semester"]
+    + ["titles"]
+    + DECIMAL_FIELDS
+    + ["grade", "comment"]
+)
+
+
+def record_position(level, semester):
+    """Where a level and semester come in a student's studies"""
+    return LEVEL_ORDER.get(level, len(LEVEL_ORDER)) * 10 + SEMESTER_ORDER.get(
+        semester, 9
+    )
+
+
+def course_row(values):
+    """The JSON row of one TakenCourse, from its ``ROW_FIELDS`` values"""
+    titles = {
+        language: values[f"course__title_{language}"]
+        for language in LANGUAGES
+        if values.get(f"course__title_{language}")
+    }
+    return {
+        "course_id": values["course_id"],
+        "slug": values["course__slug"],
+        "code": values["course__code"],
+        "credit": values["course__credit"],
+        "title": titles or {DEFAULT_LANGUAGE: values["course__title"]},
+        "grade": values["grade"],
+        "comment": values["comment"],
+        **{name: str(values[name]) for name in DECIMAL_FIELDS},
+    }
+
+
+def display_rows(rows):
+    """Course rows with decimals restored and the title in the active language"""
+    language = translation.get_language() or DEFAULT_LANGUAGE
+    language = language.split("-")[0]
+    return [
+        {
+            **row,
+            **{name: Decimal(row[name]) for name in DECIMAL_FIELDS},
+            "title": row["title"].get(language)
+            or row["title"].get(DEFAULT_LANGUAGE)
+            or next(iter(row["title"].values()), ""),
+        }
+        for row in rows
+    ]
+
+
+def archived_rows(student_ids):
+    """The ``ROW_FIELDS`` values of the students' archived courses"""
+    rows = ArchivedCourseResult.objects.filter(student_id__in=student_ids).values(
+        *ARCHIVE_FIELDS
+    )
+    for values in rows:
+        titles = values.pop("titles")
+        values.update(
+            {
+                f"course__{name}": values.pop(name)
+                for name in ["slug", "code", "credit", "level", "semester"]
+            }
+        )
+        values["course__title"] = titles.get(DEFAULT_LANGUAGE, "")
+        for language in LANGUAGES:
+            values[f"course__title_{language}"] = titles.get(language)
+        yield values
+
+
+def build_records(rows):
+    """
+    AcademicRecords (unsaved) from the ``ROW_FIELDS`` values of students'
+    TakenCourse rows. CGPA accumulates over the records in study order.
+    """
+    grouped = {}
+    for values in rows:
+        key = (
+            values["student_id"],
+            values["course__level"],
+            values["course__semester"],
+        )
+        grouped.setdefault(key, []).append(values)
+
+    records = []
+    totals = {}
+    for (student_id, level, semester), courses in sorted(
+        grouped.items(),
+        key=lambda item: (item[0][0], record_position(item[0][1], item[0][2])),
+    ):
+        courses.sort(
+            key=lambda values: (values["course__code"], values["course_id"] or 0)
+        )
+        credits = sum(values["course__credit"] or 0 for values in courses)
+        points = sum((values["point"] or 0 for values in courses), Decimal("0.00"))
+        previous_points, previous_credits = totals.get(student_id, (0, 0))
+        totals[student_id] = (previous_points + points, previous_credits + credits)
+        records.append(
+            AcademicRecord(
+                student_id=student_id,
+                level=level,
+                semester=semester,
+                position=record_position(level, semester),
+                credits=credits,
+                points=points,
+                gpa=grade_point_average(points, credits),
+                cgpa=grade_point_average(*totals[student_id]),
+                previous_cgpa=grade_point_average(previous_points, previous_credits),
+                courses=[course_row(values) for values in courses],
+            )
+        )
+    return records
+
+
+def refresh_records(student_ids):
+    """
+    Rebuild the academic records of the given students from their live and
+    archived courses: two reads, one delete and one insert however many
+    students there are. Returns the number of records written.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return 0
+    rows = TakenCourse.objects.filter(student_id__in=student_ids).values(*ROW_FIELDS)
+    records = build_records([*rows, *archived_rows(student_ids)])
+    with transaction.atomic():
+        AcademicRecord.objects.filter(student_id__in=student_ids).delete()
+        AcademicRecord.objects.bulk_create(records, batch_size=500)
+    return len(records)
+
+
+def rebuild_all_records(batch_size=500):
+    """Rebuild every student's records, ``batch_size`` students at a time"""
+    student_ids = sorted(
+        set(TakenCourse.objects.values_list("student_id", flat=True).distinct())
+        | set(
+            ArchivedCourseResult.objects.values_list("student_id", flat=True).distinct()
+        )
+    )
+    AcademicRecord.objects.exclude(student_id__in=student_ids).delete()
+    return sum(
+        refresh_records(student_ids[start : start + batch_size])
+        for start in range(0, len(student_ids), batch_size)
+    )
+
+
+def student_records(student, level=None):
+    """
+    The records of ``student``, optionally at one ``level``, in study order.
+    Students whose records were never built get them built on first read.
+    """
+    records = AcademicRecord.objects.filter(student=student)
+    if level is not None:
+        records = records.filter(level=level)
+    records = list(records.order_by("position"))
+    if not records and not AcademicRecord.objects.filter(student=student).exists():
+        if refresh_records([student.pk]):
+            return student_records(student, level)
+    return records
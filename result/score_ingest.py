@@ -0,0 +1,155 @@
+import logging
+import time
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from .gpa import recompute_results
+from .grading import SCORE_FIELDS, apply_grades
+from .models import TakenCourse
+from .ranking import refresh_course_ranks, refresh_result_ranks
+from .records import refresh_records
+
+logger = logging.getLogger(__name__)
+
+GRADED_FIELDS = SCORE_FIELDS + ["total", "grade", "point", "comment"]
+
+
+class QueryCounter:
+    """Count the queries run on the default connection while installed"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ScoreIngestReport:
+    def __init__(self):
+        self.rows = 0
+        self.errors = {}
+        self.timings = {}
+        self.queries = 0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def elapsed(self):
+        return sum(self.timings.values())
+
+    @property
+    def per_row_ms(self):
+        if not self.rows:
+            return 0.0
+        return self.elapsed * 1000 / self.rows
+
+    def add_error(self, key, message):
+        self.errors.setdefault(str(key), []).append(message)
+
+    def __str__(self):
+        phases = ", ".join(
+            f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.timings.items()
+        )
+        return (
+            f"{self.rows} row(s), {self.queries} queries, "
+            f"{self.per_row_ms:.2f}ms/row ({phases})"
+        )
+
+
+def parse_score_grid(data):
+    """
+    Turn the submitted score sheet into {taken_course_id: [scores]}.
+    Each TakenCourse id is posted once per score column, in SCORE_FIELDS order.
+    """
+    return {
+        key: data.getlist(key) for key in data.keys() if key != "csrfmiddlewaretoken"
+    }
+
+
+def clean_scores(key, values, report):
+    """Validate one row of the grid, returns {field: Decimal} or None"""
+    if len(values) != len(SCORE_FIELDS):
+        report.add_error(key, f"Expected {len(SCORE_FIELDS)} scores.")
+        return None
+    scores = {}
+    for name, value in zip(SCORE_FIELDS, values):
+        field = TakenCourse._meta.get_field(name)
+        try:
+            score = field.clean(value, None)
+        except ValidationError as e:
+            report.add_error(key, f"{name}: {' '.join(e.messages)}")
+            continue
+        if score < Decimal("0"):
+            report.add_error(key, f"{name}: Scores cannot be negative.")
+            continue
+        scores[name] = score
+    return scores if len(scores) == len(SCORE_FIELDS) else None
+
+
+def store_scores(rows, cleaned, semester=None, session=None):
+    """
+    Write cleaned scores onto the loaded TakenCourse rows, grade them in
+    one pass and recompute the affected students' results, records and
+    cohort ranks.
+    """
+    with transaction.atomic():
+        for pk, scores in cleaned.items():
+            for name, score in scores.items():
+                setattr(rows[pk], name, score)
+        taken_courses = apply_grades(rows[pk] for pk in cleaned)
+        TakenCourse.objects.bulk_update(taken_courses, GRADED_FIELDS, batch_size=500)
+        student_ids = {taken.student_id for taken in taken_courses}
+        recompute_results(student_ids, semester, session)
+        refresh_records(student_ids)
+        refresh_course_ranks({taken.course_id for taken in taken_courses})
+        refresh_result_ranks(semester, session, student_ids)
+    return len(taken_courses)
+
+
+def ingest_scores(course, grid, semester=None, session=None):
+    """
+    Validate and store a whole grid of scores for ``course``.
+
+    Nothing is written unless every row is valid. Rows are loaded with a
+    single query, stored with ``bulk_update`` and the students' results are
+    recomputed, all inside one transaction. Returns a ScoreIngestReport.
+    """
+    report = ScoreIngestReport()
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        cleaned = {}
+        for key, values in grid.items():
+            try:
+                pk = int(key)
+            except (TypeError, ValueError):
+                report.add_error(key, "Unknown score row.")
+                continue
+            scores = clean_scores(key, values, report)
+            if scores is not None:
+                cleaned[pk] = scores
+        report.timings["validate"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        rows = (
+            TakenCourse.objects.filter(course=course)
+            .select_related("student__program", "course")
+            .in_bulk(list(cleaned))
+        )
+        for pk in cleaned.keys() - rows.keys():
+            report.add_error(pk, "This student is not taking the course.")
+        report.timings["load"] = time.perf_counter() - started
+
+        if report.ok:
+            started = time.perf_counter()
+            report.rows = store_scores(rows, cleaned, semester, session)
+            report.timings["persist"] = time.perf_counter() - started
+
+    report.queries = counter.count
+    logger.info("Score ingest for course %s: %s", course.pk, report)
+    return report
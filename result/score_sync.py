@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg
+
+from quiz.models import Sitting, percent_expression
+from .grading import apply_grades
+from .models import TakenCourse
+from .ranking import refresh_course_ranks
+from .records import refresh_records
+
+SYNC_FIELDS = ["quiz", "total", "grade", "point", "comment"]
+
+
+def quiz_averages(course_ids=None):
+    """
+    Return ``{(user_id, course_id): average}`` over completed sittings,
+    using the same rounding and clamping as ``Sitting.get_percent_correct``
+    (computed rather than read from ``Sitting.percent``, which may be unset).
+    """
+    sittings = Sitting.objects.filter(complete=True)
+    if course_ids is not None:
+        sittings = sittings.filter(course_id__in=course_ids)
+    rows = (
+        sittings.alias(score_percent=percent_expression())
+        .values("user_id", "course_id")
+        .annotate(average=Avg("score_percent"))
+        .order_by()
+    )
+    return {(row["user_id"], row["course_id"]): row["average"] for row in rows}
+
+
+def sync_quiz_scores(courses=None):
+    """
+    Update ``TakenCourse.quiz`` from the students' quiz sittings.
+
+    ``courses`` may be a single course, an iterable of courses or ids, or
+    ``None`` for every course. Returns the number of rows that changed.
+    """
+    if courses is None:
+        course_ids = None
+    elif hasattr(courses, "pk"):
+        course_ids = [courses.pk]
+    else:
+        course_ids = [getattr(course, "pk", course) for course in courses]
+
+    averages = quiz_averages(course_ids)
+    if not averages:
+        return 0
+
+    taken_courses = TakenCourse.objects.select_related("student", "course")
+    if course_ids is not None:
+        taken_courses = taken_courses.filter(course_id__in=course_ids)
+
+    changed = []
+    for taken in taken_courses:
+        average = averages.get((taken.student.student_id, taken.course_id))
+        if average is None:
+            continue
+        quiz = round(Decimal(str(average)), 2)
+        if quiz == taken.quiz:
+            continue
+        taken.quiz = quiz
+        changed.append(taken)
+
+    if not changed:
+        return 0
+    apply_grades(changed)
+    with transaction.atomic():
+        TakenCourse.objects.bulk_update(changed, SYNC_FIELDS, batch_size=500)
+        refresh_records({taken.student_id for taken in changed})
+        refresh_course_ranks({taken.course_id for taken in changed})
+    return len(changed)
@@ -0,0 +1,251 @@
+"""
+Bulk export of the result sheets of every course in a semester, packed
+into one ZIP that is streamed while the sheets are still rendering.
+
+The TakenCourse rows of the whole semester are read with one query and
+grouped per course in memory. Sheets whose content did not change since
+they were last rendered come from the result sheet cache; the rest are
+rendered in a process pool, so a semester's worth of PDFs is not bound
+to one core. A sheet that fails to render is left out of the archive and
+reported in its ``timings.csv``.
+"""
+import csv
+import io
+import logging
+import multiprocessing
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+
+from core.models import Semester, Session
+from .constants import FAIL, PASS
+from .models import TakenCourse
+from .pdf import course_lecturers, store_result_sheet, stored_result_sheet
+from .sheet_worker import init_worker, render_timed
+
+SHEET_FIELDS = [
+    "course_id",
+    "course__code",
+    "course__title",
+    "course__level",
+    "student__student__username",
+    "student__student__first_name",
+    "student__student__last_name",
+    "total",
+    "grade",
+    "point",
+    "comment",
+]
+TIMING_COLUMNS = ["course", "filename", "students", "source", "seconds", "error"]
+
+logger = logging.getLogger(__name__)
+
+
+def semester_sheets(semester, session):
+    """
+    The result sheets of the courses taken in ``semester``, as
+    (course id, filename, sheet) in course code order. Courses nobody
+    took get no sheet.
+    """
+    rows = (
+        TakenCourse.objects.filter(course__semester=semester.semester)
+        .order_by("course__code", "course_id", "pk")
+        .values_list(*SHEET_FIELDS)
+    )
+    courses = {}
+    for (
+        course_id,
+        code,
+        title,
+        level,
+        username,
+        first_name,
+        last_name,
+        total,
+        grade,
+        point,
+        comment,
+    ) in rows:
+        if course_id not in courses:
+            courses[course_id] = {
+                "course": f"{title} ({code})",
+                "semester": str(semester),
+                "session": str(session),
+                "lecturer": "",
+                "level": str(level),
+                "rows": [],
+                "no_of_pass": 0,
+                "no_of_fail": 0,
+                "code": code,
+            }
+        sheet = courses[course_id]
+        sheet["rows"].append(
+            (
+                username,
+                # Same rule as result_sheet_rows
+                f"{first_name} {last_name}" if first_name and last_name else username,
+                total,
+                grade,
+                point,
+                comment,
+            )
+        )
+        sheet["no_of_pass"] += comment == PASS
+        sheet["no_of_fail"] += comment == FAIL
+
+    lecturers = course_lecturers(list(courses), session)
+    sheets = []
+    for course_id, sheet in courses.items():
+        code = sheet.pop("code")
+        sheet["lecturer"] = lecturers.get(course_id, "")
+        filename = f"{code}_result_sheet.pdf".replace("/", "-")
+        sheets.append((course_id, filename, sheet))
+    return sheets
+
+
+def render_failed(filename, error):
+    logger.error("Rendering the result sheet %s failed", filename, exc_info=error)
+    return f"{type(error).__name__}: {error}"
+
+
+def render_sheets(sheets, processes=None):
+    """
+    Yield (course id, filename, sheet, pdf bytes, source, seconds, error)
+    for each of ``sheets`` as soon as it is ready; cached sheets first, then
+    the rendered ones in the order they finish. A sheet that failed to
+    render has no bytes, "failed" as its source and the error. ``processes=0``
+    renders in this process instead of a pool.
+    """
+    if processes is None:
+        processes = settings.PDF_EXPORT_PROCESSES
+    pending = []
+    for course_id, filename, sheet in sheets:
+        started = time.perf_counter()
+        content = stored_result_sheet(course_id, sheet)
+        if content is None:
+            pending.append((course_id, filename, sheet))
+        else:
+            seconds = time.perf_counter() - started
+            yield course_id, filename, sheet, content, "cached", seconds, ""
+
+    if not pending:
+        return
+    if not processes:
+        for course_id, filename, sheet in pending:
+            started = time.perf_counter()
+            try:
+                content, seconds = render_timed(sheet)
+            except Exception as e:
+                seconds = time.perf_counter() - started
+                error = render_failed(filename, e)
+                yield course_id, filename, sheet, None, "failed", seconds, error
+                continue
+            store_result_sheet(course_id, sheet, content)
+            yield course_id, filename, sheet, content, "rendered", seconds, ""
+        return
+
+    # Spawned rather than forked: the web process runs threads (the PDF job
+    # pool among them) that a forked child would inherit in whatever state
+    # they were in.
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(pending)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    ) as executor:
+        futures = {
+            executor.submit(render_timed, sheet): (course_id, filename, sheet)
+            for course_id, filename, sheet in pending
+        }
+        for future in as_completed(futures):
+            course_id, filename, sheet = futures[future]
+            try:
+                content, seconds = future.result()
+            except Exception as e:
+                # Also what every sheet left gets when a worker process dies
+                error = render_failed(filename, e)
+                yield course_id, filename, sheet, None, "failed", 0, error
+                continue
+            store_result_sheet(course_id, sheet, content)
+            yield course_id, filename, sheet, content, "rendered", seconds, ""
+
+
+class ZipStream:
+    """
+    A write-only file for ZipFile that keeps what was written until it is
+    taken. Having no ``tell``, it makes ZipFile write a streamable archive.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def export_result_sheets(semester, session, processes=None, progress=None):
+    """
+    Yield a ZIP of the semester's result sheets in chunks, one chunk per
+    sheet as it becomes ready. The archive ends with ``timings.csv``, the
+    source and time of each sheet and the error of any that failed.
+    ``progress``, if given, is called with each sheet's timing row.
+    """
+    stream = ZipStream()
+    timings = io.StringIO()
+    writer = csv.writer(timings)
+    writer.writerow(TIMING_COLUMNS)
+    # PDF page streams are compressed already
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_STORED) as archive:
+        sheets = semester_sheets(semester, session)
+        for (
+            course_id,
+            filename,
+            sheet,
+            content,
+            source,
+            seconds,
+            error,
+        ) in render_sheets(sheets, processes):
+            if content is not None:
+                archive.writestr(filename, content)
+            students = len(sheet["rows"])
+            row = [sheet["course"], filename, students, source, f"{seconds:.3f}", error]
+            writer.writerow(row)
+            if progress is not None:
+                progress(row)
+            yield stream.take()
+        archive.writestr("timings.csv", timings.getvalue())
+    yield stream.take()
+
+
+def result_sheets_filename(semester, session):
+    return f"{session}_{semester}_result_sheets.zip".replace("/", "-")
+
+
+def result_sheets_job(params):
+    """
+    PDF job entry point, see core.jobs: the semester's ZIP written to a
+    temporary file
+    """
+    semester = Semester.objects.get(pk=params["semester_id"])
+    session = Session.objects.filter(pk=params["session_id"]).first()
+    output = tempfile.TemporaryFile()
+    try:
+        for chunk in export_result_sheets(semester, session):
+            output.write(chunk)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return result_sheets_filename(semester, session), output
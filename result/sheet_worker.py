@@ -0,0 +1,25 @@
+"""
+Entry points of the result sheet export's pool processes. A spawned
+process imports this module before Django is set up, so it must not
+import models at module level.
+"""
+import time
+
+
+def init_worker():
+    """Get a pool process ready to render: Django set up, PDF assets loaded"""
+    import django
+
+    django.setup()
+    from core.pdf import preload
+
+    preload()
+
+
+def render_timed(sheet):
+    """Render one sheet, returns (pdf bytes, seconds)"""
+    from .pdf import render_result_sheet
+
+    started = time.perf_counter()
+    content = render_result_sheet(sheet)
+    return content, time.perf_counter() - started
@@ -0,0 +1,81 @@
+import contextlib
+import contextvars
+import threading
+
+from django.db import transaction
+
+from .models import TakenCourse
+from .ranking import refresh_course_ranks
+from .records import refresh_records
+
+_muted = contextvars.ContextVar("result_signals_muted", default=False)
+# Students and courses changed in the current thread's transaction
+_pending = threading.local()
+
+
+@contextlib.contextmanager
+def muted():
+    """
+    Skip the records and ranks refreshes of the handlers below, for bulk
+    writers that refresh once themselves afterwards
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def pending():
+    if not hasattr(_pending, "students"):
+        _pending.students, _pending.courses = set(), set()
+    return _pending
+
+
+def refresh_pending():
+    """
+    Refresh the records and course ranks of everything changed since the
+    last refresh. Runs once the transaction commits; the callbacks queued
+    after the first find nothing left to do.
+    """
+    changed = pending()
+    students, courses = changed.students, changed.courses
+    changed.students, changed.courses = set(), set()
+    if students:
+        refresh_records(students)
+    if courses:
+        refresh_course_ranks(courses)
+
+
+def defer_refresh(students=(), courses=()):
+    """
+    Queue a refresh for after the commit, so a transaction writing many
+    rows refreshes each student and course once. Outside a transaction
+    it runs right away.
+    """
+    changed = pending()
+    changed.students.update(students)
+    changed.courses.update(courses)
+    transaction.on_commit(refresh_pending)
+
+
+def refresh_student_records(sender, instance, raw=False, **kwargs):
+    # Fixtures are loaded raw, run rebuild_academic_records afterwards instead
+    if not raw and not _muted.get():
+        defer_refresh(students=[instance.student_id])
+
+
+def refresh_course_records(sender, instance, raw=False, **kwargs):
+    # Credit, level, semester or title may have changed for everyone taking it
+    if not raw and not _muted.get():
+        defer_refresh(
+            students=TakenCourse.objects.filter(course=instance).values_list(
+                "student_id", flat=True
+            )
+        )
+
+
+def refresh_taken_course_ranks(sender, instance, raw=False, **kwargs):
+    # Everyone's rank in the course may move with one student's total
+    if not raw and not _muted.get():
+        defer_refresh(courses=[instance.course_id])
@@ -1,3 +1,576 @@
-from django.test import TestCase
+import io
+import tempfile
+import zipfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+
+from accounts.models import Student, User
+from core.jobs import enqueue_pdf, run_job
+from core.models import PdfJob, Semester, Session
+from course.models import Course, CourseAllocation, Program
+from quiz.models import Quiz, Sitting
+from .archive import publish_session
+from .constants import GRADE_BOUNDARIES, GRADE_POINT_MAPPING
+from .gpa import recompute_results
+from .grading import grade_batch, grade_scores
+from .gradebook import export_gradebook, import_gradebook, read_gradebook
+from .models import (
+    AcademicRecord,
+    ArchivedCourseResult,
+    ArchivedResult,
+    CohortRank,
+    Result,
+    TakenCourse,
+)
+from .pdf import cached_result_sheet, pass_fail_counts
+from .ranking import rank_distribution, refresh_result_ranks, semester_rank_distribution
+from .records import student_records
+from .score_ingest import SCORE_FIELDS, ingest_scores
+from .score_sync import quiz_averages, sync_quiz_scores
+from .sheet_export import export_result_sheets, render_sheets, semester_sheets
+from .views import add_score_for, gradebook_export, sync_quiz_scores_for
+
+
+class ScoreSyncTestCase(TestCase):
+    def setUp(self):
+        program = Program.objects.create(title="Computer Science")
+        self.course = Course.objects.create(
+            title="Algorithms",
+            code="CS101",
+            credit=3,
+            program=program,
+            level="BEGINNER",
+            semester="First",
+        )
+        self.user = User.objects.create(username="student1")
+        self.student = Student.objects.create(
+            student=self.user, level="BEGINNER", program=program
+        )
+        self.taken = TakenCourse.objects.create(
+            student=self.student, course=self.course
+        )
+        self.quiz = Quiz.objects.create(course=self.course, title="Week 1")
+
+    def add_sitting(self, score, questions=4, complete=True):
+        return Sitting.objects.create(
+            user=self.user,
+            quiz=self.quiz,
+            course=self.course,
+            question_count=questions,
+            current_score=score,
+            complete=complete,
+        )
+
+    def test_quiz_averages_match_percent_correct(self):
+        sittings = [self.add_sitting(3), self.add_sitting(1)]
+        self.add_sitting(4, complete=False)
+        expected = sum(s.get_percent_correct for s in sittings) / len(sittings)
+
+        averages = quiz_averages([self.course.pk])
+
+        self.assertEqual(averages, {(self.user.pk, self.course.pk): expected})
+
+    def test_sync_updates_changed_rows_only(self):
+        self.add_sitting(3)
+
+        self.assertEqual(sync_quiz_scores(self.course), 1)
+        self.taken.refresh_from_db()
+        self.assertEqual(self.taken.quiz, Decimal("75.00"))
+        self.assertEqual(self.taken.total, Decimal("75.00"))
+        self.assertEqual(self.taken.grade, "B+")
+
+        with self.assertNumQueries(2):
+            self.assertEqual(sync_quiz_scores(self.course), 0)
+
+    def test_sync_view_needs_the_course_allocated(self):
+        self.add_sitting(3)
+        request = RequestFactory().post("/")
+        request.user = User.objects.create(username="lecturer")
+        request.user.is_lecturer = True
+        request.user.save()
+
+        with self.assertRaises(Http404):
+            sync_quiz_scores_for(request, self.course.pk)
+        self.taken.refresh_from_db()
+        self.assertEqual(self.taken.quiz, Decimal("0.00"))
+
+
+class CohortMixin:
+    def setUp(self):
+        self.session = Session.objects.create(
+            session="2024/2025", is_current_session=True
+        )
+        self.semester = Semester.objects.create(
+            semester="First", is_current_semester=True, session=self.session
+        )
+        program = Program.objects.create(title="Computer Science")
+        self.students = []
+        for n in range(3):
+            user = User.objects.create(username=f"student{n}")
+            student = Student.objects.create(
+                student=user, level="BEGINNER", program=program
+            )
+            self.students.append(student)
+        courses = [
+            Course.objects.create(
+                title=f"Course {n}",
+                code=f"CS10{n}",
+                credit=credit,
+                program=program,
+                level="BEGINNER",
+                semester=semester,
+            )
+            for n, (credit, semester) in enumerate(
+                [(3, "First"), (2, "First"), (4, "Second")]
+            )
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            for student in self.students:
+                for course, final_exam in zip(courses, [90, 50, 70]):
+                    TakenCourse.objects.create(
+                        student=student, course=course, final_exam=final_exam
+                    )
+        self.courses = courses
+
+
+class RecomputeResultsTestCase(CohortMixin, TestCase):
+    def test_matches_per_instance_calculation(self):
+        taken = TakenCourse.objects.filter(student=self.students[0]).first()
+
+        self.assertEqual(recompute_results(), 3)
+
+        result = Result.objects.get(student=self.students[0])
+        self.assertEqual(result.gpa, float(taken.calculate_gpa()))
+        self.assertEqual(result.cgpa, float(taken.calculate_cgpa()))
+        self.assertEqual((result.semester, result.session), ("First", "2024/2025"))
+
+    def test_query_count_is_constant(self):
+        recompute_results()
+        TakenCourse.objects.update(point=0)
+        with self.assertNumQueries(8):
+            self.assertEqual(recompute_results(), 3)
+
+    def test_student_without_courses_gets_no_result(self):
+        user = User.objects.create(username="student3")
+        idle = Student.objects.create(
+            student=user, level="BEGINNER", program=self.students[0].program
+        )
+
+        self.assertEqual(recompute_results(), 3)
+        self.assertFalse(Result.objects.filter(student=idle).exists())
+
+
+class ScoreIngestTestCase(CohortMixin, TestCase):
+    def grid(self, **overrides):
+        scores = {name: "10" for name in SCORE_FIELDS}
+        scores.update(overrides)
+        return {
+            str(taken.pk): [scores[name] for name in SCORE_FIELDS]
+            for taken in TakenCourse.objects.filter(course=self.courses[0])
+        }
+
+    def test_stores_grid_and_results(self):
+        report = ingest_scores(self.courses[0], self.grid(final_exam="55.5"))
+
+        self.assertTrue(report.ok)
+        self.assertEqual(report.rows, 3)
+        self.assertGreater(report.queries, 0)
+        taken = TakenCourse.objects.get(
+            student=self.students[0], course=self.courses[0]
+        )
+        self.assertEqual(taken.total, Decimal("95.50"))
+        self.assertEqual(taken.grade, "A+")
+        self.assertEqual(Result.objects.count(), 3)
+
+    def test_invalid_grid_writes_nothing(self):
+        grid = self.grid()
+        grid[next(iter(grid))][0] = "abc"
+        other = TakenCourse.objects.filter(course=self.courses[1]).first()
+        grid[str(other.pk)] = ["1"] * len(SCORE_FIELDS)
+
+        report = ingest_scores(self.courses[0], grid)
+
+        self.assertFalse(report.ok)
+        self.assertEqual(len(report.errors), 2)
+        self.assertFalse(TakenCourse.objects.filter(assignment=Decimal("10")).exists())
+
+    def test_score_page_needs_the_course_allocated(self):
+        request = RequestFactory().post("/", {})
+        request.user = User.objects.create(username="lecturer")
+        request.user.is_lecturer = True
+        request.user.save()
+
+        with self.assertRaises(Http404):
+            add_score_for(request, self.courses[0].pk)
+        request.method = "GET"
+        with self.assertRaises(Http404):
+            add_score_for(request, 0)
+
+
+class GradebookTestCase(CohortMixin, TestCase):
+    def test_export_streams_every_enrolment(self):
+        lines = list(export_gradebook(self.courses[0], chunk_size=2))
+
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("id_no,full_name,assignment"))
+        self.assertIn("90.00,A+", lines[1])
+
+    def test_import_csv_reports_bad_rows(self):
+        upload = SimpleUploadedFile(
+            "scores.csv",
+            b"id_no,assignment,mid_exam,quiz,attendance,final_exam\n"
+            b"student0,10,10,10,10,5\n"
+            b"student1,10,x,10,10,5\n"
+            b"nobody,1,1,1,1,1\n",
+        )
+
+        report = import_gradebook(self.courses[0], read_gradebook(upload), chunk_size=2)
+
+        self.assertEqual(report.rows, 1)
+        self.assertEqual(sorted(report.errors), ["line 3", "line 4"])
+        taken = TakenCourse.objects.get(
+            student=self.students[0], course=self.courses[0]
+        )
+        self.assertEqual((taken.total, taken.grade), (Decimal("45.00"), "D"))
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            read_gradebook(SimpleUploadedFile("scores.pdf", b""))
+
+    def test_duplicates_are_caught_across_chunks(self):
+        upload = SimpleUploadedFile(
+            "scores.csv",
+            b"id_no,assignment,mid_exam,quiz,attendance,final_exam\n"
+            b"student0,10,10,10,10,5\n"
+            b"student1,10,10,10,10,5\n"
+            b"student0,1,1,1,1,1\n",
+        )
+
+        report = import_gradebook(self.courses[0], read_gradebook(upload), chunk_size=2)
+
+        self.assertEqual(report.rows, 2)
+        self.assertEqual(list(report.errors), ["line 4"])
+        taken = TakenCourse.objects.get(
+            student=self.students[0], course=self.courses[0]
+        )
+        self.assertEqual(taken.total, Decimal("45.00"))
+
+    def test_corrupt_xlsx_is_a_value_error(self):
+        upload = SimpleUploadedFile("scores.xlsx", b"not a zip file")
+
+        with self.assertRaises(ValueError):
+            import_gradebook(self.courses[0], read_gradebook(upload))
+
+    def test_only_allocated_lecturers_use_the_gradebook(self):
+        request = RequestFactory().get("/")
+        # Flagged after creation, new lecturer accounts wait for activation
+        request.user = User.objects.create(username="lecturer")
+        request.user.is_lecturer = True
+        request.user.save()
+
+        with self.assertRaises(Http404):
+            gradebook_export(request, self.courses[0].pk)
+
+        allocation = CourseAllocation.objects.create(lecturer=request.user)
+        allocation.courses.add(self.courses[0])
+        self.assertEqual(gradebook_export(request, self.courses[0].pk).status_code, 200)
+
+
+class GradingKernelTestCase(TestCase):
+    def scalar_grade(self, total, credit):
+        grade = next((g for b, g in GRADE_BOUNDARIES if total >= b), "NG")
+        point = Decimal(credit) * Decimal(GRADE_POINT_MAPPING[grade])
+        return total, grade, point, "FAIL" if grade in ("F", "NG") else "PASS"
+
+    def test_matches_scalar_rules_on_boundaries(self):
+        totals = [Decimal("-0.01"), Decimal("0"), Decimal("44.99"), Decimal("45")]
+        totals += [Decimal(b) for b, _ in GRADE_BOUNDARIES] + [Decimal("100")]
+        scores = [[t - Decimal("0.01"), Decimal("0.01"), 0, 0, 0] for t in totals]
+
+        graded = grade_scores(scores, [3] * len(totals))
+
+        self.assertEqual(graded, [self.scalar_grade(t, 3) for t in totals])
+
+    def test_batch_of_nothing(self):
+        totals, grades, points, comments = grade_batch([], [])
+        self.assertEqual(len(totals) + len(grades) + len(points) + len(comments), 0)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class ResultSheetCacheTestCase(CohortMixin, TestCase):
+    def test_pass_fail_counts(self):
+        self.assertEqual(
+            pass_fail_counts(self.courses[1]), {"no_of_pass": 3, "no_of_fail": 0}
+        )
+
+    def test_renders_once_until_scores_change(self):
+        args = (self.courses[0], self.semester, self.session)
+        first = cached_result_sheet(*args)
+        self.assertTrue(first.startswith(b"%PDF"))
+
+        with self.assertNumQueries(3):
+            self.assertEqual(cached_result_sheet(*args), first)
+
+        taken = TakenCourse.objects.filter(course=self.courses[0]).first()
+        taken.final_exam = 10
+        taken.save()
+        self.assertNotEqual(cached_result_sheet(*args), first)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_single_sheet_and_export_share_the_cache(self):
+        lecturer = User.objects.create(
+            username="lecturer", first_name="Ada", last_name="Obi"
+        )
+        allocation = CourseAllocation.objects.create(
+            lecturer=lecturer, session=self.session
+        )
+        allocation.courses.add(self.courses[0])
+        first = cached_result_sheet(self.courses[0], self.semester, self.session)
+
+        sheets = semester_sheets(self.semester, self.session)
+        rows = list(render_sheets(sheets, 0))
+
+        self.assertEqual([row[4] for row in rows], ["cached", "rendered"])
+        self.assertEqual(rows[0][3], first)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class SheetExportTestCase(CohortMixin, TestCase):
+    def test_semester_sheets_read_together(self):
+        lecturer = User.objects.create(
+            username="lecturer", first_name="Ada", last_name="Obi"
+        )
+        allocation = CourseAllocation.objects.create(
+            lecturer=lecturer, session=self.session
+        )
+        allocation.courses.add(self.courses[0])
+
+        with self.assertNumQueries(2):
+            sheets = semester_sheets(self.semester, self.session)
+
+        self.assertEqual(
+            [course_id for course_id, _, _ in sheets],
+            [
+                self.courses[0].pk,
+                self.courses[1].pk,
+            ],
+        )
+        _, filename, sheet = sheets[0]
+        self.assertEqual(filename, "CS100_result_sheet.pdf")
+        self.assertEqual(sheet["lecturer"], "Ada Obi")
+        self.assertEqual(len(sheet["rows"]), 3)
+        self.assertEqual(sheet["no_of_pass"], 3)
+
+    def test_zip_of_rendered_then_cached_sheets(self):
+        content = b"".join(export_result_sheets(self.semester, self.session, 1))
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()),
+                ["CS100_result_sheet.pdf", "CS101_result_sheet.pdf", "timings.csv"],
+            )
+            self.assertTrue(archive.read("CS100_result_sheet.pdf").startswith(b"%PDF"))
+            self.assertEqual(archive.read("timings.csv").decode().count("rendered"), 2)
+
+        content = b"".join(export_result_sheets(self.semester, self.session, 1))
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(archive.read("timings.csv").decode().count("cached"), 2)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_failed_sheet_is_reported_not_fatal(self):
+        sheets = semester_sheets(self.semester, self.session)
+        course_id, _, sheet = sheets[0]
+        broken = {key: value for key, value in sheet.items() if key != "semester"}
+        sheets.append((course_id, "broken.pdf", broken))
+
+        rows = list(render_sheets(sheets, 0))
+
+        self.assertEqual([row[4] for row in rows], ["rendered", "rendered", "failed"])
+        self.assertIsNone(rows[2][3])
+        self.assertIn("KeyError", rows[2][6])
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PDF_EXPORT_PROCESSES=0)
+    def test_export_runs_as_a_stored_job(self):
+        admin = User.objects.create(username="admin1", is_superuser=True)
+        job = enqueue_pdf(
+            admin,
+            "result_sheets",
+            semester_id=self.semester.pk,
+            session_id=self.session.pk,
+        )
+
+        self.assertTrue(run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.DONE)
+        self.assertEqual(job.filename, "2024-2025_First_result_sheets.zip")
+        with job.file.open("rb") as content, zipfile.ZipFile(content) as archive:
+            self.assertIn("timings.csv", archive.namelist())
+
+
+class AcademicRecordTestCase(CohortMixin, TestCase):
+    def test_records_follow_taken_courses(self):
+        student = self.students[0]
+        first, second = AcademicRecord.objects.filter(student=student)
+
+        self.assertEqual((first.semester, first.credits), ("First", 5))
+        # A+ (4.0 x 3) and C- (1.75 x 2) in the first semester, B (3.0 x 4) after
+        self.assertEqual((first.points, first.gpa), (Decimal("15.50"), Decimal("3.10")))
+        self.assertEqual(
+            (second.gpa, second.cgpa, second.previous_cgpa),
+            (Decimal("3.00"), Decimal("3.06"), Decimal("3.10")),
+        )
+        self.assertEqual([row["code"] for row in first.course_rows], ["CS100", "CS101"])
+        self.assertEqual(first.course_rows[0]["total"], Decimal("90.00"))
+
+        taken = TakenCourse.objects.get(student=student, course=self.courses[2])
+        taken.final_exam = 40
+        with self.captureOnCommitCallbacks(execute=True):
+            taken.save()
+        self.assertEqual(
+            AcademicRecord.objects.get(student=student, semester="Second").gpa,
+            Decimal("0.00"),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            taken.delete()
+        self.assertEqual(AcademicRecord.objects.filter(student=student).count(), 1)
+
+    def test_refresh_waits_for_commit_and_runs_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for taken in TakenCourse.objects.filter(course=self.courses[2]):
+                taken.final_exam = 40
+                taken.save()
+        second = AcademicRecord.objects.filter(semester="Second")
+        self.assertEqual(set(second.values_list("gpa", flat=True)), {Decimal("3.00")})
+
+        callbacks[0]()
+        with self.assertNumQueries(0):
+            for callback in callbacks[1:]:
+                callback()
+        self.assertEqual(set(second.values_list("gpa", flat=True)), {Decimal("0.00")})
+
+    def test_bulk_score_writes_refresh_records(self):
+        grid = {
+            str(taken.pk): ["0"] * len(SCORE_FIELDS)
+            for taken in TakenCourse.objects.filter(course=self.courses[0])
+        }
+
+        self.assertTrue(ingest_scores(self.courses[0], grid).ok)
+
+        for record in AcademicRecord.objects.filter(semester="First"):
+            self.assertEqual(record.points, Decimal("3.50"))
+
+    def test_student_records_is_one_read(self):
+        student = self.students[1]
+        AcademicRecord.objects.all().delete()
+        self.assertEqual(len(student_records(student, student.level)), 2)
+
+        with self.assertNumQueries(1):
+            records = student_records(student, student.level)
+        self.assertEqual(records[1].previous_cgpa, Decimal("3.10"))
+
+
+class CohortRankTestCase(CohortMixin, TestCase):
+    def test_course_ranks_follow_score_changes(self):
+        taken = TakenCourse.objects.get(
+            student=self.students[0], course=self.courses[0]
+        )
+        taken.final_exam = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            taken.save()
+
+        ranks = {
+            rank.student_id: (rank.rank, rank.percentile, rank.cohort_size)
+            for rank in CohortRank.objects.filter(
+                scope=CohortRank.COURSE, cohort=str(self.courses[0].pk)
+            )
+        }
+        self.assertEqual(ranks[self.students[0].pk], (3, Decimal("0.00"), 3))
+        self.assertEqual(ranks[self.students[1].pk], (1, Decimal("50.00"), 3))
+
+    def test_result_ranks_and_distribution(self):
+        recompute_results()
+        Result.objects.filter(student=self.students[2]).update(gpa=1.5, cgpa=1.5)
+
+        self.assertEqual(refresh_result_ranks(), 6)
+        session_rank = CohortRank.objects.get(
+            scope=CohortRank.SESSION, student=self.students[2]
+        )
+        self.assertEqual((session_rank.rank, session_rank.cohort_size), (3, 3))
+
+        with self.assertNumQueries(1):
+            (cohort,) = semester_rank_distribution(self.semester, self.session)
+        self.assertEqual(cohort["label"], "Computer Science BEGINNER")
+        self.assertEqual([band["count"] for band in cohort["bands"]], [1, 0, 2, 0])
+        self.assertEqual(len(rank_distribution(CohortRank.COURSE)), 3)
+
+
+class PublishSessionTestCase(CohortMixin, TestCase):
+    def record_values(self, student):
+        return [
+            (record.semester, record.gpa, record.cgpa, record.courses)
+            for record in student_records(student)
+        ]
+
+    def test_publish_moves_results_to_archive(self):
+        recompute_results()
+        before = self.record_values(self.students[0])
+
+        publication = publish_session(self.session)
+
+        self.assertEqual((publication.course_results, publication.results), (9, 3))
+        self.assertFalse(TakenCourse.objects.exists())
+        self.assertFalse(Result.objects.exists())
+        self.assertEqual(ArchivedResult.objects.count(), 3)
+        self.assertEqual(self.record_values(self.students[0]), before)
+        with self.assertRaises(ValueError):
+            publish_session(self.session)
+        with self.assertRaises(ValueError):
+            ArchivedCourseResult.objects.update(total=0)
+        self.assertFalse(CohortRank.objects.exists())
+
+    def test_earlier_live_results_need_including(self):
+        Result.objects.create(
+            student=self.students[0], semester="First", session="2023/2024", gpa=2
+        )
+        with self.assertRaises(ValueError):
+            publish_session(self.session)
+        self.assertFalse(ArchivedCourseResult.objects.exists())
+
+        publication = publish_session(self.session, include_earlier=True)
+
+        self.assertEqual(publication.results, 1)
+        self.assertEqual(ArchivedResult.objects.get().session, "2023/2024")
+
+    def test_cgpa_counts_published_sessions(self):
+        publish_session(self.session)
+        self.session.is_current_session = False
+        self.session.save()
+        session = Session.objects.create(session="2025/2026", is_current_session=True)
+        self.semester.session = session
+        self.semester.save()
+        course = Course.objects.create(
+            title="Course 3",
+            code="CS200",
+            credit=3,
+            program=self.students[0].program,
+            level="BEGINNER",
+            semester="First",
+        )
+        TakenCourse.objects.create(
+            student=self.students[0], course=course, final_exam=0
+        )
+
+        recompute_results([self.students[0].pk])
+
+        result = Result.objects.get(student=self.students[0])
+        self.assertEqual(result.session, "2025/2026")
+        self.assertEqual(result.gpa, 0.0)
+        self.assertEqual(result.cgpa, 2.29)
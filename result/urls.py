@@ -2,19 +2,39 @@ from django.urls import path
 from .views import (
     add_score,
     add_score_for,
+    sync_quiz_scores_for,
+    gradebook_export,
+    gradebook_import,
     grade_result,
     assessment_result,
     course_registration_form,
     result_sheet_pdf_view,
+    result_sheets_export,
+    publish_session_results,
 )
 
 
 urlpatterns = [
     path("manage-score/", add_score, name="add_score"),
     path("manage-score/<int:id>/", add_score_for, name="add_score_for"),
+    path(
+        "manage-score/<int:id>/sync-quiz/",
+        sync_quiz_scores_for,
+        name="sync_quiz_scores_for",
+    ),
+    path(
+        "manage-score/<int:id>/export/", gradebook_export, name="gradebook_export"
+    ),
+    path(
+        "manage-score/<int:id>/import/", gradebook_import, name="gradebook_import"
+    ),
     path("grade/", grade_result, name="grade_results"),
     path("assessment/", assessment_result, name="ass_results"),
     path("result/print/<int:id>/", result_sheet_pdf_view, name="result_sheet_pdf_view"),
+    path("result/sheets/export/", result_sheets_export, name="result_sheets_export"),
+    path(
+        "result/publish/<int:pk>/", publish_session_results, name="publish_session"
+    ),
     path(
         "registration/form/", course_registration_form, name="course_registration_form"
     ),
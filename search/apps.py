@@ -3,3 +3,16 @@ from django.apps import AppConfig
 
 class SearchConfig(AppConfig):
     name = "search"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .index import search_models
+        from .signals import delete_search_document, update_search_document
+
+        for model in search_models():
+            post_save.connect(
+                update_search_document, sender=model, dispatch_uid="search_index"
+            )
+            post_delete.connect(
+                delete_search_document, sender=model, dispatch_uid="search_index"
+            )
@@ -0,0 +1,118 @@
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import translation
+
+from .models import SearchDocument, index_languages
+
+# Model label -> (title field, other searchable fields, select_related used
+# when the results are displayed)
+SEARCH_MODELS = {
+    "core.NewsAndEvents": ("title", ["summary", "posted_as"], []),
+    "course.Program": ("title", ["summary"], []),
+    "course.Course": ("title", ["summary", "code", "slug"], ["program"]),
+    "quiz.Quiz": ("title", ["description", "category", "slug"], ["course"]),
+}
+
+
+def search_models():
+    return [apps.get_model(label) for label in SEARCH_MODELS]
+
+
+def search_spec(model):
+    return SEARCH_MODELS.get(model._meta.label)
+
+
+def document_fields(instance, language):
+    """
+    Title and body of ``instance`` in ``language``. Translated fields are
+    read through modeltranslation, so a missing translation falls back to
+    the default language just like on the site.
+    """
+    title_field, body_fields, _ = search_spec(type(instance))
+    with translation.override(language):
+        title = getattr(instance, title_field) or ""
+        body = " ".join(str(getattr(instance, name) or "") for name in body_fields)
+    return {"title": str(title), "body": body}
+
+
+def documents_for(instance, content_type):
+    return [
+        SearchDocument(
+            content_type=content_type,
+            object_id=instance.pk,
+            language=language,
+            **document_fields(instance, language),
+        )
+        for language in index_languages()
+    ]
+
+
+def index_instance(instance):
+    content_type = ContentType.objects.get_for_model(instance)
+    with transaction.atomic():
+        SearchDocument.objects.filter(
+            content_type=content_type, object_id=instance.pk
+        ).delete()
+        SearchDocument.objects.bulk_create(documents_for(instance, content_type))
+
+
+def remove_instance(instance):
+    SearchDocument.objects.filter(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk,
+    ).delete()
+
+
+def rebuild_index(batch_size=500):
+    """
+    Drop and re-create every search document in one transaction, so the
+    old index stays in place should the rebuild fail. Objects are read and
+    their documents written ``batch_size`` objects at a time. Returns how
+    many documents were written.
+    """
+    count = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for model in search_models():
+            content_type = ContentType.objects.get_for_model(model)
+            instances = model._default_manager.order_by("pk")
+            last_pk = None
+            while True:
+                page = (
+                    instances if last_pk is None else instances.filter(pk__gt=last_pk)
+                )
+                chunk = list(page[:batch_size])
+                if not chunk:
+                    break
+                last_pk = chunk[-1].pk
+                documents = [
+                    document
+                    for instance in chunk
+                    for document in documents_for(instance, content_type)
+                ]
+                SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+                count += len(documents)
+    return count
+
+
+def resolve(documents):
+    """
+    Load the objects behind a page of search documents, in the same order,
+    with one query per model type. Documents whose object is gone are skipped.
+    """
+    documents = list(documents)
+    ids_by_type = {}
+    for document in documents:
+        ids_by_type.setdefault(document.content_type_id, []).append(document.object_id)
+    objects = {}
+    for content_type_id, ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        queryset = model._default_manager.select_related(*search_spec(model)[2])
+        for pk, instance in queryset.in_bulk(ids).items():
+            objects[content_type_id, pk] = instance
+    return [
+        objects[key]
+        for key in ((d.content_type_id, d.object_id) for d in documents)
+        if key in objects
+    ]
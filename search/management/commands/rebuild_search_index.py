@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index from news, programs, courses and quizzes"
+
+    def handle(self, *args, **options):
+        written = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} document(s)."))
@@ -0,0 +1,92 @@
+from django.db import migrations
+
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE search_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX search_searchdocument_vector_idx
+    ON search_searchdocument USING gin (search_vector)
+    """,
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS search_searchdocument_vector_idx",
+    "ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+# External content FTS5 table kept in step with search_searchdocument
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5(
+        title, body, content='search_searchdocument', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_ai AFTER INSERT ON search_searchdocument
+    BEGIN
+        INSERT INTO search_searchdocument_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_ad AFTER DELETE ON search_searchdocument
+    BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_au AFTER UPDATE ON search_searchdocument
+    BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_searchdocument_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    INSERT INTO search_searchdocument_fts(search_searchdocument_fts)
+    VALUES ('rebuild')
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS search_searchdocument_ai",
+    "DROP TRIGGER IF EXISTS search_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS search_searchdocument_au",
+    "DROP TABLE IF EXISTS search_searchdocument_fts",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index for the search documents. PostgreSQL gets a generated
+    tsvector column with a GIN index, SQLite an FTS5 table; other databases
+    search with icontains and need nothing here.
+    """
+
+    dependencies = [
+        ("search", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(
+                {"postgresql": POSTGRESQL_FORWARD, "sqlite": SQLITE_FORWARD}
+            ),
+            run_for_vendor(
+                {"postgresql": POSTGRESQL_BACKWARD, "sqlite": SQLITE_BACKWARD}
+            ),
+        ),
+    ]
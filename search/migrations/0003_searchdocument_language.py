@@ -0,0 +1,50 @@
+# Generated by Django 4.0.8 on 2026-10-17 20:34
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+backend_index = import_module("search.migrations.0002_backend_index")
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    # SQLite adds the column by re-creating the table, which drops the FTS
+    # triggers created in 0002. Put them back and re-index.
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in backend_index.SQLITE_BACKWARD[:3] + backend_index.SQLITE_FORWARD[1:]:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0002_backend_index"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="searchdocument",
+            name="unique_search_document",
+        ),
+        migrations.AddField(
+            model_name="searchdocument",
+            name="language",
+            field=models.CharField(default="en", max_length=7),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="searchdocument",
+            index=models.Index(
+                fields=["language", "content_type"],
+                name="search_sear_languag_ecd1a7_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="searchdocument",
+            constraint=models.UniqueConstraint(
+                fields=("content_type", "object_id", "language"),
+                name="unique_search_document_language",
+            ),
+        ),
+        migrations.RunPython(restore_sqlite_triggers, migrations.RunPython.noop),
+    ]
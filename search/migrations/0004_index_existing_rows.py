@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import migrations
+
+# Model -> (title field, other searchable fields), as search.index had them
+# when this migration was written
+SEARCH_MODELS = {
+    ("core", "NewsAndEvents"): ("title", ["summary", "posted_as"]),
+    ("course", "Program"): ("title", ["summary"]),
+    ("course", "Course"): ("title", ["summary", "code", "slug"]),
+    ("quiz", "Quiz"): ("title", ["description", "category", "slug"]),
+}
+BATCH_SIZE = 500
+
+
+def translated(instance, field, language, names):
+    """The field in ``language``, falling back like modeltranslation does"""
+    default = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+    for name in [f"{field}_{language}", f"{field}_{default}", field]:
+        if name in names and getattr(instance, name):
+            return str(getattr(instance, name))
+    return ""
+
+
+def index_existing_rows(apps, schema_editor):
+    """
+    Index the rows that existed before the search index did. New and saved
+    rows are indexed as they are written; ``rebuild_search_index`` rebuilds
+    everything later on.
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    SearchDocument = apps.get_model("search", "SearchDocument")
+    languages = [code for code, _ in settings.LANGUAGES]
+
+    SearchDocument.objects.all().delete()
+    for (app_label, model_name), (title_field, body_fields) in SEARCH_MODELS.items():
+        model = apps.get_model(app_label, model_name)
+        names = {field.name for field in model._meta.fields}
+        content_type, _ = ContentType.objects.get_or_create(
+            app_label=app_label, model=model_name.lower()
+        )
+        instances = model.objects.order_by("pk")
+        last_pk = 0
+        while True:
+            chunk = list(instances.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            SearchDocument.objects.bulk_create(
+                [
+                    SearchDocument(
+                        content_type=content_type,
+                        object_id=instance.pk,
+                        language=language,
+                        title=translated(instance, title_field, language, names),
+                        body=" ".join(
+                            translated(instance, field, language, names)
+                            for field in body_fields
+                        ),
+                    )
+                    for instance in chunk
+                    for language in languages
+                ],
+                batch_size=BATCH_SIZE,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("core", "0004_pdfjob"),
+        ("course", "0007_alter_course_summary_alter_course_summary_en_and_more"),
+        ("quiz", "0012_sitting_in_statistics"),
+        ("search", "0003_searchdocument_language"),
+    ]
+
+    operations = [
+        migrations.RunPython(index_existing_rows, migrations.RunPython.noop),
+    ]
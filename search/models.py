@@ -1,3 +1,127 @@
-from django.db import models
+import re
 
-# Create your models here.
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils import translation
+
+FTS_TABLE = "search_searchdocument_fts"
+
+
+def index_languages():
+    return [code for code, _ in settings.LANGUAGES]
+
+
+def search_language(language=None):
+    """
+    The index language for ``language`` (default: the active one), e.g.
+    "en" for "en-us". Unknown languages fall back to the default language.
+    """
+    language = (language or translation.get_language() or "").split("-")[0]
+    if language in index_languages():
+        return language
+    return settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+
+
+def search_terms(query):
+    """Split a user query into plain word tokens safe to hand to the FTS engines"""
+    return re.findall(r"\w+", query or "")
+
+
+class SearchDocumentQuerySet(models.QuerySet):
+    def search(self, query, language=None):
+        """
+        Documents in ``language`` (default: the active one) matching every
+        word of ``query`` (as a prefix), annotated with ``rank`` and best
+        matches first. Uses the PostgreSQL tsvector column or the SQLite FTS5
+        table created by the migrations, other databases fall back to
+        ``icontains``.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return self.none()
+        documents = self.filter(language=search_language(language))
+        search = getattr(
+            documents, f"_search_{connection.vendor}", documents._search_fallback
+        )
+        return search(terms).order_by("-rank", "-pk")
+
+    def object_ids(self, model, query, language=None):
+        """Primary keys of the ``model`` objects matching ``query``"""
+        return (
+            self.search(query, language)
+            .filter(content_type=ContentType.objects.get_for_model(model))
+            .values("object_id")
+        )
+
+    def _search_postgresql(self, terms):
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return self.annotate(
+            rank=RawSQL(
+                "ts_rank(search_searchdocument.search_vector, "
+                "to_tsquery('simple', %s))",
+                (tsquery,),
+                output_field=FloatField(),
+            )
+        ).filter(
+            RawSQL(
+                "search_searchdocument.search_vector @@ to_tsquery('simple', %s)",
+                (tsquery,),
+                output_field=BooleanField(),
+            )
+        )
+
+    def _search_sqlite(self, terms):
+        match = " ".join('"{}"*'.format(term) for term in terms)
+        return self.annotate(
+            # bm25 is lower for better matches; titles weigh more, as with
+            # the setweight() labels on PostgreSQL
+            rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 4.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s "
+                f"AND {FTS_TABLE}.rowid = search_searchdocument.id",
+                (match,),
+                output_field=FloatField(),
+            )
+        ).filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,)
+            )
+        )
+
+    def _search_fallback(self, terms):
+        lookups = Q()
+        for term in terms:
+            lookups &= Q(title__icontains=term) | Q(body__icontains=term)
+        return self.filter(lookups).annotate(rank=Value(0.0, FloatField()))
+
+
+class SearchDocument(models.Model):
+    """
+    One searchable object in one language, kept in sync by search.signals.
+    Translated fields are indexed per language so a search only looks at
+    the documents of the active language.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    language = models.CharField(max_length=7)
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SearchDocumentQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id", "language"],
+                name="unique_search_document_language",
+            )
+        ]
+        indexes = [models.Index(fields=["language", "content_type"])]
+
+    def __str__(self):
+        return self.title
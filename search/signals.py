@@ -0,0 +1,11 @@
+from .index import index_instance, remove_instance
+
+
+def update_search_document(sender, instance, raw=False, **kwargs):
+    # Fixtures are loaded raw, rebuild the index afterwards instead
+    if not raw:
+        index_instance(instance)
+
+
+def delete_search_document(sender, instance, **kwargs):
+    remove_instance(instance)
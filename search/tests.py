@@ -1,3 +1,94 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase
+from django.utils import translation
+
+from core.models import NewsAndEvents
+from course.models import Course, Program
+from .index import rebuild_index
+from .models import SearchDocument
+from .views import SearchView
+
+
+class SearchIndexTestCase(TestCase):
+    def setUp(self):
+        self.program = Program.objects.create(
+            title="Computer Science", summary="Algorithms and systems"
+        )
+        self.course = Course.objects.create(
+            title="Algorithms",
+            code="CS101",
+            program=self.program,
+            level="BEGINNER",
+            semester="First",
+        )
+        self.news = NewsAndEvents.objects.create(
+            title="Exam week", summary="Algorithms exam schedule", posted_as="News"
+        )
+
+    def search(self, query):
+        return [
+            (document.content_type.model, document.object_id)
+            for document in SearchDocument.objects.search(query)
+        ]
+
+    def test_signals_keep_index_in_sync(self):
+        self.assertEqual(SearchDocument.objects.filter(language="en").count(), 3)
+        self.assertIn(("course", self.course.pk), self.search("cs10"))
+
+        self.course.title = "Data Structures"
+        self.course.code = "CS201"
+        self.course.save()
+        self.assertNotIn(("course", self.course.pk), self.search("cs10"))
+
+        self.news.delete()
+        self.assertEqual(self.search("schedule"), [])
+
+    def test_results_are_ranked(self):
+        results = self.search("algorithms")
+
+        self.assertEqual(len(results), 3)
+        # Title matches weigh more than summary matches
+        self.assertEqual(results[0], ("course", self.course.pk))
+
+    def test_every_word_must_match(self):
+        self.assertEqual(
+            self.search("exam schedule"), [("newsandevents", self.news.pk)]
+        )
+        self.assertEqual(self.search('"exam" OR'), [])
+        self.assertEqual(self.search("  "), [])
+
+    def test_rebuild_index(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(rebuild_index(batch_size=1), 3 * 4)
+        self.assertEqual(len(self.search("algorithms")), 3)
+
+    def test_failed_rebuild_keeps_the_index(self):
+        failing = mock.patch("search.index.documents_for", side_effect=ValueError)
+        with failing, self.assertRaises(ValueError):
+            rebuild_index()
+        self.assertEqual(len(self.search("algorithms")), 3)
+
+    def test_view_pages_objects(self):
+        request = RequestFactory().get("/search/", {"q": "algorithms"})
+        response = SearchView.as_view(paginate_by=2)(request)
+
+        self.assertEqual(response.context_data["count"], 3)
+        self.assertEqual(len(response.context_data["object_list"]), 2)
+        self.assertIsInstance(response.context_data["object_list"][0], Course)
+
+    def test_translations_are_indexed_per_language(self):
+        self.course.title_fr = "Algorithmique"
+        self.course.save()
+
+        self.assertEqual(
+            list(Course.objects.search("algorithmique", language="fr")), [self.course]
+        )
+        self.assertEqual(list(Course.objects.search("algorithmique", "en")), [])
+        # Untranslated fields fall back to the default language
+        self.assertEqual(list(Course.objects.search("cs101", "ru")), [self.course])
+
+        with translation.override("fr-fr"):
+            self.assertEqual(
+                list(Course.objects.search("algorithmique")), [self.course]
+            )
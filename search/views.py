@@ -1,8 +1,7 @@
-from itertools import chain
 from django.views.generic import ListView
-from core.models import NewsAndEvents
-from course.models import Program, Course
-from quiz.models import Quiz
+
+from .index import resolve
+from .models import SearchDocument
 
 
 class SearchView(ListView):
@@ -17,22 +16,17 @@ class SearchView(ListView):
         return context
 
     def get_queryset(self):
-        request = self.request
-        query = request.GET.get("q", None)
-
+        query = self.request.GET.get("q", None)
         if query is not None:
-            news_events_results = NewsAndEvents.objects.search(query)
-            program_results = Program.objects.search(query)
-            course_results = Course.objects.search(query)
-            quiz_results = Quiz.objects.search(query)
+            return SearchDocument.objects.search(query)
+        return SearchDocument.objects.none()
 
-            # combine querysets
-            queryset_chain = chain(
-                news_events_results, program_results, course_results, quiz_results
-            )
-            queryset = sorted(
-                queryset_chain, key=lambda instance: instance.pk, reverse=True
-            )
-            self.count = len(queryset)  # since queryset is actually a list
-            return queryset
-        return NewsAndEvents.objects.none()  # just an empty queryset as default
+    def paginate_queryset(self, queryset, page_size):
+        # Paginate the ranked documents in the database, then load only the
+        # objects shown on this page.
+        paginator, page, documents, is_paginated = super().paginate_queryset(
+            queryset, page_size
+        )
+        self.count = paginator.count
+        page.object_list = resolve(documents)
+        return paginator, page, page.object_list, is_paginated